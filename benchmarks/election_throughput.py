@@ -0,0 +1,338 @@
+#!/usr/bin/env python
+
+#  VoteTrackerPlus
+#   Copyright (C) 2022 Sandy Currier
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 2 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program; if not, write to the Free Software Foundation, Inc.,
+#   51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+"""
+Benchmark the throughput and latency of an election end to end -
+cast-ballot, accept-ballot, merge-contests, tally-contests (per
+tally) and verify-ballot-receipt - against a synthetic ElectionData
+(see synthetic_election.py) created in a temporary directory.
+
+Each run is appended to a JSON lines history file.  When the history
+holds an earlier run with the same election arguments, each
+throughput is compared against it and the ones that dropped by more
+than the --threshold fraction are reported as regressions (and with
+--fail_on_regression, make the exit status non zero).
+
+Note that accept-ballot only creates a ballot receipt once each of
+the ballot's contests has BALLOT_RECEIPT_ROWS unmerged CVRs, so the
+number of verified receipts depends on the number of ballots per
+town.  A run fails outright (rather than recording bogus throughputs)
+if merge-contests does not merge every accepted CVR or if a tally
+finds no votes.  Run with '--help' for usage information.
+"""
+
+# Standard imports
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Project imports
+from vtp.core.ballot import Ballot
+from vtp.core.common import Globals
+from vtp.ops.accept_ballot_operation import AcceptBallotOperation
+from vtp.ops.cast_ballot_operation import CastBallotOperation
+from vtp.ops.merge_contests_operation import MergeContestsOperation
+from vtp.ops.tally_contests_operation import TallyContestsOperation
+from vtp.ops.verify_ballot_receipt_operation import VerifyBallotReceiptOperation
+
+# Local imports
+import synthetic_election  # pylint: disable=wrong-import-order
+
+
+def parse_arguments():
+    """Parse the command line"""
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.RawDescriptionHelpFormatter, description=__doc__
+    )
+    synthetic_election.add_election_args(parser)
+    parser.add_argument(
+        "-b",
+        "--ballots",
+        type=int,
+        default=250,
+        help="the number of ballots to cast and accept (default 250)",
+    )
+    parser.add_argument(
+        "-r",
+        "--receipts",
+        type=int,
+        default=20,
+        help="the maximum number of ballot receipts to verify (default 20)",
+    )
+    parser.add_argument(
+        "--history",
+        default=os.path.join(
+            os.path.dirname(os.path.realpath(__file__)), "election_throughput.jsonl"
+        ),
+        help="the JSON lines file the results are appended to "
+        "(default benchmarks/election_throughput.jsonl)",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="the throughput drop (as a fraction) reported as a regression (default 0.2)",
+    )
+    parser.add_argument(
+        "--fail_on_regression",
+        action="store_true",
+        help="exit with a non zero status when a regression is found",
+    )
+    return parser.parse_args()
+
+
+def summarize(samples: list, units: int = 0) -> dict:
+    """
+    Return the throughput and latency summary of a list of elapsed
+    times (in seconds).  The throughput is units (by default one per
+    sample) per second over the total elapsed time.
+    """
+    ordered = sorted(samples)
+    total = sum(ordered)
+    return {
+        "count": len(ordered),
+        "per_sec": (units or len(ordered)) / total if total else 0.0,
+        "p50_ms": 1000 * statistics.median(ordered),
+        "p95_ms": 1000 * ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))],
+        "max_ms": 1000 * ordered[-1],
+    }
+
+
+def timed(samples: list, function, **kwargs):
+    """Call function (quietly), append its elapsed time to samples and return its result"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        result = function(**kwargs)
+        samples.append(time.perf_counter() - start)
+    return result
+
+
+def operation(operation_class, workspace: str, verbosity: int = 0, **kwargs):
+    """Return a quiet operation on the workspace"""
+    return operation_class(
+        election_data_dir=workspace, verbosity=verbosity, printonly=False, **kwargs
+    )
+
+
+def cast_and_accept(workspace: str, ballots: int, receipts: int) -> tuple:
+    """
+    Cast and accept ballots round robin across the blank ballots.
+    Returns the cast and accept samples, the number of contest CVRs
+    and up to receipts (receipt, row) pairs.
+    """
+    blank_ballots = []
+    for dirpath, _, files in os.walk(workspace):
+        blank_ballots += [
+            os.path.relpath(os.path.join(dirpath, filename), workspace)
+            for filename in files
+            if filename.endswith(Globals.get("BALLOT_FILE"))
+        ]
+    blank_ballots.sort()
+    cast_samples, accept_samples, cvrs, receipt_rows = [], [], 0, []
+    for count in range(ballots):
+        blank_ballot = blank_ballots[count % len(blank_ballots)]
+        timed(
+            cast_samples,
+            operation(CastBallotOperation, workspace).run,
+            blank_ballot=blank_ballot,
+            demo_mode=True,
+        )
+        with open(
+            os.path.join(workspace, blank_ballot), "r", encoding="utf8"
+        ) as infile:
+            cvrs += len(json.load(infile)["contests"])
+        receipt, row = timed(
+            accept_samples,
+            operation(AcceptBallotOperation, workspace).run,
+            cast_ballot=Ballot.get_cast_from_blank(blank_ballot),
+        )[:2]
+        if row and len(receipt_rows) < receipts:
+            receipt_rows.append((receipt, row))
+    return cast_samples, accept_samples, cvrs, receipt_rows
+
+
+def tally_uids(workspace: str) -> dict:
+    """Return a tally -> contest uids dictionary of the blank ballots"""
+    uids = {}
+    for dirpath, _, files in os.walk(workspace):
+        for filename in files:
+            if filename.endswith(Globals.get("BALLOT_FILE")):
+                with open(
+                    os.path.join(dirpath, filename), "r", encoding="utf8"
+                ) as infile:
+                    for contest in json.load(infile)["contests"]:
+                        uids.setdefault(contest["tally"], set()).add(contest["uid"])
+    return {tally: sorted(uid_set) for tally, uid_set in uids.items()}
+
+
+# pylint: disable=duplicate-code,too-many-locals
+def run_election(parsed_args, location: str) -> dict:
+    """Run the benchmarked election and return the metrics"""
+    workspace = synthetic_election.create_election(
+        location=location,
+        states=parsed_args.states,
+        towns=parsed_args.towns,
+        contests=parsed_args.contests,
+        candidates=parsed_args.candidates,
+        rank_depth=parsed_args.rank_depth,
+        seed=parsed_args.seed,
+    )
+    # cast-ballot demo mode selections come from the random module
+    random.seed(parsed_args.seed)
+    cast_samples, accept_samples, cvrs, receipt_rows = cast_and_accept(
+        workspace, parsed_args.ballots, parsed_args.receipts
+    )
+    metrics = {
+        "cast-ballot": summarize(cast_samples),
+        "accept-ballot": summarize(accept_samples),
+    }
+    # Note - accept-ballot leaves the CVRs as remote (origin/) branches
+    merge_samples = []
+    merged = timed(
+        merge_samples,
+        operation(MergeContestsOperation, workspace).run,
+        flush=True,
+        remote=True,
+    )
+    if merged != cvrs:
+        raise RuntimeError(f"merge-contests merged {merged} of {cvrs} CVRs")
+    metrics["merge-contests (CVRs)"] = summarize(merge_samples, merged)
+    for tally, uids in sorted(tally_uids(workspace).items()):
+        tally_samples = []
+        for uid in uids:
+            # The scanned votes are printed at verbosity 3
+            output = timed(
+                tally_samples,
+                operation(
+                    TallyContestsOperation,
+                    workspace,
+                    verbosity=3,
+                    stdout_printing=False,
+                ).run,
+                contest_uid=uid,
+            )
+            votes = re.search(r"Scanned ([0-9]+) votes", "\n".join(output))
+            if not votes or votes.group(1) == "0":
+                raise RuntimeError(f"tally-contests found no votes for contest {uid}")
+        metrics[f"tally-contests ({tally})"] = summarize(tally_samples)
+    if receipt_rows:
+        verify_samples = []
+        for receipt, row in receipt_rows:
+            timed(
+                verify_samples,
+                operation(VerifyBallotReceiptOperation, workspace).run,
+                receipt_data=receipt,
+                row=str(row),
+            )
+        metrics["verify-ballot-receipt"] = summarize(verify_samples)
+    return metrics
+
+
+def read_baseline(history: str, params: dict) -> dict:
+    """Return the most recent history entry with the same params (or {})"""
+    baseline = {}
+    if os.path.isfile(history):
+        with open(history, "r", encoding="utf8") as infile:
+            for line in infile:
+                entry = json.loads(line)
+                if entry["params"] == params:
+                    baseline = entry
+    return baseline
+
+
+def report(metrics: dict, baseline: dict, threshold: float) -> list:
+    """Print the metrics (against the baseline) and return the regressions"""
+    regressions = []
+    for name, metric in metrics.items():
+        line = (
+            f"{name:28} {metric['per_sec']:9.1f}/sec  p50 {metric['p50_ms']:8.1f}ms  "
+            f"p95 {metric['p95_ms']:8.1f}ms  max {metric['max_ms']:8.1f}ms  "
+            f"(n={metric['count']})"
+        )
+        previous = baseline.get("metrics", {}).get(name)
+        if previous and previous["per_sec"]:
+            change = metric["per_sec"] / previous["per_sec"] - 1
+            line += f"  {100 * change:+.0f}%"
+            if change < -threshold:
+                line += " REGRESSION"
+                regressions.append(name)
+        print(line)
+    return regressions
+
+
+def main():
+    """Run the benchmark, record the results and report any regressions"""
+    parsed_args = parse_arguments()
+    synthetic_election.set_git_environment()
+    params = {
+        key: getattr(parsed_args, key)
+        for key in [
+            "states",
+            "towns",
+            "contests",
+            "candidates",
+            "rank_depth",
+            "seed",
+            "ballots",
+            "receipts",
+        ]
+    }
+    # Note - a detached 'git gc --auto' may still be running
+    with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as tmpdir:
+        metrics = run_election(parsed_args, os.path.realpath(tmpdir))
+        MergeContestsOperation.close_git_backends()
+    baseline = read_baseline(parsed_args.history, params)
+    if baseline:
+        print(f"Compared against the {baseline['commit']} run of {baseline['date']}")
+    regressions = report(metrics, baseline, parsed_args.threshold)
+    with open(parsed_args.history, "a", encoding="utf8") as outfile:
+        outfile.write(
+            json.dumps(
+                {
+                    "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                    "commit": subprocess.run(
+                        ["git", "rev-parse", "--short", "HEAD"],
+                        cwd=os.path.dirname(os.path.realpath(__file__)),
+                        capture_output=True,
+                        text=True,
+                        check=False,
+                    ).stdout.strip(),
+                    "params": params,
+                    "metrics": metrics,
+                }
+            )
+            + "\n"
+        )
+    if regressions and parsed_args.fail_on_regression:
+        sys.exit(f"Throughput regressions: {', '.join(regressions)}")
+
+
+if __name__ == "__main__":
+    main()
+
+# EOF
@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+
+#  VoteTrackerPlus
+#   Copyright (C) 2022 Sandy Currier
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 2 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program; if not, write to the Free Software Foundation, Inc.,
+#   51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+"""
+Benchmark the merge-contests runtime digest - the random content that
+replaces each merged contest.json - and the resulting merges/sec of a
+batch merge, comparing the original 'openssl rand' subprocess per merge
+with the in-process CSPRNG.
+
+The merges run against a throwaway upstream/workspace pair created in
+a temporary directory.  Run with '--help' for usage information.
+"""
+
+# Standard imports
+import argparse
+import os
+import subprocess
+import tempfile
+import time
+
+# Project imports
+from vtp.core.common import Globals
+from vtp.ops.merge_contests_operation import MergeContestsOperation
+
+
+class OpensslMergeContestsOperation(MergeContestsOperation):
+    """MergeContestsOperation with the original 'openssl rand' runtime digest"""
+
+    def runtime_digest(self) -> str:
+        """One 'openssl rand -base64 48' subprocess per digest"""
+        return self.shell_out(
+            ["openssl", "rand", "-base64", "48"],
+            incoming_printlevel=5,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+
+
+def parse_arguments():
+    """Parse the command line"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "-n",
+        "--merges",
+        type=int,
+        default=500,
+        help="the number of contest branches to merge (default 500)",
+    )
+    return parser.parse_args()
+
+
+def create_workspace(tmpdir: str, merges: int) -> tuple[str, list]:
+    """
+    Create an upstream with one CVRs/contest.json and a workspace with
+    merges pushed contest branches.  Returns the workspace and the
+    (remote) branch names.
+    """
+    upstream = os.path.join(tmpdir, "upstream.git")
+    workspace = os.path.join(tmpdir, "workspace")
+    subprocess.run(["git", "init", "-q", "--bare", "-b", "main", upstream], check=True)
+    subprocess.run(
+        ["git", "clone", "-q", upstream, workspace],
+        check=True,
+        stderr=subprocess.DEVNULL,
+    )
+    operation = MergeContestsOperation(election_data_dir=workspace, verbosity=0)
+    backend = operation.git_backend(workspace)
+    contest_file = "CVRs/" + Globals.get("CONTEST_FILE")
+    initial = backend.commit_tree(
+        backend.replace_path("", contest_file, backend.hash_object(b"{}\n")),
+        [],
+        "initial\n",
+    )
+    refspecs = [f"{initial}:refs/heads/main"]
+    branches = []
+    for count in range(merges):
+        payload = f'{{"contestCVR": {{"uid": "0000", "count": {count}}}}}\n'
+        tree = backend.replace_path(
+            "", contest_file, backend.hash_object(payload.encode("utf8"))
+        )
+        branch = f"{Globals.get('CONTEST_FILE_SUBDIR')}/0000/{count:010x}"
+        refspecs.append(
+            f"{backend.commit_tree(tree, [initial], payload)}:refs/heads/{branch}"
+        )
+        branches.append("origin/" + branch)
+    subprocess.run(
+        ["git", "push", "-q", "origin"] + refspecs,
+        cwd=workspace,
+        check=True,
+        stderr=subprocess.DEVNULL,
+    )
+    subprocess.run(["git", "checkout", "-q", "main"], cwd=workspace, check=True)
+    return workspace, branches
+
+
+def time_merges(operation_class, merges: int) -> float:
+    """Return the merges/sec of a batch merge of merges branches"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        workspace, branches = create_workspace(tmpdir, merges)
+        operation = operation_class(election_data_dir=workspace, verbosity=0)
+        with operation.changed_cwd(workspace):
+            start = time.perf_counter()
+            operation.merge_contest_branches_in_batch(branches, remote=True)
+            elapsed = time.perf_counter() - start
+        MergeContestsOperation.close_git_backends()
+    return merges / elapsed
+
+
+def time_digests(operation, count: int) -> float:
+    """Return the runtime digests/sec of an operation"""
+    start = time.perf_counter()
+    for _ in range(count):
+        operation.runtime_digest()
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    """Run the benchmarks and print the results"""
+    parsed_args = parse_arguments()
+    for variable in ["AUTHOR", "COMMITTER"]:
+        os.environ.setdefault(f"GIT_{variable}_NAME", "benchmark")
+        os.environ.setdefault(f"GIT_{variable}_EMAIL", "benchmark@localhost")
+        os.environ[f"GIT_{variable}_DATE"] = Globals.get("ELECTION_DATETIME")
+    for label, operation_class in [
+        ("openssl rand subprocess", OpensslMergeContestsOperation),
+        ("in-process CSPRNG", MergeContestsOperation),
+    ]:
+        operation = operation_class(election_data_dir=os.getcwd(), verbosity=0)
+        print(
+            f"{label}: {time_digests(operation, parsed_args.merges):.0f} digests/sec, "
+            f"{time_merges(operation_class, parsed_args.merges):.0f} merges/sec"
+        )
+
+
+if __name__ == "__main__":
+    main()
+
+# EOF
@@ -0,0 +1,249 @@
+#!/usr/bin/env python
+
+#  VoteTrackerPlus
+#   Copyright (C) 2022 Sandy Currier
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 2 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program; if not, write to the Free Software Foundation, Inc.,
+#   51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+"""
+Create a reproducible synthetic ElectionData repo - a bare upstream
+and a workspace clone of it - of a configurable size: the number of
+states, towns per state, contests per GGO (the root, each state and
+each town), candidates per contest and RCV ranking depth.  The
+contests cycle through the supported tallies and every town has a
+generated blank ballot, so the election can be cast, accepted,
+merged, tallied and verified like a real one.
+
+The same arguments and seed always create the same ElectionData
+(down to the commit digests).  Run with '--help' for usage
+information.
+"""
+
+# Standard imports
+import argparse
+import os
+import random
+import subprocess
+
+# Project imports
+from vtp.core.common import Globals
+from vtp.ops.generate_all_blank_ballots_operation import (
+    GenerateAllBlankBallotsOperation,
+)
+
+# The name of the synthetic ElectionData repo
+ELECTION_NAME = "VTP-synthetic-election"
+
+
+def parse_arguments():
+    """Parse the command line"""
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.RawDescriptionHelpFormatter, description=__doc__
+    )
+    add_election_args(parser)
+    parser.add_argument(
+        "-l",
+        "--location",
+        required=True,
+        help="the (pre-existing and empty) directory to create the ElectionData in",
+    )
+    return parser.parse_args()
+
+
+def add_election_args(parser):
+    """Add the size of election arguments to a parser"""
+    parser.add_argument(
+        "--states",
+        type=int,
+        default=1,
+        help="the number of states (default 1)",
+    )
+    parser.add_argument(
+        "--towns",
+        type=int,
+        default=2,
+        help="the number of towns per state (default 2)",
+    )
+    parser.add_argument(
+        "--contests",
+        type=int,
+        default=4,
+        help="the number of contests per GGO - root, state and town (default 4)",
+    )
+    parser.add_argument(
+        "--candidates",
+        type=int,
+        default=5,
+        help="the number of candidates per contest (default 5)",
+    )
+    parser.add_argument(
+        "--rank_depth",
+        type=int,
+        default=3,
+        help="the number of candidates a RCV/PWC/STV ballot ranks (default 3)",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=1,
+        help="the seed of the synthetic names and cast ballots (default 1)",
+    )
+
+
+def git(args: list, cwd: str, **kwargs):
+    """Run a (quiet) git command"""
+    return subprocess.run(
+        ["git"] + args, cwd=cwd, check=True, stderr=subprocess.DEVNULL, **kwargs
+    )
+
+
+def gen_contests(
+    rng: random.Random, ggo_name: str, contests: int, candidates: int, rank_depth: int
+) -> str:
+    """Return the contests yaml of a GGO, cycling through the tallies"""
+    tallies = Globals.get("SUPPORTED_TALLIES")
+    lines = ["contests:"]
+    for count in range(contests):
+        tally = tallies[count % len(tallies)]
+        names = rng.sample(range(10 * candidates), candidates)
+        lines += [
+            f"  - contest_name: {ggo_name} Contest {count}",
+            f"    tally: {tally}",
+            "    contest_type: candidate",
+            # A two seat STV contest, single seat otherwise
+            f"    open_positions: '{2 if tally == 'stv' and candidates > 2 else 1}'",
+            "    max_selections: "
+            f"'{1 if tally == 'plurality' else min(rank_depth, candidates)}'",
+            "    choices:",
+        ]
+        lines += [f"      - {ggo_name} Candidate {name}" for name in names]
+    return "\n".join(lines) + "\n"
+
+
+def gen_ggos(kind: str, names: list) -> str:
+    """Return the GGOs yaml of a GGO"""
+    return f"GGOs:\n  {kind}:\n" + "".join(f"    - {name}\n" for name in names)
+
+
+def write_file(filename: str, content: str):
+    """Write a file, creating its directory"""
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    with open(filename, "w", encoding="utf8") as outfile:
+        outfile.write(content)
+
+
+# pylint: disable=too-many-arguments,too-many-positional-arguments,too-many-locals
+def create_election(
+    location: str,
+    states: int = 1,
+    towns: int = 2,
+    contests: int = 4,
+    candidates: int = 5,
+    rank_depth: int = 3,
+    seed: int = 1,
+) -> str:
+    """
+    Create the synthetic ElectionData upstream and workspace in
+    location and return the workspace.  Each state is named StateNN
+    and each town TownNN.
+    """
+    rng = random.Random(seed)
+    upstream = os.path.join(location, ELECTION_NAME + ".git")
+    workspace = os.path.join(location, ELECTION_NAME)
+    git(["init", "-q", "--bare", "-b", "main", upstream], location)
+    git(["clone", "-q", upstream, workspace], location)
+    state_names = [f"State{count:02d}" for count in range(states)]
+    town_names = [f"Town{count:02d}" for count in range(towns)]
+    write_file(
+        os.path.join(workspace, Globals.get("CONFIG_FILE")),
+        gen_ggos("states", state_names)
+        + gen_contests(rng, "Root", contests, candidates, rank_depth),
+    )
+    for state in state_names:
+        state_dir = os.path.join(workspace, "GGOs", "states", state)
+        write_file(
+            os.path.join(state_dir, Globals.get("CONFIG_FILE")),
+            gen_ggos("towns", town_names)
+            + gen_contests(rng, state, contests, candidates, rank_depth),
+        )
+        for town in town_names:
+            town_dir = os.path.join(state_dir, "GGOs", "towns", town)
+            write_file(
+                os.path.join(town_dir, Globals.get("CONFIG_FILE")),
+                f"voting centers:\n  - {state} {town} Voting Center\n"
+                + gen_contests(
+                    rng, f"{state} {town}", contests, candidates, rank_depth
+                ),
+            )
+            # Every address of the town gets the same ballot
+            write_file(
+                os.path.join(town_dir, Globals.get("ADDRESS_MAP_FILE")),
+                "unique-ballots:\n"
+                "  - ggos:\n"
+                f"      - GGOs/states/{state}\n"
+                f"      - GGOs/states/{state}/GGOs/towns/{town}\n"
+                "    addresses:\n"
+                "      - '.*'\n",
+            )
+            write_file(
+                os.path.join(
+                    town_dir,
+                    Globals.get("CONTEST_FILE_SUBDIR"),
+                    Globals.get("CONTEST_FILE"),
+                ),
+                "{}\n",
+            )
+    # The blank ballots are generated from the committed config
+    git(["add", "."], workspace)
+    git(["commit", "-q", "-m", "Synthetic ElectionData"], workspace)
+    GenerateAllBlankBallotsOperation(
+        election_data_dir=workspace, verbosity=0, printonly=False
+    ).run()
+    git(["add", "."], workspace)
+    git(["commit", "-q", "-m", "Synthetic blank ballots"], workspace)
+    git(["push", "-q", "origin", "main"], workspace)
+    git(["branch", "-q", "-u", "origin/main"], workspace)
+    return workspace
+
+
+def set_git_environment():
+    """Pin the git identity and dates so that digests are reproducible"""
+    for variable in ["AUTHOR", "COMMITTER"]:
+        os.environ.setdefault(f"GIT_{variable}_NAME", "benchmark")
+        os.environ.setdefault(f"GIT_{variable}_EMAIL", "benchmark@localhost")
+        os.environ[f"GIT_{variable}_DATE"] = Globals.get("ELECTION_DATETIME")
+
+
+def main():
+    """Create the synthetic ElectionData and print the workspace"""
+    parsed_args = parse_arguments()
+    set_git_environment()
+    print(
+        create_election(
+            location=os.path.realpath(parsed_args.location),
+            states=parsed_args.states,
+            towns=parsed_args.towns,
+            contests=parsed_args.contests,
+            candidates=parsed_args.candidates,
+            rank_depth=parsed_args.rank_depth,
+            seed=parsed_args.seed,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
+
+# EOF
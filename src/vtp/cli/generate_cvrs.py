@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+
+#  VoteTrackerPlus
+#   Copyright (C) 2022 Sandy Currier
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 2 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program; if not, write to the Free Software Foundation, Inc.,
+#   51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+"""Command line script to bulk generate a synthetic CVR history.
+
+Run with '--help' for usage information.
+"""
+
+# Standard imports
+import argparse
+
+# Project imports
+from vtp.ops.generate_cvrs_operation import GenerateCvrsOperation
+
+# Local imports
+from ._arguments import Arguments
+
+
+def parse_arguments():
+    """Parse arguments from a command line or from the constructor"""
+
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description="""
+Will generate N mock ballots, randomly cast round robin across the
+blank ballots found in the ElectionData, and write their contest CVRs
+directly into the ElectionData repository with 'git fast-import' -
+without running cast-ballot, accept-ballot and merge-contests once
+per ballot.  This is for creating large test and benchmark elections
+for tally-contests and verify-ballot-receipt.
+
+The CVR commits and the merge commits have the same shape as those of
+accept-ballot and merge-contests.  All but the last --unmerged ballots
+are merged to the main branch.  The contests of the last --unmerged
+ballots are left as pushed contest branches (the cast CVR cache of a
+running election) - ballot receipts need at least 100 of them per
+contest.
+
+The main branch and the unmerged contest branches are pushed in one
+atomic push.
+""",
+    )
+    Arguments.add_election_data_dir(parser)
+    parser.add_argument(
+        "-b",
+        "--ballots",
+        type=int,
+        default=1000,
+        help="the number of mock ballots to generate (def=1000)",
+    )
+    parser.add_argument(
+        "-m",
+        "--unmerged",
+        type=int,
+        default=0,
+        help="the number of (last) ballots to leave unmerged (def=0)",
+    )
+    parser.add_argument(
+        "-s",
+        "--seed",
+        type=int,
+        help="if supplied, seeds the random ballot selections",
+    )
+    Arguments.add_verbosity(parser)
+    Arguments.add_printonly(parser)
+    parsed_args = parser.parse_args()
+
+    # Validate required args
+    if parsed_args.ballots < 1 or parsed_args.unmerged < 0:
+        raise ValueError(
+            "The number of ballots must be positive and the number of "
+            "unmerged ballots cannot be negative"
+        )
+    return parsed_args
+
+
+# pylint: disable=duplicate-code
+def main():
+    """Entry point for 'generate-cvrs'."""
+
+    # Parse args
+    parsed_args = parse_arguments()
+
+    # do it
+    gco = GenerateCvrsOperation(
+        election_data_dir=parsed_args.election_data_dir,
+        verbosity=parsed_args.verbosity,
+        printonly=parsed_args.printonly,
+    )
+    gco.run(
+        ballots=parsed_args.ballots,
+        unmerged=parsed_args.unmerged,
+        seed=parsed_args.seed,
+    )
+
+
+# If called directly via this file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+
+#  VoteTrackerPlus
+#   Copyright (C) 2022 Sandy Currier
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 2 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program; if not, write to the Free Software Foundation, Inc.,
+#   51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+"""
+Command line level script to map a voter file of addresses to their ballots.
+
+Run with '--help' for usage information.
+"""
+
+# Standard imports
+import argparse
+
+# Project imports
+from vtp.ops.map_addresses_operation import MapAddressesOperation
+
+# Local imports
+from ._arguments import Arguments
+
+
+def parse_arguments():
+    """Parse arguments from a command line or from the constructor"""
+
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description="""
+Will read a voter file (a CSV file with a header line naming at least
+the number, street, town and state columns) and map each address to
+its ballot - the ballot node (the GGO holding its blank ballot and
+CVRs) and the blank ballot file (relative to the ElectionData root) -
+so that polling places can pre-stage the ballot styles.
+
+The mapping is written as a CSV file of the voter file columns plus
+ballot_node, blank_ballot and error columns, the error column being
+set (and the ballot columns empty) when an address cannot be mapped.
+Either file can be '-' for stdin/stdout.
+""",
+    )
+
+    Arguments.add_election_data_dir(parser)
+    parser.add_argument(
+        "-i",
+        "--input",
+        default="-",
+        help="the voter file to map (def='-', stdin)",
+    )
+    parser.add_argument(
+        "-w",
+        "--output",
+        default="-",
+        help="the file to write the mapping to (def='-', stdout)",
+    )
+    Arguments.add_output_style(parser)
+    Arguments.add_verbosity(parser)
+
+    return parser.parse_args()
+
+
+# pylint: disable=duplicate-code
+def main():
+    """Entry point for 'map-addresses'."""
+
+    # Parse args
+    parsed_args = parse_arguments()
+
+    # do it
+    mao = MapAddressesOperation(
+        election_data_dir=parsed_args.election_data_dir,
+        output_style=parsed_args.output_style,
+        verbosity=parsed_args.verbosity,
+        printonly=False,
+    )
+    mao.run(
+        input_file=parsed_args.input,
+        output_file=parsed_args.output,
+    )
+
+
+# If called directly via this file
+if __name__ == "__main__":
+    main()
@@ -27,6 +27,7 @@ import argparse
 
 # Project imports
 from vtp.core.address import Address
+from vtp.core.common import Globals
 from vtp.ops.run_mock_election_operation import RunMockElectionOperation
 
 # Local imports
@@ -64,6 +65,14 @@ By default run_mock_election.py will loop over all available blank
 ballots found withint the ElectionData tree.  However, either a
 specific blank ballot or an address can be specified to limit the
 mock to a single ballot N times.
+
+When --parallel_scanners N is supplied, run_mock_election.py will
+instead run N VTP scanners and one VTP tabulator concurrently, each
+in its own process and in its own workspace of a setup-vtp-demo
+--location (which needs at least N scanners).  Each scanner runs the
+--iterations or --duration while the tabulator merges the pushed
+contests as they arrive.  If --flush_mode is set to 1 or 2, the
+tabulator will then flush the ballot cache and print the tallies.
 """,
     )
 
@@ -114,12 +123,33 @@ mock to a single ballot N times.
         action="store_true",
         help="when set will capture and version the ballot receipts (scanner only)",
     )
+    parser.add_argument(
+        "--parallel_scanners",
+        type=int,
+        default=0,
+        help="if supplied, will run that many scanners and a tabulator in parallel",
+    )
+    parser.add_argument(
+        "--location",
+        default=Globals.get("DEFAULT_RUNTIME_LOCATION"),
+        help="the setup-vtp-demo location of the parallel scanners "
+        + f"(def={Globals.get('DEFAULT_RUNTIME_LOCATION')})",
+    )
     Arguments.add_verbosity(parser)
     Arguments.add_printonly(parser)
     parsed_args = parser.parse_args()
 
     # Validate required args
-    if parsed_args.device not in ["scanner", "tabulator", "both"]:
+    if parsed_args.parallel_scanners < 0:
+        raise ValueError(
+            "The value of parallel_scanners cannot be negative"
+            f" - {parsed_args.parallel_scanners} was supplied."
+        )
+    if not parsed_args.parallel_scanners and parsed_args.device not in [
+        "scanner",
+        "tabulator",
+        "both",
+    ]:
         raise ValueError(
             "The --device parameter only accepts 'device' or 'tabulator' "
             f"or 'both' - ({parsed_args.device}) was suppllied."
@@ -162,6 +192,8 @@ def main():
         iterations=parsed_args.iterations,
         duration=parsed_args.duration,
         version_receipts=parsed_args.version_receipts,
+        parallel_scanners=parsed_args.parallel_scanners,
+        location=parsed_args.location,
     )
 
 
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+
+#  VoteTrackerPlus
+#   Copyright (C) 2022 Sandy Currier
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 2 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program; if not, write to the Free Software Foundation, Inc.,
+#   51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+"""Command line script to run the VTP tabulator service.
+
+Run with '--help' for usage information.
+"""
+
+# Standard imports
+import argparse
+
+# Project imports
+from vtp.ops.tabulator_operation import TabulatorOperation
+
+# Local imports
+from ._arguments import Arguments
+
+
+def parse_arguments():
+    """Parse arguments from a command line or from the constructor"""
+
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description="""
+Will run a long running VTP tabulator on a VTP server node that merges
+the pending CVR contest branches to the main branch as they are pushed.
+
+If the git remote of the ElectionData workspace is a local bare
+repository, a post-receive hook is installed there so that a push
+immediately triggers a merge cycle.  Otherwise, and regardless every
+--interval seconds, the remote is pulled and checked.
+
+As with merge-contests, a contest is only merged while more than
+--minimum_cast_cache of its CVRs are pending.  The queue depth and
+merge latency metrics are written to .git/vtp/tabulator_metrics.json
+of the workspace after every merge cycle.
+""",
+    )
+    Arguments.add_election_data_dir(parser)
+    Arguments.add_minimum_cast_cache(parser)
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=10.0,
+        help="the maximum number of seconds between merge cycles (def=10)",
+    )
+    parser.add_argument(
+        "-i",
+        "--iterations",
+        type=int,
+        default=0,
+        help="if supplied, exit after that number of merge cycles",
+    )
+    parser.add_argument(
+        "-u",
+        "--duration",
+        type=int,
+        default=0,
+        help="if supplied, exit after that number of minutes",
+    )
+    parser.add_argument(
+        "-t",
+        "--tally",
+        action="store_true",
+        help="run an incremental tally after each merge cycle that merged contests",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="the number of worker processes to tally the contests with (def=1)",
+    )
+    Arguments.add_verbosity(parser)
+    Arguments.add_printonly(parser)
+    return parser.parse_args()
+
+
+# pylint: disable=duplicate-code
+def main():
+    """Entry point for 'tabulator-serve'."""
+
+    # Parse args
+    parsed_args = parse_arguments()
+
+    # do it
+    tabulator = TabulatorOperation(
+        election_data_dir=parsed_args.election_data_dir,
+        verbosity=parsed_args.verbosity,
+        printonly=parsed_args.printonly,
+    )
+    tabulator.run(
+        minimum_cast_cache=parsed_args.minimum_cast_cache,
+        interval=parsed_args.interval,
+        iterations=parsed_args.iterations,
+        duration=parsed_args.duration,
+        tally=parsed_args.tally,
+        jobs=parsed_args.jobs,
+    )
+
+
+# If called directly via this file
+if __name__ == "__main__":
+    main()
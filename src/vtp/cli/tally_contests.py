@@ -75,6 +75,19 @@ tallying across git submodules/repos.
         default="",
         help="specify a specific tally to use (plurality, rcv, pwc, stv)",
     )
+    parser.add_argument(
+        "-i",
+        "--incremental",
+        action="store_true",
+        help="only fold in the CVRs merged since the last incremental tally",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="the number of worker processes to tally the contests with (def=1)",
+    )
     Arguments.add_output_style(parser)
     Arguments.add_verbosity(parser)
     parsed_args = parser.parse_args()
@@ -114,6 +127,8 @@ def main():
         contest_uid=parsed_args.contest_uid,
         track_contests=parsed_args.track_contests,
         tally_override=parsed_args.tally_override,
+        incremental=parsed_args.incremental,
+        jobs=parsed_args.jobs,
     )
 
 
@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+
+#  VoteTrackerPlus
+#   Copyright (C) 2022 Sandy Currier
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 2 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program; if not, write to the Free Software Foundation, Inc.,
+#   51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+"""
+Command line level script to verify many ballot receipts at once.
+
+Run with '--help' for usage information.
+"""
+
+# Standard imports
+import argparse
+import sys
+
+# Project imports
+from vtp.ops.verify_ballot_receipts_operation import VerifyBallotReceiptsOperation
+
+# Local imports
+from ._arguments import Arguments
+
+
+def parse_arguments():
+    """Parse arguments from a command line or from the constructor"""
+
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description="""
+Will read a set of ballot receipts (for example all the receipts an
+auditor or an observer group has collected) and validate all the
+digests contained therein - reading each distinct digest only once
+even though it appears on many receipts.  Prints a VALID/INVALID line
+per receipt (with the invalid digests) and a summary.
+
+The receipts can be receipt files and/or directories that are searched
+for .csv receipt files.  A single '-' reads the receipt file and
+directory names from stdin, one per line.
+""",
+    )
+
+    Arguments.add_election_data_dir(parser)
+    parser.add_argument(
+        "receipts",
+        nargs="+",
+        help="the ballot receipt files and/or directories of them",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="the number of worker processes to read the digests with (def=1)",
+    )
+    parser.add_argument(
+        "-r",
+        "--report_file",
+        default="",
+        help="if supplied, also write the per receipt reports (JSON) to this file",
+    )
+    Arguments.add_output_style(parser)
+    Arguments.add_verbosity(parser)
+
+    parsed_args = parser.parse_args()
+
+    if parsed_args.receipts == ["-"]:
+        parsed_args.receipts = [line.strip() for line in sys.stdin if line.strip()]
+    return parsed_args
+
+
+# pylint: disable=duplicate-code
+def main():
+    """Entry point for 'verify-ballot-receipts'."""
+
+    # Parse args
+    parsed_args = parse_arguments()
+
+    # do it
+    vbro = VerifyBallotReceiptsOperation(
+        election_data_dir=parsed_args.election_data_dir,
+        output_style=parsed_args.output_style,
+        verbosity=parsed_args.verbosity,
+        printonly=False,
+    )
+    reports = vbro.run(
+        receipts=parsed_args.receipts,
+        jobs=parsed_args.jobs,
+        report_file=parsed_args.report_file,
+    )
+    if any(report["errors"] for report in reports):
+        sys.exit(1)
+
+
+# If called directly via this file
+if __name__ == "__main__":
+    main()
@@ -201,28 +201,25 @@ class Address:
         will assume that the list is correct and will set the
         active_ggos field to that.
         """
-        footsteps = set()
         addr_hits = []
 
         def walk_descendants(node_of_interest):
-            """Will find all descendantss of this node"""
-            # pylint: disable=too-many-nested-blocks
-            if "unique-ballots" in config.node(node_of_interest)["address_map"]:
-                for entry in config.node(node_of_interest)["address_map"][
-                    "unique-ballots"
-                ]:
-                    for addr in entry["addresses"]:
-                        if self.match(addr):
-                            # add the ggos in order if not already present
-                            for ggo in entry["ggos"]:
-                                if ggo not in self.active_ggos:
-                                    self.active_ggos.append(ggo)
-                            addr_hits.append(node_of_interest)
-            footsteps.add(node_of_interest)
-            for child in config.descendants(node_of_interest):
-                if child in footsteps:
-                    continue
-                walk_descendants(child)
+            """
+            Will match the address against the address_map patterns of
+            this node and all its descendants (compiled once per
+            ElectionConfig - see AddressMatcher)
+            """
+            # For now the address is a number and street address only
+            if self.address["number"] == "" and self.address["street"] == "":
+                return
+            for node, entry_ggos in config.get_address_matcher(node_of_interest).match(
+                self.address["number"] + " " + self.address["street"]
+            ):
+                # add the ggos in order if not already present
+                for ggo in entry_ggos:
+                    if ggo not in self.active_ggos:
+                        self.active_ggos.append(ggo)
+                addr_hits.append(node)
 
         # Note - the root GGO always contributes
         self.active_ggos.append(".")
@@ -0,0 +1,105 @@
+#  VoteTrackerPlus
+#   Copyright (C) 2022 Sandy Currier
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 2 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program; if not, write to the Free Software Foundation, Inc.,
+#   51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+"""The VTP AddressMatcher class - the compiled address_map patterns of a GGO"""
+
+import re
+
+# The characters that end the literal prefix of a pattern
+_SPECIAL = set(".^$*+?{}[]\\|()")
+
+
+class AddressMatcher:
+    """
+    The address_map 'unique-ballots' address patterns of a leaf GGO
+    (see Address.map_ggos) - those of the GGO itself and of all its
+    descendants - compiled once and indexed by their literal prefix.
+
+    An address is matched against the patterns the same way as
+    Address.match (re.match against '<number> <street>') but only the
+    patterns whose literal prefix is a prefix of the address are
+    tried.  The prefixes are held in a character trie so finding the
+    candidates only walks the address once.  Patterns without a
+    literal prefix (such as '.*') are candidates for every address.
+    """
+
+    def __init__(self, config, leaf_node: str):
+        """Compile the address patterns reachable from leaf_node"""
+        # The (node, ggos tuple, compiled pattern) of each address pattern
+        self.patterns = []
+        # The trie - a nested dictionary of the prefix characters,
+        # with the pattern indexes of each prefix under the None key
+        self.trie = {}
+        for node in [leaf_node] + sorted(config.descendants(leaf_node)):
+            for entry in config.node(node)["address_map"].get("unique-ballots", []):
+                for addr in entry["addresses"]:
+                    self.add_pattern(node, entry["ggos"], addr)
+
+    @staticmethod
+    def literal_prefix(pattern: str) -> str:
+        """
+        Return the literal prefix of a pattern - the characters any
+        matching string starts with - or "" if there is none
+        """
+        if "|" in pattern:
+            # an alternation can match anything
+            return ""
+        position = 1 if pattern.startswith("^") else 0
+        prefix = ""
+        while position < len(pattern) and pattern[position] not in _SPECIAL:
+            prefix += pattern[position]
+            position += 1
+        # A quantifier makes the last literal character optional
+        if position < len(pattern) and pattern[position] in "*?{":
+            prefix = prefix[:-1]
+        return prefix
+
+    def add_pattern(self, node: str, ggos: list, pattern: str):
+        """Compile and index an address pattern"""
+        if not isinstance(pattern, str):
+            raise ValueError(
+                (
+                    f"Unsupoorted Address match regex ({pattern}) - ",
+                    "supply more quality pizza",
+                )
+            )
+        trie = self.trie
+        for character in AddressMatcher.literal_prefix(pattern):
+            trie = trie.setdefault(character, {})
+        trie.setdefault(None, []).append(len(self.patterns))
+        self.patterns.append((node, tuple(ggos), re.compile(pattern)))
+
+    def match(self, address: str) -> list:
+        """
+        Return the (node, ggos) of every pattern matching the
+        '<number> <street>' address string, in pattern order
+        """
+        candidates = list(self.trie.get(None, []))
+        trie = self.trie
+        for character in address:
+            trie = trie.get(character)
+            if trie is None:
+                break
+            candidates += trie.get(None, [])
+        return [
+            self.patterns[index][:2]
+            for index in sorted(candidates)
+            if self.patterns[index][2].match(address)
+        ]
+
+
+# EOF
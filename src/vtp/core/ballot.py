@@ -56,6 +56,17 @@ class Ballot:
             Globals.get("BALLOT_FILE"),
         )
 
+    @staticmethod
+    def gen_contest_payload(contest) -> str:
+        """Return the contest.json (and CVR commit message) content of a contest"""
+        # Prepend the dictionary with a CVR key
+        return json.dumps(
+            {"contestCVR": contest.get("dict")},
+            sort_keys=True,
+            indent=4,
+            ensure_ascii=False,
+        )
+
     @staticmethod
     def gen_contest_location(config, subdir: str):
         """Return the contest.json file location"""
@@ -345,13 +356,9 @@ class Ballot:
     def write_contest(self, contest, config):
         """Write out the voter's contest"""
         contest_file = Ballot.gen_contest_location(config, self.ballot_subdir)
-        # Prepend the dictionary with a CVR key
-        the_aggregate = {"contestCVR": contest.get("dict")}
         # The parent directory better exist or something is wrong
         with open(contest_file, "w", encoding="utf8") as outfile:
-            json.dump(
-                the_aggregate, outfile, sort_keys=True, indent=4, ensure_ascii=False
-            )
+            outfile.write(Ballot.gen_contest_payload(contest))
         return contest_file
 
     # pylint: disable=too-many-arguments,too-many-positional-arguments
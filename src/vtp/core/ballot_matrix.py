@@ -0,0 +1,124 @@
+#  VoteTrackerPlus
+#   Copyright (C) 2022 Sandy Currier
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 2 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program; if not, write to the Free Software Foundation, Inc.,
+#   51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+"""The VTP BallotMatrix class - integer encoded rankings for RCV rounds"""
+
+from array import array
+
+
+class BallotMatrix:
+    """
+    An integer encoded, read only copy of the rankings (the
+    'selection') of a contest batch for use by the sequential RCV
+    tally.  The choices are numbered in order of first appearance and
+    the rankings of all the ballots are stored back to back in one
+    array, with per ballot offsets into it.
+
+    Instead of mutating each CVR's selection list, each ballot has a
+    cursor pointing at its currently active rank, and each choice has
+    a bucket of the ballots currently counting towards it.  Eliminating
+    a choice only visits the ballots in its bucket, advancing each
+    cursor past the inactive (eliminated or already elected) choices,
+    so a complete RCV tally touches each rank of each ballot at most
+    once per open seat.
+
+    The selection counts themselves are kept by the caller (the Tally)
+    in its name keyed selection_counts dictionary.
+    """
+
+    def __init__(self, contest_batch: list):
+        """Encode the selections of the contest batch"""
+        self.names = []
+        self.ids = {}
+        self.ranks = array("I")
+        self.offsets = array("I", [0])
+        for a_git_cvr in contest_batch:
+            for name in a_git_cvr["contestCVR"]["selection"]:
+                if name not in self.ids:
+                    self.ids[name] = len(self.names)
+                    self.names.append(name)
+                self.ranks.append(self.ids[name])
+            self.offsets.append(len(self.ranks))
+        self.cursors = array("I", self.offsets[:-1])
+        self.inactive = bytearray(len(self.names))
+        self.buckets = [array("I") for _ in self.names]
+
+    def __len__(self):
+        """Return the number of ballots"""
+        return len(self.cursors)
+
+    def deactivate(self, names: list):
+        """Mark choices as no longer receiving votes"""
+        for name in names:
+            if name in self.ids:
+                self.inactive[self.ids[name]] = 1
+
+    def place(self, ballot: int, position: int) -> int:
+        """
+        Move the cursor of a ballot to its first active rank at or after
+        position and add the ballot to that choice's bucket.  Returns
+        the choice id or -1 if the ballot is exhausted.
+        """
+        end = self.offsets[ballot + 1]
+        while position < end and self.inactive[self.ranks[position]]:
+            position += 1
+        self.cursors[ballot] = position
+        if position == end:
+            return -1
+        choice = self.ranks[position]
+        self.buckets[choice].append(ballot)
+        return choice
+
+    def first_round(self, inactive_names: list, selection_counts: dict) -> int:
+        """
+        Start a new (open seat) tally with the supplied choices
+        inactive - place every ballot with its first active choice and
+        add those to selection_counts.  Returns the number of non blank
+        ballots.
+        """
+        self.inactive = bytearray(len(self.names))
+        self.deactivate(inactive_names)
+        self.buckets = [array("I") for _ in self.names]
+        for ballot in range(len(self)):
+            self.place(ballot, self.offsets[ballot])
+        counted = 0
+        for choice, bucket in enumerate(self.buckets):
+            if bucket:
+                selection_counts[self.names[choice]] += len(bucket)
+                counted += len(bucket)
+        return counted
+
+    def recast(self, last_place_names: list, selection_counts: dict):
+        """
+        Eliminate the last place choices - each ballot counting towards
+        one moves on to its next active choice (if any), adjusting
+        selection_counts accordingly.
+        """
+        self.deactivate(last_place_names)
+        for name in last_place_names:
+            if name not in self.ids:
+                continue
+            choice = self.ids[name]
+            bucket, self.buckets[choice] = self.buckets[choice], array("I")
+            selection_counts[name] -= len(bucket)
+            for ballot in bucket:
+                new_choice = self.place(ballot, self.cursors[ballot] + 1)
+                if new_choice >= 0:
+                    selection_counts[self.names[new_choice]] += 1
+
+
+# EOF
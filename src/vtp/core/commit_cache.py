@@ -0,0 +1,118 @@
+#  VoteTrackerPlus
+#   Copyright (C) 2022 Sandy Currier
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 2 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program; if not, write to the Free Software Foundation, Inc.,
+#   51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+"""The VTP CommitCache class - the shown commits keyed on their digest"""
+
+# standard imports
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+# local imports
+from .webapi import WebAPI
+
+
+class CommitCache:
+    """
+    A size bounded, least recently used cache of the 'git show -s'
+    output of commits - the lines as well as the parsed {commit,
+    Author, Date, Log} record (see WebAPI.convert_git_log_to_json) -
+    keyed on the full commit digest.  Since a commit is immutable and
+    named by its content, an entry never goes stale and is valid in
+    any workspace of the election.
+
+    The cache can optionally be backed by an sqlite3 store shared by
+    all the processes (for example the web-api workers) on a host -
+    a memory miss is then looked up in the store before giving up.
+    The cache is thread safe.
+    """
+
+    def __init__(self, size: int, store_file: str = ""):
+        """An empty cache of at most size entries (plus the store)"""
+        self.size = size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.connection = None
+        if store_file:
+            os.makedirs(os.path.dirname(os.path.abspath(store_file)), exist_ok=True)
+            self.connection = sqlite3.connect(store_file, check_same_thread=False)
+            with self.connection:
+                self.connection.execute(
+                    "CREATE TABLE IF NOT EXISTS commits ("
+                    "digest TEXT PRIMARY KEY, lines TEXT NOT NULL)"
+                )
+
+    def close(self):
+        """Close the underlying store (if any)"""
+        with self.lock:
+            if self.connection:
+                self.connection.close()
+                self.connection = None
+
+    @staticmethod
+    def parse(lines: list):
+        """
+        Return the parsed record of the 'git show -s' lines of a commit
+        or None if the commit message is not JSON (not a CVR)
+        """
+        try:
+            return WebAPI.convert_git_log_to_json(lines)
+        except ValueError:
+            return None
+
+    def insert(self, digest: str, entry: tuple):
+        """Add an entry, evicting the least recently used. Caller holds the lock."""
+        self.entries[digest] = entry
+        self.entries.move_to_end(digest)
+        while len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    def get(self, digest: str) -> tuple:
+        """Return the (lines, record) of a commit or None if not cached"""
+        with self.lock:
+            if digest in self.entries:
+                self.entries.move_to_end(digest)
+                return self.entries[digest]
+            if not self.connection:
+                return None
+            row = self.connection.execute(
+                "SELECT lines FROM commits WHERE digest = ?", (digest,)
+            ).fetchone()
+            if row is None:
+                return None
+            lines = json.loads(row[0])
+            entry = (lines, CommitCache.parse(lines))
+            self.insert(digest, entry)
+            return entry
+
+    def put(self, digest: str, lines: list) -> tuple:
+        """Cache (and store) the 'git show -s' lines of a commit"""
+        entry = (lines, CommitCache.parse(lines))
+        with self.lock:
+            self.insert(digest, entry)
+            if self.connection:
+                with self.connection:
+                    self.connection.execute(
+                        "INSERT OR IGNORE INTO commits VALUES (?, ?)",
+                        (digest, json.dumps(lines)),
+                    )
+        return entry
+
+
+# EOF
@@ -73,6 +73,50 @@ class Globals:
         "BIN_DIR": "src/vtp",
         # How long to wait for a git shell command to complete - maybe a bad idea
         "SHELL_TIMEOUT": 15,
+        # The git repository backend - either "persistent" (long lived
+        # git cat-file processes and in-process object writes) or
+        # "subprocess" (a git command per primitive)
+        "GIT_BACKEND": "persistent",
+        # Whether the tally and verify operations read the merged CVRs
+        # from the on-disk CVR index (see cvr_index.py) rather than
+        # walking the main branch history, and where the index lives
+        # relative to the .git directory
+        "USE_CVR_INDEX": True,
+        "CVR_INDEX_FILE": "vtp/cvr_index.sqlite3",
+        # Whether a parsed ElectionConfig is snapshotted (relative to
+        # the .git directory) and reloaded while the config.yaml and
+        # address_map.yaml files it was parsed from are unchanged
+        "ELECTION_CONFIG_SNAPSHOT": True,
+        "ELECTION_CONFIG_SNAPSHOT_FILE": "vtp/election_config.pickle",
+        # The number of shown commits show-contests keeps in memory
+        # (see commit_cache.py) and, if set, the sqlite3 file of a
+        # store of them shared by all the processes on the host
+        "COMMIT_CACHE_SIZE": 10000,
+        "COMMIT_CACHE_STORE": "",
+        # Whether accept-ballot creates the contest CVR commits with git
+        # plumbing (without touching the working tree) and pushes all
+        # of them in one atomic push rather than checking out, committing
+        # and pushing each contest branch in turn
+        "BATCH_CONTEST_COMMITS": True,
+        # Whether merge-contests creates all the merge commits of a run
+        # locally with git plumbing and then pushes main and deletes
+        # the merged branches in one atomic push rather than pushing
+        # once per merged contest
+        "BATCH_CONTEST_MERGES": True,
+        # The most merged branches a batched merge-contests deletes
+        # (and pushes main for) per atomic push
+        "MERGE_PUSH_BATCH": 1000,
+        # How many merge runtime digests worth of random bytes
+        # merge-contests draws from the CSPRNG at a time (0 draws per
+        # digest)
+        "RUNTIME_DIGEST_POOL": 256,
+        # The tabulator service: the file (relative to the bare
+        # upstream) that its post-receive hook touches on every push,
+        # how often (in seconds) that file is checked, and where the
+        # metrics are written relative to the .git directory
+        "TABULATOR_NOTIFY_FILE": "vtp-tabulator.notify",
+        "TABULATOR_POLL_INTERVAL": 0.5,
+        "TABULATOR_METRICS_FILE": "vtp/tabulator_metrics.json",
         # Number of ballots on a ballot receipt
         "BALLOT_RECEIPT_ROWS": 100,
         # Supported tallies ("rcv" defaults to sequential)
@@ -93,31 +93,28 @@ class Contest:
     _cast_keys = _blank_ballot_keys + ["selection", "cast_branch"]
     _choice_keys = ["name", "party", "ticket_names"]
 
-    # A simple numerical n digit uid
-    _uids = {}
-    _nextuid = 0
-
     @staticmethod
-    def set_uid(a_contest_blob: dict, ggo: str):
+    def set_uid(a_contest_blob: dict, ggo: str, contest_uids: dict):
         """Will add a globally unique contest uid (only good within
         the context of this specific election) to the supplied contest
-        while caching the contest_name and ggo.
+        while caching the contest_name and ggo in the election's
+        (simple numerical n digit) contest_uids.
         """
         if "uid" in a_contest_blob:
             raise IndexError(
                 f"The uid of contest {a_contest_blob['contest_name']} is already set"
             )
-        a_contest_blob["uid"] = str(Contest._nextuid).rjust(4, "0")
-        if Contest._nextuid not in Contest._uids:
-            Contest._uids[Contest._nextuid] = {}
-        Contest._uids[Contest._nextuid]["contest_name"] = a_contest_blob["contest_name"]
-        Contest._uids[Contest._nextuid]["ggo"] = ggo
-        Contest._nextuid += 1
+        nextuid = len(contest_uids)
+        a_contest_blob["uid"] = str(nextuid).rjust(4, "0")
+        contest_uids[nextuid] = {
+            "contest_name": a_contest_blob["contest_name"],
+            "ggo": ggo,
+        }
 
     @staticmethod
-    def get_uid_pp_name(uid: str):
+    def get_uid_pp_name(uid: str, contest_uids: dict):
         """Will return the contest pretty-print name of the global contest uid"""
-        return uid + " - " + Contest._uids[int(uid)]["contest_name"]
+        return uid + " - " + contest_uids[int(uid)]["contest_name"]
 
     @staticmethod
     # pylint: disable=too-many-branches
@@ -0,0 +1,254 @@
+#  VoteTrackerPlus
+#   Copyright (C) 2022 Sandy Currier
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 2 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program; if not, write to the Free Software Foundation, Inc.,
+#   51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+"""The VTP CvrIndex class - an on-disk index of the merged CVRs."""
+
+# standard imports
+import json
+import os
+import sqlite3
+
+# local imports
+from .common import Globals
+from .operation import Operation
+
+
+class CvrIndex:
+    """
+    A persistent, incrementally updated index of the CVRs that have
+    been merged to the main branch of an ElectionData workspace.
+    Each CVR commit digest is mapped to its contest uid, its position
+    in the merge order of that contest (1 being the first merged) and
+    the CVR itself.  The index is a sqlite3 database that lives in the
+    .git directory of the workspace (so it is never versioned) and
+    records the last indexed commit so that an update only needs to
+    walk the commits merged since then.
+
+    The index also holds the per contest tally checkpoints of the
+    incremental tally - the running totals of a contest as of a given
+    number of CVRs (see Tally.get_checkpoint).
+
+    If the main branch history is rewritten such that the last
+    indexed commit is no longer an ancestor, the index is rebuilt from
+    scratch.  Note that once indexed, the position of a CVR does not
+    change.
+    """
+
+    # Bump this when the schema changes - a mismatch rebuilds the index
+    _schema_version = "2"
+
+    def __init__(self, operation_self: Operation, election_config: dict):
+        """Open (creating if need be) the index of the workspace"""
+        self.operation_self = operation_self
+        self.election_config = election_config
+        self.backend = operation_self.git_backend(election_config.get("git_rootdir"))
+        self.filename = self.backend.git_path(Globals.get("CVR_INDEX_FILE"))
+        os.makedirs(os.path.dirname(self.filename), exist_ok=True)
+        self.connection = sqlite3.connect(self.filename)
+        self.connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS cvrs (
+                seq INTEGER PRIMARY KEY,
+                digest TEXT NOT NULL UNIQUE,
+                uid TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                cvr TEXT NOT NULL);
+            CREATE INDEX IF NOT EXISTS cvrs_by_uid ON cvrs (uid, position);
+            CREATE TABLE IF NOT EXISTS checkpoints (
+                uid TEXT PRIMARY KEY,
+                tally TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                head TEXT NOT NULL,
+                state TEXT NOT NULL);
+            """
+        )
+        if self.get_meta("schema") != CvrIndex._schema_version:
+            self.clear()
+
+    def close(self):
+        """Close the underlying database"""
+        self.connection.close()
+
+    def get_meta(self, key: str) -> str:
+        """Return a meta value or "" if not set"""
+        row = self.connection.execute(
+            "SELECT value FROM meta WHERE key = ?", (key,)
+        ).fetchone()
+        return row[0] if row else ""
+
+    def clear(self):
+        """Empty the index (and the tally checkpoints)"""
+        with self.connection:
+            self.connection.execute("DELETE FROM cvrs")
+            self.connection.execute("DELETE FROM checkpoints")
+            self.connection.execute("DELETE FROM meta")
+            self.connection.execute(
+                "INSERT INTO meta VALUES ('schema', ?)", (CvrIndex._schema_version,)
+            )
+
+    def update(self, rev: str = "HEAD") -> int:
+        """
+        Index the CVRs merged between the last indexed commit and rev
+        (which should be the main branch) and return the number of
+        CVRs added.
+        """
+        head = self.backend.rev_parse(rev)
+        last = self.get_meta("head")
+        if head == last:
+            return 0
+        if last and not self.backend.is_ancestor(last, head):
+            self.operation_self.imprimir(
+                f"The CVR index commit ({last}) is no longer on {rev} - rebuilding the index",
+                2,
+            )
+            self.clear()
+            last = ""
+        counts = dict(
+            self.connection.execute("SELECT uid, COUNT(*) FROM cvrs GROUP BY uid")
+        )
+        added = 0
+        with self.connection:
+            for digest, cvr in self.operation_self.cvr_stream_git_log(
+                ["--topo-order", "--no-merges", "--reverse"]
+                + [f"{last}..{head}" if last else head],
+                self.election_config,
+                incoming_printlevel=5,
+            ):
+                uid = cvr["contestCVR"]["uid"]
+                # an already indexed CVR keeps its position
+                if self.connection.execute(
+                    "INSERT OR IGNORE INTO cvrs (digest, uid, position, cvr) "
+                    "VALUES (?, ?, ?, ?)",
+                    (digest, uid, counts.get(uid, 0) + 1, json.dumps(cvr)),
+                ).rowcount:
+                    counts[uid] = counts.get(uid, 0) + 1
+                    added += 1
+            self.connection.execute(
+                "INSERT OR REPLACE INTO meta VALUES ('head', ?)", (head,)
+            )
+        self.operation_self.imprimir(
+            f"Indexed {added} CVRs up to commit {head} ({self.filename})", 5
+        )
+        return added
+
+    def contest_batches(self, contest_uid: str = "", after: int = 0) -> dict:
+        """
+        Return the indexed CVRs in the same form as
+        Operation.cvr_parse_git_log_output - a dictionary keyed on the
+        contest uid of lists of CVRs (with a 'digest' key added) - in
+        merge order.  If contest_uid is supplied, only that contest is
+        returned and after can skip its first N CVRs.
+        """
+        query = "SELECT digest, uid, cvr FROM cvrs"
+        params = ()
+        if contest_uid:
+            query += " WHERE uid = ? AND position > ?"
+            params = (contest_uid, after)
+        contest_batches = {}
+        for digest, uid, blob in self.connection.execute(
+            query + " ORDER BY seq", params
+        ):
+            cvr = json.loads(blob)
+            cvr["digest"] = digest
+            contest_batches.setdefault(uid, []).append(cvr)
+        return contest_batches
+
+    def contest_uids(self) -> list:
+        """Return the sorted uids of the indexed contests"""
+        return [
+            row[0]
+            for row in self.connection.execute(
+                "SELECT DISTINCT uid FROM cvrs ORDER BY uid"
+            )
+        ]
+
+    def reference_cvr(self, contest_uid: str) -> dict:
+        """Return the first merged CVR of a contest (with a 'digest' key)"""
+        digest, blob = self.connection.execute(
+            "SELECT digest, cvr FROM cvrs WHERE uid = ? AND position = 1",
+            (contest_uid,),
+        ).fetchone()
+        cvr = json.loads(blob)
+        cvr["digest"] = digest
+        return cvr
+
+    def contest_count(self, contest_uid: str) -> int:
+        """Return the number of indexed CVRs of a contest"""
+        return self.connection.execute(
+            "SELECT COUNT(*) FROM cvrs WHERE uid = ?", (contest_uid,)
+        ).fetchone()[0]
+
+    def lookup(self, digests: list) -> dict:
+        """
+        Return a digest -> (contest uid, position) dictionary of those
+        supplied digests that are indexed.
+        """
+        found = {}
+        # in chunks well below the sqlite host parameter limit
+        for start in range(0, len(digests), 500):
+            end = min(start + 500, len(digests))
+            chunk = digests[start:end]
+            for digest, uid, position in self.connection.execute(
+                "SELECT digest, uid, position FROM cvrs WHERE digest IN "
+                f"({', '.join('?' * len(chunk))})",
+                chunk,
+            ):
+                found[digest] = (uid, position)
+        return found
+
+    def contest_counts(self, contest_uids: list) -> dict:
+        """Return a contest uid -> number of indexed CVRs dictionary"""
+        return dict(
+            self.connection.execute(
+                "SELECT uid, COUNT(*) FROM cvrs WHERE uid IN "
+                f"({', '.join('?' * len(contest_uids))}) GROUP BY uid",
+                contest_uids,
+            )
+        )
+
+    def get_checkpoint(self, contest_uid: str, tally: str) -> tuple:
+        """
+        Return the (position, state) tally checkpoint of a contest or
+        None if there is no checkpoint for that tally.
+        """
+        row = self.connection.execute(
+            "SELECT position, state FROM checkpoints WHERE uid = ? AND tally = ?",
+            (contest_uid, tally),
+        ).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
+
+    def set_checkpoint(self, contest_uid: str, tally: str, position: int, state):
+        """Record the tally checkpoint of a contest as of position CVRs"""
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?)",
+                (
+                    contest_uid,
+                    tally,
+                    position,
+                    self.get_meta("head"),
+                    json.dumps(state),
+                ),
+            )
+
+
+# EOF
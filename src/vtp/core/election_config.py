@@ -18,19 +18,23 @@
 """The VTP ElectionConfig class - everything needed to parse the config.yaml tree."""
 
 # standard imports
+import hashlib
 import os
+import pickle
 import re
+import threading
 
 import networkx
 import yaml
 
 # local imports
+from .address_matcher import AddressMatcher
 from .common import Globals
 from .contest import Contest
 from .operation import Operation
 
 
-# pylint: disable=too-many-instance-attributes
+# pylint: disable=too-many-instance-attributes,too-many-public-methods
 class ElectionConfig:
     """A class to parse all the VTP election config.yaml files and
     return a VTP election config.
@@ -96,14 +100,26 @@ class ElectionConfig:
     _address_map_keys = ["unique-ballots"]
     _address_map_subkeys = ["addresses", "ggos"]
 
-    # A simple numerical n digit GGO uid
-    _uids = {}
-    _nextuid = 0
-
-    # A private cache of ElectionConfig data of length one so that
-    # repeatably hitting the same EDF (Election Data File) is
-    # optimized.
-    _election_data = None
+    # A private registry of the parsed ElectionConfigs keyed on their
+    # git_rootdir, so that repeatably hitting the same EDF (Election
+    # Data File) workspace is optimized and a long lived process (the
+    # web-api) can serve many workspaces.  Each entry has its own lock
+    # so that an election is only parsed once while different ones
+    # can be parsed concurrently.
+    _registry = {}
+    _registry_lock = threading.Lock()
+    # The git_rootdir of each (real path of an) election_data_dir
+    # already configured
+    _registry_dirs = {}
+
+    # The yaml files are read with the libyaml (C) BaseLoader when
+    # PyYAML was built with it - like BaseLoader, all the scalars are
+    # read as strings
+    _yaml_loader = getattr(yaml, "CBaseLoader", yaml.BaseLoader)
+
+    # Bump this when the parsed ElectionConfig or the snapshot
+    # changes - a mismatch reparses the config tree
+    _snapshot_version = "3"
 
     @staticmethod
     def configure_election(operation_self: Operation, election_data_dir: str):
@@ -114,50 +130,74 @@ class ElectionConfig:
         """
         # Safety check
         Globals.verify_election_data_dir(election_data_dir)
-        # Always call the constructor - sets the absolute path to
+        # A repeat of an already configured election_data_dir need
+        # not run any git commands
+        data_dir = os.path.realpath(election_data_dir or ".")
+        with ElectionConfig._registry_lock:
+            entry = ElectionConfig._registry.get(
+                ElectionConfig._registry_dirs.get(data_dir), {}
+            )
+            if entry.get("config") is not None:
+                return entry["config"]
+        # Otherwise call the constructor - sets the absolute path to
         # election_data_dir.  It will call git rev-parse but at the
         # moment that is required to determine the exact root of the
         # ElectionData tree (as the CWD can move around etc).
         incoming_ec = ElectionConfig(operation_self, election_data_dir)
-        # Now, if the git_rootdir is different than the previous
-        # constructor call, parse the new tree even though the EDF is
-        # the same.  Two design notes: 1) if the git_rootdir is stored
-        # some place else or differently other than in the
-        # ElectionConfig object, then different EDF workspaces could
-        # share the same EDF data while supporting multiple EDF git
-        # workspaces (required with the web-api interface); and 2)
-        # caching the last constructor call avoids multiple scans of
-        # the same ElectionData tree.  But if in a web based demo, the
-        # incoming requests will be dynamically varying over different
-        # guid based workspaces etc, so either keep a stack of them
-        # which all could consume memory or just optimize for repeated
-        # hits by the same client (into the same workspace).  So, for
-        # now, implementing the latter.
-
-        # 2024/04/12: HOWEVER, doing the latter will not recreate the
-        # same ED since the ggo uids will increment (they are a class
-        # variable).  So, either move _uid and _next_uid to instance
-        # variables or simply do not parse a new ED ever (for this
-        # process instance).  Since it is considered illegitimate to
-        # parse multiple different ED's, pick the latter again.
-        if ElectionConfig._election_data is not None:
-            return ElectionConfig._election_data
-        # Parses the actual election_data_dir
-        ElectionConfig._election_data = incoming_ec
-        ElectionConfig._election_data.parse_configs()
-        # Returns self
-        return ElectionConfig._election_data
+        # Now, return the ElectionConfig previously parsed from the
+        # same git_rootdir if there is one.  Since the GGO and contest
+        # uids are instance variables, each workspace (for example
+        # each guid based web-api client workspace) gets the same
+        # uids as a fresh process parsing it would.
+        with ElectionConfig._registry_lock:
+            entry = ElectionConfig._registry.setdefault(
+                incoming_ec.git_rootdir, {"lock": threading.Lock(), "config": None}
+            )
+        with entry["lock"]:
+            if entry["config"] is None:
+                # Parses the actual election_data_dir - or loads the
+                # snapshot of the previous parse when none of the
+                # config files changed
+                if not (
+                    Globals.get("ELECTION_CONFIG_SNAPSHOT")
+                    and incoming_ec.load_snapshot()
+                ):
+                    incoming_ec.parse_configs()
+                    if Globals.get("ELECTION_CONFIG_SNAPSHOT"):
+                        incoming_ec.save_snapshot()
+                entry["config"] = incoming_ec
+        with ElectionConfig._registry_lock:
+            ElectionConfig._registry_dirs[data_dir] = incoming_ec.git_rootdir
+        # Returns the parsed ElectionConfig
+        return entry["config"]
 
     @staticmethod
-    def get_next_uid(ggo: str):
+    def forget_election(git_rootdir: str):
+        """
+        Drop a parsed ElectionConfig from the registry - the next
+        configure_election of that workspace parses it anew.  Useful
+        when a workspace is deleted or its config changes.
+        """
+        git_rootdir = os.path.realpath(git_rootdir)
+        with ElectionConfig._registry_lock:
+            ElectionConfig._registry.pop(git_rootdir, None)
+            for data_dir, rootdir in list(ElectionConfig._registry_dirs.items()):
+                if rootdir == git_rootdir:
+                    del ElectionConfig._registry_dirs[data_dir]
+
+    @staticmethod
+    def blob_digest(data: bytes) -> str:
+        """Return the git blob object name of some file content"""
+        return hashlib.sha1(b"blob %d\0%s" % (len(data), data)).hexdigest()
+
+    def get_next_uid(self, ggo: str):
         """Will return the next GGO uid (only good within the context of
         this specific election)
         """
-        this_uid = str(ElectionConfig._nextuid).rjust(3, "0")
-        if this_uid in ElectionConfig._uids:
+        this_uid = str(len(self.ggo_uids)).rjust(3, "0")
+        if this_uid in self.ggo_uids:
             raise KeyError(f"A GGO uid cannot be reused (ggo={ggo}, uid={this_uid})")
-        ElectionConfig._nextuid += 1
-        ElectionConfig._uids[this_uid] = ggo
+        self.ggo_uids[this_uid] = ggo
         return this_uid
 
     @staticmethod
@@ -261,6 +301,17 @@ class ElectionConfig:
         )
         self.parsed_configs = ["."]
         self.uid = None
+        # The git blob object name of each parsed (or looked for)
+        # config and address_map file ("" if it does not exist) - the
+        # key of the parsed ElectionConfig snapshot
+        self.config_files = {}
+        # The simple numerical n digit GGO and contest uids of this
+        # election
+        self.ggo_uids = {}
+        self.contest_uids = {}
+        # The compiled address_map patterns per leaf GGO (created on
+        # first use)
+        self.address_matchers = {}
 
         # Check result2 - determine the initial commit to branch the CVRs and
         # RECEIPTS from
@@ -304,6 +355,8 @@ class ElectionConfig:
             return self.git_rootdir
         if name == "git_initial_commit":
             return self.git_initial_commit
+        if name == "contest_uids":
+            return self.contest_uids
         raise NameError(
             (
                 f"Name {name} is not a supported root level key "
@@ -355,10 +408,25 @@ class ElectionConfig:
         """Wrapper"""
         return networkx.descendants(self.digraph, node)
 
+    def get_address_matcher(self, leaf_node: str) -> AddressMatcher:
+        """Return the compiled address_map patterns of a leaf GGO"""
+        if leaf_node not in self.address_matchers:
+            self.address_matchers[leaf_node] = AddressMatcher(self, leaf_node)
+        return self.address_matchers[leaf_node]
+
     def __str__(self):
         """Return the serialization of this instance's ElectionConfig dictionary"""
         return str(list(self.get_dag("topo")))
 
+    def read_yaml_file(self, filename: str):
+        """Read a yaml file, recording its blob object name"""
+        with open(filename, "rb") as yaml_file:
+            data = yaml_file.read()
+        self.config_files[os.path.relpath(filename, self.git_rootdir)] = (
+            ElectionConfig.blob_digest(data)
+        )
+        return yaml.load(data, Loader=ElectionConfig._yaml_loader)
+
     def read_address_map(self, filename: str):
         """
         Read the address_map yaml file return the dictionary but
@@ -366,11 +434,11 @@ class ElectionConfig:
         """
         if os.path.isfile(filename):
             self.operation_self.imprimir(f"Reading {filename}", 5)
-            with open(filename, "r", encoding="utf8") as map_file:
-                this_address_map = yaml.load(map_file, Loader=yaml.BaseLoader)
+            this_address_map = self.read_yaml_file(filename)
             # sanity-check it
             ElectionConfig.check_address_map_syntax(this_address_map, filename)
             return this_address_map
+        self.config_files[os.path.relpath(filename, self.git_rootdir)] = ""
         return {}
 
     def read_config_file(self, filename: str):
@@ -378,15 +446,14 @@ class ElectionConfig:
         Read the config yaml file return the dictionary and check the syntax.
         """
         self.operation_self.imprimir(f"Reading {filename}", 5)
-        with open(filename, "r", encoding="utf8") as config_file:
-            config = yaml.load(config_file, Loader=yaml.BaseLoader)
+        config = self.read_yaml_file(filename)
         # sanity-check it
         ElectionConfig.check_config_syntax(config, filename)
         # should really sanity check the contests too
         if "contests" in config:
             for contest in config["contests"]:
                 Contest.check_contest_blob_syntax(contest, filename, set_defaults=True)
-                Contest.set_uid(contest, ".")
+                Contest.set_uid(contest, ".", self.contest_uids)
         #        import pdb; pdb.set_trace()
         return config
 
@@ -492,7 +559,7 @@ class ElectionConfig:
                             kind=ggo_kind,
                             config=this_config,
                             ggo_name=ggo,
-                            uid=ElectionConfig.get_next_uid(ggo),
+                            uid=self.get_next_uid(ggo),
                             address_map=this_address_map,
                             subdir=os.path.join(subdir, ggo_kind, ggo),
                         )
@@ -511,11 +578,87 @@ class ElectionConfig:
             config=config,
             address_map=address_map,
             ggo_name="root",
-            uid=ElectionConfig.get_next_uid("."),
+            uid=self.get_next_uid("."),
             subdir=".",
         )
         recursively_parse_tree("GGOs", ".")
 
+    def snapshot_file(self) -> str:
+        """Return the location of the parsed ElectionConfig snapshot"""
+        return self.operation_self.git_backend(self.git_rootdir).git_path(
+            Globals.get("ELECTION_CONFIG_SNAPSHOT_FILE")
+        )
+
+    def config_files_unchanged(self, config_files: dict) -> bool:
+        """
+        Return whether the config and address_map files are still
+        the ones recorded in config_files
+        """
+        for name, digest in config_files.items():
+            filename = os.path.join(self.git_rootdir, name)
+            if not os.path.isfile(filename):
+                if digest:
+                    return False
+                continue
+            with open(filename, "rb") as infile:
+                if ElectionConfig.blob_digest(infile.read()) != digest:
+                    return False
+        return True
+
+    def save_snapshot(self):
+        """
+        Save the parsed config tree - the DAG plus the GGO and contest
+        uids handed out while parsing it - keyed on the blob object
+        names of the config and address_map files that were read.
+        """
+        filename = self.snapshot_file()
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        snapshot = {
+            "version": ElectionConfig._snapshot_version,
+            "config_files": self.config_files,
+            "parsed_configs": self.parsed_configs,
+            "digraph": self.digraph,
+            "ggo_uids": self.ggo_uids,
+            "contest_uids": self.contest_uids,
+        }
+        # Write and rename so that concurrent readers never see a
+        # partial snapshot
+        with open(f"{filename}.{os.getpid()}", "wb") as outfile:
+            pickle.dump(snapshot, outfile, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(f"{filename}.{os.getpid()}", filename)
+        self.operation_self.imprimir(f"Saved the ElectionConfig snapshot {filename}", 5)
+
+    def load_snapshot(self) -> bool:
+        """
+        Load the parsed config tree from the snapshot if none of its
+        config and address_map files changed.  Returns whether it was
+        loaded.
+        """
+        filename = self.snapshot_file()
+        try:
+            with open(filename, "rb") as infile:
+                snapshot = pickle.load(infile)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            return False
+        if snapshot.get(
+            "version"
+        ) != ElectionConfig._snapshot_version or not self.config_files_unchanged(
+            snapshot["config_files"]
+        ):
+            self.operation_self.imprimir(
+                f"The ElectionConfig snapshot {filename} is stale", 5
+            )
+            return False
+        self.config_files = snapshot["config_files"]
+        self.parsed_configs = snapshot["parsed_configs"]
+        self.digraph = snapshot["digraph"]
+        self.ggo_uids = snapshot["ggo_uids"]
+        self.contest_uids = snapshot["contest_uids"]
+        self.operation_self.imprimir(
+            f"Loaded the ElectionConfig snapshot {filename}", 5
+        )
+        return True
+
     def gen_unique_ggo_name(self, active_ggos, filename):
         """
         Given a set of active ggos, create a unique ggo name.  For the
@@ -0,0 +1,541 @@
+#  VoteTrackerPlus
+#   Copyright (C) 2022 Sandy Currier
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 2 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program; if not, write to the Free Software Foundation, Inc.,
+#   51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+"""The git repository backends used by the VTP operations."""
+
+# standard imports
+import hashlib
+import os
+import subprocess
+import tempfile
+import threading
+import zlib
+
+# local imports
+from .common import Globals
+
+
+class GitBackend:
+    """
+    The subprocess git repository backend - every primitive is a
+    fork/exec of a git command via Operation.shell_out.  This is the
+    original behavior of the ops and is retained as the fallback when
+    the persistent backend cannot be used.
+
+    The primitives are the read/commit/branch/ref operations the ops
+    actually need.  Read primitives always execute (even when
+    printonly is set) since they do not change the workspace.  It is
+    up to the caller to not call the write primitives when printonly.
+    """
+
+    @staticmethod
+    def create(operation_self, git_rootdir: str):
+        """
+        Return the configured (Globals GIT_BACKEND) backend for the
+        supplied workspace, falling back to the subprocess backend if
+        the persistent backend cannot be started.
+        """
+        if Globals.get("GIT_BACKEND") == "persistent":
+            try:
+                return PersistentGitBackend(operation_self, git_rootdir)
+            except (OSError, subprocess.SubprocessError) as error:
+                operation_self.imprimir(
+                    f"cannot start the persistent git backend ({error}) - "
+                    "falling back to the subprocess backend",
+                    2,
+                )
+        return GitBackend(operation_self, git_rootdir)
+
+    def __init__(self, operation_self, git_rootdir: str):
+        """
+        The operation_self supplies shell_out and imprimir (and is
+        re-pointed to the current operation by Operation.git_backend).
+        """
+        self.operation_self = operation_self
+        self.git_rootdir = git_rootdir
+
+    def git(self, argv: list, check: bool = True, **kwargs):
+        """Run a git command in the workspace and return the CompletedProcess"""
+        if "text" not in kwargs:
+            kwargs["text"] = True
+        with self.operation_self.changed_cwd(self.git_rootdir):
+            return self.operation_self.shell_out(
+                ["git"] + argv,
+                printonly_override=True,
+                incoming_printlevel=5,
+                check=check,
+                capture_output=True,
+                **kwargs,
+            )
+
+    def close(self):
+        """Release any resources - nothing to do for subprocesses"""
+
+    # Read primitives
+
+    def rev_parse(self, rev: str) -> str:
+        """Return the full object name of rev or "" if it does not exist"""
+        return self.git(
+            ["rev-parse", "--verify", "--quiet", rev + "^{object}"], check=False
+        ).stdout.strip()
+
+    def current_branch(self) -> str:
+        """Return the name of the checked out branch (HEAD if detached)"""
+        return self.git(["rev-parse", "--abbrev-ref", "HEAD"]).stdout.strip()
+
+    def git_path(self, name: str) -> str:
+        """Return the absolute path of name inside the .git directory"""
+        return os.path.join(
+            self.git_rootdir,
+            self.git(["rev-parse", "--git-path", name]).stdout.strip(),
+        )
+
+    def is_ancestor(self, ancestor: str, rev: str) -> bool:
+        """Return True if commit ancestor is reachable from rev"""
+        return (
+            self.git(
+                ["merge-base", "--is-ancestor", ancestor, rev], check=False
+            ).returncode
+            == 0
+        )
+
+    def object_types(self, revs: list) -> list[tuple[str, str]]:
+        """
+        Return a (name, type) tuple for each supplied rev in order.
+        The type is 'missing' when the object does not exist.
+        """
+        if not revs:
+            return []
+        return [
+            tuple(line.split()[:2])
+            for line in self.git(
+                [
+                    "cat-file",
+                    "--buffer",
+                    "--batch-check=%(objectname) %(objecttype)",
+                ],
+                input="\n".join(revs) + "\n",
+            ).stdout.splitlines()
+        ]
+
+    def read_object(self, rev: str) -> tuple[str, bytes]:
+        """Return the (type, raw contents) of rev - raises KeyError if missing"""
+        result = self.git(
+            ["cat-file", "--batch"], input=(rev + "\n").encode("utf8"), text=False
+        )
+        header, _, body = result.stdout.partition(b"\n")
+        fields = header.decode("utf8").split()
+        if len(fields) != 3:
+            raise KeyError(f"git object ({rev}) does not exist")
+        return fields[1], body[: int(fields[2])]
+
+    def read_objects(self, revs: list) -> list[tuple[str, bytes]]:
+        """
+        Return the (type, raw contents) of each supplied rev in order,
+        read in a single 'git cat-file --batch' pass.  The type is
+        'missing' (and the contents empty) when the object does not
+        exist.
+        """
+        if not revs:
+            return []
+        output = self.git(
+            ["cat-file", "--buffer", "--batch"],
+            input=("\n".join(revs) + "\n").encode("utf8"),
+            text=False,
+        ).stdout
+        objects = []
+        offset = 0
+        for _ in revs:
+            end = output.index(b"\n", offset)
+            fields = output[offset:end].decode("utf8").split()
+            offset = end + 1
+            if len(fields) != 3:
+                objects.append(("missing", b""))
+                continue
+            # the contents are followed by a newline
+            end = offset + int(fields[2])
+            objects.append((fields[1], output[offset:end]))
+            offset = end + 1
+        return objects
+
+    def commit_message(self, rev: str) -> str:
+        """Return the commit message (the %B) of a commit"""
+        kind, body = self.read_object(rev)
+        if kind != "commit":
+            raise KeyError(f"git object ({rev}) is a {kind} and not a commit")
+        return body.partition(b"\n\n")[2].decode("utf8")
+
+    def commit_parents_and_tree(self, rev: str) -> tuple[list, str]:
+        """Return the parent commit names and the tree name of a commit"""
+        kind, body = self.read_object(rev)
+        if kind != "commit":
+            raise KeyError(f"git object ({rev}) is a {kind} and not a commit")
+        parents = []
+        tree = ""
+        for line in body.partition(b"\n\n")[0].decode("utf8").splitlines():
+            if line.startswith("tree "):
+                tree = line[5:]
+            elif line.startswith("parent "):
+                parents.append(line[7:])
+        return parents, tree
+
+    def tree_entries(self, tree: str) -> list[tuple[str, str, str]]:
+        """Return the (mode, name, object name) entries of a tree"""
+        entries = []
+        for line in self.git(["ls-tree", "-z", tree]).stdout.split("\0"):
+            if not line:
+                continue
+            meta, name = line.split("\t", 1)
+            mode, kind, sha = meta.split()
+            # ls-tree zero pads the tree mode while tree objects do not
+            entries.append(("40000" if kind == "tree" else mode, name, sha))
+        return entries
+
+    def changed_paths(self, rev: str) -> list[str]:
+        """Return the paths a commit changes relative to its first parent"""
+        return self.git(
+            ["diff-tree", "--no-commit-id", "-r", "--name-only", rev]
+        ).stdout.split()
+
+    def list_refs(self, patterns: list) -> dict:
+        """Return a refname -> object name dictionary of the matching refs"""
+        refs = {}
+        for line in self.git(
+            ["for-each-ref", "--format=%(objectname) %(refname)"] + patterns
+        ).stdout.splitlines():
+            sha, refname = line.split(" ", 1)
+            refs[refname] = sha
+        return refs
+
+    # Write primitives
+
+    def hash_object(self, data: bytes, kind: str = "blob") -> str:
+        """Write an object to the object store and return its name"""
+        return (
+            self.git(
+                ["hash-object", "-w", "-t", kind, "--stdin"], input=data, text=False
+            )
+            .stdout.decode("utf8")
+            .strip()
+        )
+
+    def write_tree(self, entries: list) -> str:
+        """
+        Write a tree from a list of (mode, name, object name) entries
+        and return the name of the tree.
+        """
+        lines = []
+        for mode, name, sha in entries:
+            kind = "tree" if mode == "40000" else "blob"
+            lines.append(f"{mode} {kind} {sha}\t{name}")
+        return self.git(["mktree", "-z"], input="\0".join(lines) + "\0").stdout.strip()
+
+    def replace_path(
+        self, tree: str, path: str, blob: str, mode: str = "100644"
+    ) -> str:
+        """
+        Return the name of a new tree that is tree with the file at
+        path (a '/' separated path) set to blob.  Missing intermediate
+        directories are created.
+        """
+        name, _, rest = path.partition("/")
+        entries = self.tree_entries(tree) if tree else []
+        subtree = ""
+        for entry in entries:
+            if entry[1] == name:
+                subtree = entry[2] if entry[0] == "40000" else ""
+                break
+        entries = [entry for entry in entries if entry[1] != name]
+        if rest:
+            entries.append(
+                ("40000", name, self.replace_path(subtree, rest, blob, mode))
+            )
+        else:
+            entries.append((mode, name, blob))
+        return self.write_tree(entries)
+
+    def commit_tree(self, tree: str, parents: list, message: str) -> str:
+        """Create a commit object (honoring the GIT_*_DATE EV's) and return its name"""
+        argv = ["commit-tree", tree]
+        for parent in parents:
+            argv += ["-p", parent]
+        # like 'git commit-tree -m', terminate the message with a newline
+        if not message.endswith("\n"):
+            message += "\n"
+        return self.git(argv, input=message).stdout.strip()
+
+    def update_refs(self, updates: list):
+        """
+        Atomically apply a list of (refname, new, old) ref updates in
+        one transaction.  An empty new deletes the ref and an empty old
+        skips the old value verification.
+        """
+        lines = []
+        for refname, new, old in updates:
+            if new:
+                lines.append(f"update {refname} {new} {old}".rstrip())
+            else:
+                lines.append(f"delete {refname} {old}".rstrip())
+        self.git(["update-ref", "--stdin"], input="\n".join(lines) + "\n")
+
+
+class PersistentGitBackend(GitBackend):
+    """
+    A git repository backend that keeps long lived 'git cat-file
+    --batch' and '--batch-check' processes open per workspace for the
+    read primitives and writes new (loose) objects in-process.  Ref
+    updates and the network still go through git commands.
+
+    The object store is only written in-process for sha1 repos - for
+    anything else the write primitives fall back to the subprocess
+    implementations.
+    """
+
+    def __init__(self, operation_self, git_rootdir: str):
+        """Starts nothing - the batch processes are started on first use"""
+        super().__init__(operation_self, git_rootdir)
+        git_dir, objects_dir, object_format = (
+            self.git(
+                [
+                    "rev-parse",
+                    "--git-dir",
+                    "--git-path",
+                    "objects",
+                    "--show-object-format",
+                ]
+            )
+            .stdout.strip()
+            .splitlines()
+        )
+        self.git_dir = os.path.join(git_rootdir, git_dir)
+        self.objects_dir = os.path.join(git_rootdir, objects_dir)
+        self.inprocess_writes = object_format == "sha1"
+        self.processes = {}
+        self.lock = threading.Lock()
+        self.idents = {}
+
+    def close(self):
+        """Shut down the batch processes"""
+        with self.lock:
+            for process in self.processes.values():
+                process.stdin.close()
+                process.wait()
+            self.processes = {}
+
+    def batch(self, mode: str, rev: str) -> tuple[list, bytes]:
+        """
+        Send one rev to the long lived 'git cat-file --<mode>' process
+        and return the split header line and (for --batch) the object
+        contents.  Caller must hold self.lock.
+        """
+        if mode not in self.processes or self.processes[mode].poll() is not None:
+            self.operation_self.imprimir(
+                f"Running (git cat-file --{mode}) persistently", 5
+            )
+            # pylint: disable=consider-using-with
+            self.processes[mode] = subprocess.Popen(
+                ["git", "cat-file", f"--{mode}"],
+                cwd=self.git_rootdir,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+            )
+        process = self.processes[mode]
+        process.stdin.write(rev.encode("utf8") + b"\n")
+        process.stdin.flush()
+        header = process.stdout.readline().decode("utf8").split()
+        if mode == "batch" and len(header) == 3:
+            # the contents are followed by a newline
+            return header, process.stdout.read(int(header[2]) + 1)[:-1]
+        return header, b""
+
+    def rev_parse(self, rev: str) -> str:
+        """Return the full object name of rev or "" if it does not exist"""
+        with self.lock:
+            header, _ = self.batch("batch-check", rev)
+        return header[0] if len(header) == 3 else ""
+
+    def git_path(self, name: str) -> str:
+        """Return the absolute path of name inside the .git directory"""
+        return os.path.join(self.git_dir, name)
+
+    def current_branch(self) -> str:
+        """Return the name of the checked out branch (HEAD if detached)"""
+        with open(os.path.join(self.git_dir, "HEAD"), "r", encoding="utf8") as head:
+            contents = head.read().strip()
+        if contents.startswith("ref: refs/heads/"):
+            return contents.removeprefix("ref: refs/heads/")
+        return "HEAD"
+
+    def object_types(self, revs: list) -> list[tuple[str, str]]:
+        """
+        Return a (name, type) tuple for each supplied rev in order.
+        The type is 'missing' when the object does not exist.
+        """
+        types = []
+        with self.lock:
+            for rev in revs:
+                header, _ = self.batch("batch-check", rev)
+                types.append(
+                    (header[0], header[1]) if len(header) >= 2 else (rev, "missing")
+                )
+        return types
+
+    def read_object(self, rev: str) -> tuple[str, bytes]:
+        """Return the (type, raw contents) of rev - raises KeyError if missing"""
+        with self.lock:
+            header, body = self.batch("batch", rev)
+        if len(header) != 3:
+            raise KeyError(f"git object ({rev}) does not exist")
+        return header[1], body
+
+    def read_objects(self, revs: list) -> list[tuple[str, bytes]]:
+        """
+        Return the (type, raw contents) of each supplied rev in order.
+        The type is 'missing' (and the contents empty) when the object
+        does not exist.
+        """
+        objects = []
+        with self.lock:
+            for rev in revs:
+                header, body = self.batch("batch", rev)
+                objects.append(
+                    (header[1], body) if len(header) == 3 else ("missing", b"")
+                )
+        return objects
+
+    def tree_entries(self, tree: str) -> list[tuple[str, str, str]]:
+        """Return the (mode, name, object name) entries of a tree"""
+        kind, body = self.read_object(tree)
+        if kind != "tree":
+            raise KeyError(f"git object ({tree}) is a {kind} and not a tree")
+        entries = []
+        offset = 0
+        while offset < len(body):
+            space = body.index(b" ", offset)
+            nul = body.index(b"\0", space)
+            name_start, digest_start, digest_end = space + 1, nul + 1, nul + 21
+            entries.append(
+                (
+                    body[offset:space].decode("utf8"),
+                    body[name_start:nul].decode("utf8"),
+                    body[digest_start:digest_end].hex(),
+                )
+            )
+            offset = digest_end
+        return entries
+
+    def changed_paths(self, rev: str) -> list[str]:
+        """Return the paths a commit changes relative to its first parent"""
+        parents, tree = self.commit_parents_and_tree(rev)
+        parent_tree = self.commit_parents_and_tree(parents[0])[1] if parents else ""
+
+        def diff(old: str, new: str, prefix: str) -> list[str]:
+            if old == new:
+                return []
+            old_entries = {e[1]: e for e in self.tree_entries(old)} if old else {}
+            new_entries = {e[1]: e for e in self.tree_entries(new)} if new else {}
+            paths = []
+            for name in sorted(set(old_entries) | set(new_entries)):
+                old_entry = old_entries.get(name, ("", "", ""))
+                new_entry = new_entries.get(name, ("", "", ""))
+                if old_entry == new_entry:
+                    continue
+                old_is_tree = old_entry[0] == "40000"
+                new_is_tree = new_entry[0] == "40000"
+                if old_is_tree or new_is_tree:
+                    paths += diff(
+                        old_entry[2] if old_is_tree else "",
+                        new_entry[2] if new_is_tree else "",
+                        prefix + name + "/",
+                    )
+                if (old_entry[0] and not old_is_tree) or (
+                    new_entry[0] and not new_is_tree
+                ):
+                    paths.append(prefix + name)
+            return paths
+
+        return diff(parent_tree, tree, "")
+
+    def hash_object(self, data: bytes, kind: str = "blob") -> str:
+        """Write a loose object to the object store and return its name"""
+        if not self.inprocess_writes:
+            return super().hash_object(data, kind)
+        raw = f"{kind} {len(data)}".encode("utf8") + b"\0" + data
+        sha = hashlib.sha1(raw).hexdigest()
+        path = os.path.join(self.objects_dir, sha[:2], sha[2:])
+        if os.path.exists(path):
+            return sha
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # write then rename so that a reader never sees a partial object
+        with tempfile.NamedTemporaryFile(
+            dir=os.path.dirname(path), prefix="tmp_obj_", delete=False
+        ) as outfile:
+            outfile.write(zlib.compress(raw))
+        os.chmod(outfile.name, 0o444)
+        os.replace(outfile.name, path)
+        return sha
+
+    def write_tree(self, entries: list) -> str:
+        """
+        Write a tree from a list of (mode, name, object name) entries
+        and return the name of the tree.
+        """
+        if not self.inprocess_writes:
+            return super().write_tree(entries)
+        # git sorts tree entries as if directory names end with a '/'
+        body = b"".join(
+            mode.encode("utf8")
+            + b" "
+            + name.encode("utf8")
+            + b"\0"
+            + bytes.fromhex(sha)
+            for mode, name, sha in sorted(
+                entries, key=lambda e: e[1] + "/" if e[0] == "40000" else e[1]
+            )
+        )
+        return self.hash_object(body, "tree")
+
+    def ident(self, which: str) -> str:
+        """
+        Return the GIT_AUTHOR_IDENT or GIT_COMMITTER_IDENT.  When the
+        date EV is set (as it always is during an election) the ident
+        is constant and is cached.
+        """
+        date_ev = os.environ.get(which.replace("IDENT", "DATE"), "")
+        if date_ev and (which, date_ev) in self.idents:
+            return self.idents[(which, date_ev)]
+        ident = self.git(["var", which]).stdout.strip()
+        if date_ev:
+            self.idents[(which, date_ev)] = ident
+        return ident
+
+    def commit_tree(self, tree: str, parents: list, message: str) -> str:
+        """Create a commit object (honoring the GIT_*_DATE EV's) and return its name"""
+        if not self.inprocess_writes:
+            return super().commit_tree(tree, parents, message)
+        lines = [f"tree {tree}"] + [f"parent {parent}" for parent in parents]
+        lines.append(f"author {self.ident('GIT_AUTHOR_IDENT')}")
+        lines.append(f"committer {self.ident('GIT_COMMITTER_IDENT')}")
+        # as does the subprocess backend, terminate the message with a newline
+        if not message.endswith("\n"):
+            message += "\n"
+        return self.hash_object(
+            ("\n".join(lines) + "\n\n" + message).encode("utf8"), "commit"
+        )
+
+
+# EOF
@@ -18,6 +18,7 @@
 """Base class of operations."""
 
 # standard imports
+import atexit
 import json
 import os
 import re
@@ -25,7 +26,10 @@ import subprocess
 from contextlib import contextmanager
 
 # local imports
+from .commit_cache import CommitCache
 from .common import Globals
+from .git_backend import GitBackend
+from .unmerged_pool import UnmergedPool
 
 # ZZZ - not sure how to best do this - could not make it work.  See:
 # https://stackoverflow.com/questions/6760685/what-is-the-best-way-of-implementing-singleton-in-python
@@ -58,6 +62,16 @@ class Operation:
     # class constants
     _sha1_regex = re.compile(r"([0-9a-fA-F]{40})")
 
+    # The git backends - one per (process, workspace) so that the
+    # persistent backend handles are shared across operations but never
+    # across forked processes
+    _git_backends = {}
+    # Likewise the pools of unmerged CVRs, one per (process, workspace)
+    _unmerged_pools = {}
+    # The cache of shown commits, one per process (commits are the
+    # same in every workspace)
+    _commit_caches = {}
+
     # Originally the design target was a singleton, but it then became apparent
     # the that design target could not be that since each op call wants to be
     # or may want to be different.
@@ -271,6 +285,55 @@ class Operation:
         #        import pdb; pdb.set_trace()
         return subprocess.run(argv_string, **kwargs)
 
+    def git_backend(self, git_rootdir: str) -> GitBackend:
+        """
+        Return the git repository backend for the supplied workspace,
+        creating it on first use.  See git_backend.py.
+        """
+        key = (os.getpid(), os.path.realpath(git_rootdir))
+        if key not in Operation._git_backends:
+            Operation._git_backends[key] = GitBackend.create(self, key[1])
+        backend = Operation._git_backends[key]
+        # print via the current operation
+        backend.operation_self = self
+        return backend
+
+    def unmerged_pool(self, git_rootdir: str) -> UnmergedPool:
+        """
+        Return the pool of unmerged CVRs of the supplied workspace,
+        first bringing it up to date with the current local and remote
+        CVR branch refs.  See unmerged_pool.py.
+        """
+        key = (os.getpid(), os.path.realpath(git_rootdir))
+        if key not in Operation._unmerged_pools:
+            Operation._unmerged_pools[key] = UnmergedPool()
+        pool = Operation._unmerged_pools[key]
+        subdir = Globals.get("CONTEST_FILE_SUBDIR")
+        pool.sync(
+            self.git_backend(git_rootdir).list_refs(
+                [f"refs/heads/{subdir}/", f"refs/remotes/origin/{subdir}/"]
+            )
+        )
+        return pool
+
+    @staticmethod
+    def commit_cache() -> CommitCache:
+        """
+        Return this process's cache of shown commits, creating it on
+        first use.  See commit_cache.py.
+        """
+        if os.getpid() not in Operation._commit_caches:
+            Operation._commit_caches[os.getpid()] = CommitCache(
+                Globals.get("COMMIT_CACHE_SIZE"), Globals.get("COMMIT_CACHE_STORE")
+            )
+        return Operation._commit_caches[os.getpid()]
+
+    @staticmethod
+    def close_git_backends():
+        """Close this process's git backends"""
+        for key in [key for key in Operation._git_backends if key[0] == os.getpid()]:
+            Operation._git_backends.pop(key).close()
+
     @contextmanager
     def changed_cwd(self, path: str):
         """Context manager for temporarily changing the CWD"""
@@ -302,63 +365,99 @@ class Operation:
             self.imprimir(f"Leaving branch ({branch})", 5)
 
     # ZZZ - could use an optional filter_by_uid argument which is a set object
+    def cvr_stream_git_log(
+        self,
+        git_log_args: list,
+        election_config: dict,
+        incoming_printlevel: int = -1,
+    ):
+        """A generator that will execute git log with the supplied
+        arguments (revisions, --topo-order, etc) and yield a (digest,
+        cvr) tuple for each commit that is a CVR, in git log order.
+        Commits that are not CVRs (merge commits and the like) are
+        skipped.
+
+        The git log output is NUL delimited (-z and a %H%x00%B
+        format) so that each commit body is parsed with a single
+        json.loads and nothing is accumulated between records.
+        """
+        git_log_command = ["git", "log", "-z", "--format=%H%x00%B"] + [
+            str(arg) for arg in git_log_args
+        ]
+        self.imprimir(f'Running ({" ".join(git_log_command)})', incoming_printlevel)
+        # Note - the cwd is passed to Popen rather than using
+        # changed_cwd since the caller runs between the yields
+        with subprocess.Popen(
+            git_log_command,
+            cwd=election_config.get("git_rootdir"),
+            stdout=subprocess.PIPE,
+        ) as git_output:
+            try:
+                # The fields alternate between the digest and the
+                # commit body, both NUL terminated.
+                pending = b""
+                digest = None
+                while chunk := git_output.stdout.read1(1 << 16):
+                    fields = (pending + chunk).split(b"\0")
+                    pending = fields.pop()
+                    for field in fields:
+                        if digest is None:
+                            digest = field.decode("utf8")
+                        else:
+                            if field.startswith(b"{"):
+                                yield digest, json.loads(field)
+                            digest = None
+                # the last body may not be NUL terminated
+                if digest is not None and pending.startswith(b"{"):
+                    yield digest, json.loads(pending)
+            finally:
+                # in case the caller stopped consuming early
+                git_output.stdout.close()
+
     def cvr_parse_git_log_output(
         self,
-        git_log_command: list,
+        git_log_args: list,
         election_config: dict,
         grouped_by_uid: bool = True,
         incoming_printlevel: int = -1,
     ):
-        """Will execute the supplied git log command and process the
-        output of those commits that are CVRs.  Will return a
+        """Will execute git log with the supplied arguments and process
+        the output of those commits that are CVRs.  Will return a
         dictionary keyed on the contest UID that is a list of CVRs.
         The CVR is just the CVR from the git log with a 'digest' key
-        added.
+        added.  See cvr_stream_git_log for the streaming version.
 
         Note the the order of the list is git log order and not
         randomized FWIIW.
         """
-        # Will process all the CVR commits on the main branch and tally
-        # all the contests found.
         git_log_cvrs = {}
-        with self.changed_cwd(election_config.get("git_rootdir")):
-            self.imprimir(f'Running ({" ".join(git_log_command)})', incoming_printlevel)
-            with subprocess.Popen(
-                git_log_command, stdout=subprocess.PIPE, text=True, encoding="utf8"
-            ) as git_output:
-                # read lines until there is a complete json object, then
-                # add the object for that contest.
-                block = ""
-                digest = ""
-                recording = False
-                # question - how to get "for line in
-                # git_output.stdout.readline():" not to effectively return
-                # the characters in line as opposed to the entire line
-                # itself?
-                while True:
-                    line = git_output.stdout.readline()
-                    if not line:
-                        break
-                    if match := re.match("^([a-f0-9]{40}){", line):
-                        digest = match.group(1)
-                        recording = True
-                        block = "{"
-                        continue
-                    if recording:
-                        block += line.strip()
-                        if re.match("^}", line):
-                            # this loads the contest under the CVR key
-                            cvr = json.loads(block)
-                            if grouped_by_uid:
-                                #                                import pdb; pdb.set_trace()
-                                cvr["digest"] = digest
-                                if cvr["contestCVR"]["uid"] in git_log_cvrs:
-                                    git_log_cvrs[cvr["contestCVR"]["uid"]].append(cvr)
-                                else:
-                                    git_log_cvrs[cvr["contestCVR"]["uid"]] = [cvr]
-                            else:
-                                git_log_cvrs[digest] = cvr
-                            block = ""
-                            digest = ""
-                            recording = False
+        for digest, cvr in self.cvr_stream_git_log(
+            git_log_args, election_config, incoming_printlevel
+        ):
+            if grouped_by_uid:
+                cvr["digest"] = digest
+                git_log_cvrs.setdefault(cvr["contestCVR"]["uid"], []).append(cvr)
+            else:
+                git_log_cvrs[digest] = cvr
         return git_log_cvrs
+
+    def cvr_read_commits(self, digests: list, election_config: dict) -> dict:
+        """Will read the supplied commits in a single git backend pass
+        and return a digest -> CVR dictionary of those that are CVRs -
+        the same as a cvr_parse_git_log_output of ['--no-walk'] +
+        digests with grouped_by_uid=False.
+        """
+        cvrs = {}
+        for digest, (kind, body) in zip(
+            digests,
+            self.git_backend(election_config.get("git_rootdir")).read_objects(digests),
+        ):
+            if kind != "commit":
+                continue
+            message = body.partition(b"\n\n")[2]
+            if message.startswith(b"{"):
+                cvrs[digest] = json.loads(message)
+        return cvrs
+
+
+atexit.register(Operation.close_git_backends)
@@ -0,0 +1,132 @@
+#  VoteTrackerPlus
+#   Copyright (C) 2022 Sandy Currier
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 2 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program; if not, write to the Free Software Foundation, Inc.,
+#   51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+"""The VTP StvGroups class - weighted groups of identical STV rankings"""
+
+from fractions import Fraction
+
+
+# pylint: disable=too-many-instance-attributes
+class StvGroups:
+    """
+    The ballots of a STV contest batch collapsed into one group per
+    distinct ranking.  As identical rankings always count towards the
+    same choice, each group carries the combined weight of its ballots
+    and a cursor at its currently active rank, and each choice has a
+    bucket of the groups currently counting towards it along with a
+    running total.
+
+    Removing a choice (elected or eliminated) only advances the groups
+    in its bucket, and a surplus transfer scales the weights of those
+    groups in place - the quota locked part of each group's weight is
+    only kept as a running total.  So a STV tally scales with the
+    number of distinct rankings rather than the number of ballots.
+
+    The weights are exact Fractions, so the totals are identical to
+    those of a per ballot tally.
+    """
+
+    def __init__(self, contest_batch: list):
+        """Group the rankings of the contest batch"""
+        self.candidates = set()
+        index = {}
+        self.rankings = []
+        self.counts = []
+        blank_ballots = 0
+        for a_git_cvr in contest_batch:
+            ranking = tuple(a_git_cvr["contestCVR"].get("selection", []))
+            if not ranking:
+                blank_ballots += 1
+            elif ranking in index:
+                self.counts[index[ranking]] += 1
+            else:
+                index[ranking] = len(self.rankings)
+                self.rankings.append(ranking)
+                self.counts.append(1)
+                self.candidates.update(ranking)
+        self.weights = [Fraction(count) for count in self.counts]
+        self.cursors = [0] * len(self.rankings)
+        self.buckets = {}
+        self.totals = {}
+        # Blank ballots, like the quota locked weight, rank nothing
+        self.locked_ballots = blank_ballots
+        self.locked_weight = Fraction(blank_ballots)
+        self.locked_to = {}
+        self.active_weight = Fraction(sum(self.counts))
+        self.exhausted_ballots = 0
+        self.exhausted_weight = Fraction(0)
+
+    def place(self, group: int, position: int, continuing: set):
+        """
+        Move the cursor of a group to its first continuing rank at or
+        after position and count its weight there (or as exhausted).
+        """
+        ranking = self.rankings[group]
+        while position < len(ranking) and ranking[position] not in continuing:
+            position += 1
+        self.cursors[group] = position
+        if position == len(ranking):
+            self.exhausted_ballots += self.counts[group]
+            self.exhausted_weight += self.weights[group]
+            return
+        choice = ranking[position]
+        self.buckets.setdefault(choice, []).append(group)
+        self.totals[choice] = self.totals.get(choice, Fraction(0)) + self.weights[group]
+
+    def start(self, continuing: set):
+        """Count every group towards its first continuing choice"""
+        for group in range(len(self.rankings)):
+            self.place(group, 0, continuing)
+
+    def exhausted(self) -> tuple:
+        """
+        Return the number of ballots and the weight counting towards no
+        continuing choice - the blank ballots, the quota locked ballot
+        fragments and the exhausted rankings.
+        """
+        return (
+            self.locked_ballots + self.exhausted_ballots,
+            self.locked_weight + self.exhausted_weight,
+        )
+
+    def transfer_surplus(self, winner: str, transfer_fraction: Fraction):
+        """
+        Keep transfer_fraction of the weight of the groups counting
+        towards the winner active and lock the rest to the winner.
+        """
+        locked = Fraction(0)
+        for group in self.buckets.get(winner, []):
+            transfer_weight = self.weights[group] * transfer_fraction
+            locked += self.weights[group] - transfer_weight
+            self.weights[group] = transfer_weight
+            self.locked_ballots += self.counts[group]
+        self.totals[winner] *= transfer_fraction
+        self.locked_to[winner] = self.locked_to.get(winner, Fraction(0)) + locked
+        self.locked_weight += locked
+        self.active_weight -= locked
+
+    def remove(self, name: str, continuing: set):
+        """
+        The choice is no longer continuing - move the groups counting
+        towards it on to their next continuing choice.
+        """
+        self.totals.pop(name, None)
+        for group in self.buckets.pop(name, []):
+            self.place(group, self.cursors[group] + 1, continuing)
+
+
+# EOF
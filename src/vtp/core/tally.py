@@ -19,17 +19,19 @@
 
 import json
 import operator
-from collections import defaultdict
+from collections import Counter, defaultdict
 from fractions import Fraction
 from math import floor
 
 import networkx as nx
 
 # local
+from .ballot_matrix import BallotMatrix
 from .common import Globals
 from .contest import Contest
 from .exceptions import TallyException
 from .operation import Operation
+from .stv_groups import StvGroups
 
 
 # pylint: disable=too-many-instance-attributes # (8/7 - not worth it at this time)
@@ -110,7 +112,7 @@ class Tally:
         # At this point any contest tallied against this contest must
         # match all the fields with the exception of selection and
         # write-in, but that check is done in tallyho below.
-        if self.reference_contest["tally"] not in ["plurality", "rcv", "pwc"]:
+        if self.reference_contest["tally"] not in ["plurality", "rcv", "pwc", "stv"]:
             raise NotImplementedError(
                 f"the specified tally ({self.reference_contest['tally']}) is not yet implemented"
             )
@@ -118,6 +120,11 @@ class Tally:
         # Condorcet tallies
         choices = Contest.get_choices_from_contest(self.reference_contest["choices"])
         self.pairwise_matrix = {(a, b): 0 for a in choices for b in choices if a != b}
+        # The number of CVRs already folded into a restored checkpoint
+        # (see restore_checkpoint)
+        self.checkpoint_votes = 0
+        # The integer encoded rankings of a RCV tally (see tallyho)
+        self.ballot_matrix = None
 
     def init_selection_counts(self):
         """Will initialize the selection_counts to 0"""
@@ -172,6 +179,40 @@ class Tally:
             return getattr(self, name)
         raise NameError(f"Name {name} not accepted/defined for Tally.get()")
 
+    def get_checkpoint(self):
+        """
+        Return the running totals of a completed plurality or pairwise
+        Condorcet tally as a json-able object, or None for the other
+        tallies.  The RCV style tallies cannot be checkpointed as every
+        round can revisit every ballot.
+        """
+        if self.reference_contest["tally"] == "plurality":
+            return {
+                "selection_counts": self.selection_counts,
+                "vote_count": self.vote_count,
+            }
+        if self.reference_contest["tally"] == "pwc":
+            return {
+                "pairwise_matrix": [
+                    [a, b, count] for (a, b), count in self.pairwise_matrix.items()
+                ]
+            }
+        return None
+
+    def restore_checkpoint(self, checkpoint: dict, checkpoint_votes: int):
+        """
+        Restore the running totals of a get_checkpoint checkpoint
+        taken after checkpoint_votes CVRs.  A following tallyho only
+        needs to be supplied the CVRs after those.
+        """
+        # Note - update in place so to keep the choice ordering
+        for choice, count in checkpoint.get("selection_counts", {}).items():
+            self.selection_counts[choice] = count
+        self.vote_count = checkpoint.get("vote_count", 0)
+        for a, b, count in checkpoint.get("pairwise_matrix", []):
+            self.pairwise_matrix[(a, b)] = count
+        self.checkpoint_votes = checkpoint_votes
+
     def __str__(self):
         """Return the Tally in a partially print-able json string - careful ..."""
         # Note - keep cloak out of it until proven safe to include
@@ -645,7 +686,11 @@ class Tally:
             return
 
         # Loop over contest_batch and actually re-cast votes
-        total_votes = self.recast_votes(last_place_names, contest_batch, checks)
+        if self.ballot_matrix is not None:
+            self.ballot_matrix.recast(last_place_names, self.selection_counts)
+            total_votes = len(contest_batch)
+        else:
+            total_votes = self.recast_votes(last_place_names, contest_batch, checks)
         # Order the winners of this round.  This is a tuple, not a
         # list or dict.  Note - the rcv round losers should not be
         # re-ordered as there is value to retaining that order
@@ -732,7 +777,118 @@ class Tally:
         else:
             errors[digest].append(err_message)
 
-    # pylint: disable=too-many-branches
+    def validate_a_cvr(
+        self, contest: dict, digest: str, errors: dict, tally_override: str = ""
+    ):
+        """
+        Will check the syntax of a CVR and validate the values that
+        should be the same as self.reference_contest, recording any
+        errors in errors.
+        """
+        # Check contest syntax
+        Contest.check_contest_blob_syntax(contest, digest=digest)
+        # Validate the values that should be the same as
+        # self.reference_contest (win_by is optional)
+        for field in [
+            "choices",
+            "tally",
+            "win_by",
+            "max_selections",
+            "ggo",
+            "uid",
+            "contest_name",
+            "contest_type",
+            "election_upstream_remote",
+        ]:
+            if field != "win_by" and not (tally_override != "" and field == "tally"):
+                if field in self.reference_contest:
+                    if self.reference_contest[field] != contest[field]:
+                        self.add_digest_error(
+                            errors,
+                            digest,
+                            f"{field} field does not match: "
+                            f"{self.reference_contest[field]} != {contest[field]}",
+                        )
+                elif field in contest:
+                    self.add_digest_error(
+                        errors,
+                        digest,
+                        f"{field} field is not present in Tally object but "
+                        "is present in digest",
+                    )
+
+    def first_rcv_round_via_ballot_matrix(
+        self, contest_batch: list, tally_override: str = ""
+    ):
+        """
+        The BallotMatrix equivalent of parse_and_tally_a_contest for a
+        RCV tally.  On the first open seat all the CVRs are validated
+        and encoded.  Returns the number of CVRs.
+        """
+        if self.ballot_matrix is None:
+            errors = {}
+            for a_git_cvr in contest_batch:
+                self.validate_a_cvr(
+                    a_git_cvr["contestCVR"], a_git_cvr["digest"], errors, tally_override
+                )
+            if errors:
+                raise TallyException(
+                    "The following CVRs have structural errors:" f"{errors}"
+                )
+            self.ballot_matrix = BallotMatrix(contest_batch)
+        self.vote_count += self.ballot_matrix.first_round(
+            [item[0] for item in self.multiseat_winners], self.selection_counts
+        )
+        return len(contest_batch)
+
+    # pylint: disable=too-many-locals
+    def tally_grouped_pwc_rankings(self, contest_batch: list, tally_override: str = ""):
+        """
+        The grouped equivalent of parse_and_tally_a_contest for a pwc
+        tally - the CVRs are validated and the identical rankings are
+        collapsed so that the pairwise matrix is built once per
+        distinct ranking (weighted by its count) rather than once per
+        ballot.  Returns the number of CVRs.
+
+        A choice at rank i is preferred to every choice not ranked at
+        or before i.  So per ranking, each ranked choice adds its count
+        to its entire row and subtracts it back from the choices ranked
+        ahead of it - only the ranked pairs are visited and not every
+        pair of choices.
+        """
+        errors = {}
+        rankings = Counter()
+        for a_git_cvr in contest_batch:
+            contest = a_git_cvr["contestCVR"]
+            self.validate_a_cvr(contest, a_git_cvr["digest"], errors, tally_override)
+            if contest.get("selection"):
+                rankings[tuple(contest["selection"])] += 1
+        if errors:
+            raise TallyException(
+                "The following CVRs have structural errors:" f"{errors}"
+            )
+        choices = Contest.get_choices_from_contest(self.reference_contest["choices"])
+        ids = {name: index for index, name in enumerate(choices)}
+        width = len(choices)
+        row_counts = [0] * width
+        # Indexed by a * width + b
+        adjustments = [0] * (width * width)
+        for ranking, count in rankings.items():
+            # Selections that are not choices do not affect the
+            # relative order of the choices
+            ranked = [ids[name] for name in ranking if name in ids]
+            for position, a in enumerate(ranked):
+                row_counts[a] += count
+                for ahead in ranked[:position]:
+                    adjustments[a * width + ahead] -= count
+        for a, a_name in enumerate(choices):
+            for b, b_name in enumerate(choices):
+                if a != b:
+                    self.pairwise_matrix[(a_name, b_name)] += (
+                        row_counts[a] + adjustments[a * width + b]
+                    )
+        return self.checkpoint_votes + len(contest_batch)
+
     def parse_and_tally_a_contest(
         self, contest_batch: list, checks: list, tally_override: str = ""
     ):
@@ -742,7 +898,7 @@ class Tally:
         the skipping will be printed depending on verbosity.
         """
         errors = {}
-        vote_count = 0
+        vote_count = self.checkpoint_votes
         for a_git_cvr in contest_batch:
             vote_count += 1
             contest = a_git_cvr["contestCVR"]
@@ -756,39 +912,7 @@ class Tally:
                 self.safely_remove_previous_winners(contest, provenance_digest, digest)
             else:
                 self.selection_backup[digest] = contest["selection"].copy()
-            # Check contest syntax
-            Contest.check_contest_blob_syntax(contest, digest=digest)
-            # Validate the values that should be the same as
-            # self.reference_contest (win_by is optional)
-            for field in [
-                "choices",
-                "tally",
-                "win_by",
-                "max_selections",
-                "ggo",
-                "uid",
-                "contest_name",
-                "contest_type",
-                "election_upstream_remote",
-            ]:
-                if field != "win_by" and not (
-                    tally_override != "" and field == "tally"
-                ):
-                    if field in self.reference_contest:
-                        if self.reference_contest[field] != contest[field]:
-                            self.add_digest_error(
-                                errors,
-                                digest,
-                                f"{field} field does not match: "
-                                f"{self.reference_contest[field]} != {contest[field]}",
-                            )
-                    elif field in contest:
-                        self.add_digest_error(
-                            errors,
-                            digest,
-                            f"{field} field is not present in Tally object but "
-                            "is present in digest",
-                        )
+            self.validate_a_cvr(contest, digest, errors, tally_override)
             # Tally the contest - this is just the first pass of a
             # tally.  It just so happens that with plurality tallies
             # the tally can be completed with a single pass over
@@ -861,6 +985,12 @@ class Tally:
             else:
                 raise ValueError(f"Invalid value for tally_override ({tally_override})")
 
+        # Unless per CVR diagnostics are being printed, a RCV tally
+        # runs on an integer encoded BallotMatrix of the rankings
+        # rather than on (and mutating) the CVR selections, and a pwc
+        # tally counts each distinct ranking only once.
+        per_cvr_diagnostics = bool(checks) or self.operation_self.verbosity >= 4
+
         # Loop over open seats. For plurality, regardless of open
         # seats there is only one iteration - a check will exit the
         # loop. For RCV, all the following rounds are handled by
@@ -895,14 +1025,26 @@ class Tally:
             if self.reference_contest["tally"] == "stv":
                 # record winner order and call stv code
                 self.winner_order.append(self.rcv_round[0])
-                self.determine_stv_winners(contest_batch, checks)
+                if per_cvr_diagnostics:
+                    self.determine_stv_winners(contest_batch, checks)
+                else:
+                    self.determine_grouped_stv_winners(contest_batch)
                 return
 
             # parse all the CVRs and create the first round of tallys.
             # stv tallies do not leverage parse_and_tally_a_contest.
-            total_votes = self.parse_and_tally_a_contest(
-                contest_batch, checks, tally_override
-            )
+            if per_cvr_diagnostics or self.reference_contest["tally"] == "plurality":
+                total_votes = self.parse_and_tally_a_contest(
+                    contest_batch, checks, tally_override
+                )
+            elif self.reference_contest["tally"] == "rcv":
+                total_votes = self.first_rcv_round_via_ballot_matrix(
+                    contest_batch, tally_override
+                )
+            else:
+                total_votes = self.tally_grouped_pwc_rankings(
+                    contest_batch, tally_override
+                )
             # If pairwise Condorcet, though contest votes have been
             # counted, the actual tally is fundementally different then either
             # plurality or rcv.
@@ -981,7 +1123,7 @@ class Tally:
                     self.reference_contest["open_positions"]
                 ):
                     # Print final results text
-                    winners = [item[0] for item in self.multiseat_winners[0]]
+                    winners = [item[0] for item in self.multiseat_winners]
                     self.print_final_results(winners)
                     return
                 self.print_seat_results(self.winner_order, seat)
@@ -1072,6 +1214,10 @@ class Tally:
         Use networkx to build a directed acyclic graph (DAG) of pairwise victories.
         Edges are added in descending order of margin. If an edge creates a cycle,
         print and skip it. At the end, print the topological sort of the DAG.
+
+        Since the graph is acyclic before each insertion, an edge a -> b
+        creates a cycle if and only if b can already reach a - so only
+        that reachability is checked rather than the whole graph.
         """
         if not hasattr(self, "pairwise_matrix"):
             raise TallyException(
@@ -1098,17 +1244,16 @@ class Tally:
         pairwise_results.sort(key=lambda x: (x[1], x[2]), reverse=True)
 
         for (a, b), margin, ab_count, ba_count in pairwise_results:
-            condorcet_graph.add_edge(
-                a, b, margin=margin, ab_count=ab_count, ba_count=ba_count
-            )
-            if not nx.is_directed_acyclic_graph(condorcet_graph):
-                condorcet_graph.remove_edge(a, b)
+            if nx.has_path(condorcet_graph, b, a):
                 self.operation_self.imprimir(
                     f"Skipping edge {a} -> {b} (margin={margin}, {ab_count}-{ba_count}) "
                     "to avoid cycle",
                     0,
                 )
             else:
+                condorcet_graph.add_edge(
+                    a, b, margin=margin, ab_count=ab_count, ba_count=ba_count
+                )
                 self.operation_self.imprimir(
                     f"Adding edge {a} -> {b} (margin={margin}, {ab_count}-{ba_count})",
                     0,
@@ -1205,21 +1350,7 @@ class Tally:
                         )
 
             # ---- Diagnostic summary for this tally ----
-            if exhausted_ballots > 0:
-                if round_num == 1:
-                    self.operation_self.imprimir(
-                        f"  found {exhausted_ballots} blank ballot(s) "
-                        f"(weight={Globals.mixed_number(exhausted_weight)}) "
-                        "marking as exhausted",
-                        3,
-                    )
-                else:
-                    self.operation_self.imprimir(
-                        f"  exhaustion detected — "
-                        f"{exhausted_ballots} ballots, "
-                        f"total exhausted weight={Globals.mixed_number(exhausted_weight)}",
-                        3,
-                    )
+            self.print_stv_exhaustion(round_num, exhausted_ballots, exhausted_weight)
             return totals
 
         # ---- Main STV loop ----
@@ -1402,6 +1533,37 @@ class Tally:
 
         # Print summary
         # import pdb; pdb.set_trace()
+        self.print_stv_summary(total_votes, quota, elected, rounds)
+        return {
+            "quota": quota,
+            "elected": elected,
+            "rounds": rounds,
+        }
+
+    def print_stv_exhaustion(
+        self, round_num: int, exhausted_ballots: int, exhausted_weight: Fraction
+    ):
+        """Print the exhausted ballots of a STV round (if any)"""
+        if exhausted_ballots > 0:
+            if round_num == 1:
+                self.operation_self.imprimir(
+                    f"  found {exhausted_ballots} blank ballot(s) "
+                    f"(weight={Globals.mixed_number(exhausted_weight)}) "
+                    "marking as exhausted",
+                    3,
+                )
+            else:
+                self.operation_self.imprimir(
+                    f"  exhaustion detected — "
+                    f"{exhausted_ballots} ballots, "
+                    f"total exhausted weight={Globals.mixed_number(exhausted_weight)}",
+                    3,
+                )
+
+    def print_stv_summary(
+        self, total_votes: Fraction, quota: int, elected: list, rounds: list
+    ):
+        """Print the summary and the rounds of a STV tally"""
         self.operation_self.imprimir(
             f"\nSTV summary:\nTotal Votes = {total_votes}; Quota = {quota}\n"
             f"Elected = {elected}\n\n"
@@ -1430,11 +1592,135 @@ class Tally:
             0,
         )
 
+    def determine_grouped_stv_winners(self, contest_batch: list):
+        """
+        The grouped equivalent of determine_stv_winners - the same
+        Droop quota STV tally and diagnostics (less the per ballot
+        ones) but run on StvGroups, with the identical rankings
+        collapsed into weighted groups and running totals per choice.
+        """
+        seats = int(self.reference_contest.get("open_positions", 1))
+        groups = StvGroups(contest_batch)
+        continuing = set(groups.candidates)
+        elected = []
+        rounds = []
+
+        # ---- Droop quota ----
+        total_votes = groups.locked_weight + groups.active_weight
+        quota = floor(total_votes / (seats + 1)) + 1
+        self.operation_self.imprimir(f"STV: quota set to {quota}", 0)
+
+        groups.start(continuing)
+        round_num = 1
+        while len(elected) < seats and continuing:
+            locked_weight = groups.locked_weight
+            active_weight = groups.active_weight
+            self.print_stv_exhaustion(round_num, *groups.exhausted())
+            # The totals as of the start of the round
+            totals = dict(groups.totals)
+            self.operation_self.imprimir(
+                f"STV: Round {round_num}: ballot weight state — "
+                f"locked={Globals.mixed_number(locked_weight)}, "
+                f"active={Globals.mixed_number(active_weight)}, "
+                f"total={Globals.mixed_number(locked_weight + active_weight)}",
+                3,
+            )
+            rounds.append(
+                {
+                    "round": round_num,
+                    "totals": totals,
+                    "elected": elected.copy(),
+                    "continuing": sorted(continuing),
+                }
+            )
+
+            # ---- Election step ----
+            reached_quota = [c for c in continuing if totals.get(c, 0) >= quota]
+            if reached_quota:
+                reached_quota.sort(key=lambda c: totals[c], reverse=True)
+                for winner in reached_quota:
+                    self.operation_self.imprimir(
+                        f"  {winner} elected with {Globals.mixed_number(totals[winner])} votes",
+                        0,
+                    )
+                    elected.append(winner)
+                    surplus = totals[winner] - quota
+                    if surplus > 0:
+                        self.transfer_grouped_stv_surplus(
+                            groups, winner, surplus, surplus / totals[winner]
+                        )
+                    continuing.remove(winner)
+                    groups.remove(winner, continuing)
+                    self.operation_self.imprimir(
+                        f"  removing winner {winner} from further consideration",
+                        3,
+                    )
+                    if len(elected) >= seats:
+                        break
+            else:
+                # ---- Elimination step ----
+                loser = min(continuing, key=lambda c: totals.get(c, 0))
+                self.operation_self.imprimir(
+                    f"  eliminating {loser} with "
+                    f"{Globals.mixed_number(totals.get(loser, 0))} votes",
+                    3,
+                )
+                continuing.remove(loser)
+                groups.remove(loser, continuing)
+            round_num += 1
+
+        self.print_stv_summary(total_votes, quota, elected, rounds)
         return {
             "quota": quota,
             "elected": elected,
             "rounds": rounds,
         }
 
+    def transfer_grouped_stv_surplus(
+        self,
+        groups: StvGroups,
+        winner: str,
+        surplus: Fraction,
+        transfer_fraction: Fraction,
+    ):
+        """Transfer the surplus of a STV winner printing the diagnostics"""
+        total_weight_before = groups.locked_weight + groups.active_weight
+        self.operation_self.imprimir(
+            f"  transferring surplus of {Globals.mixed_number(surplus)} "
+            f"(fraction={Globals.mixed_number(transfer_fraction)}) from {winner}",
+            3,
+        )
+        self.operation_self.imprimir(
+            "  total ballot weight BEFORE transfer = "
+            f"{Globals.mixed_number(total_weight_before)}",
+            3,
+        )
+        groups.transfer_surplus(winner, transfer_fraction)
+        total_weight_after = groups.locked_weight + groups.active_weight
+        self.operation_self.imprimir(
+            f"  post-transfer ballot weights — "
+            f"locked={Globals.mixed_number(groups.locked_weight)}, "
+            f"active={Globals.mixed_number(groups.active_weight)}, "
+            f"total={Globals.mixed_number(total_weight_after)}",
+            3,
+        )
+        self.operation_self.imprimir(
+            "  total ballot weight AFTER transfer = "
+            f"{Globals.mixed_number(total_weight_after)}",
+            3,
+        )
+        assert total_weight_before == total_weight_after, (
+            "STV ERROR: total ballot weight changed during surplus transfer "
+            f"(before={Globals.mixed_number(total_weight_before)}, "
+            f"after={Globals.mixed_number(total_weight_after)})",
+            0,
+        )
+        self.operation_self.imprimir(
+            f"  surplus accounting for {winner} — "
+            f"locked_to_quota={groups.locked_to[winner]}, "
+            f"transferable_surplus={groups.active_weight}",
+            3,
+        )
+
 
 # EOF
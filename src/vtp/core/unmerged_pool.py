@@ -0,0 +1,100 @@
+#  VoteTrackerPlus
+#   Copyright (C) 2022 Sandy Currier
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 2 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program; if not, write to the Free Software Foundation, Inc.,
+#   51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+"""The VTP UnmergedPool class - the not yet merged CVRs per contest"""
+
+import random
+
+
+class UnmergedPool:
+    """
+    The digests of the pushed but not yet merged contest CVRs of a
+    workspace, per contest uid, as recorded by the CVR branch refs
+    (CONTEST_FILE_SUBDIR/<uid>/<token>).  Since the contest uid is part
+    of the branch name, the pool is maintained from the refs alone
+    without reading any commits.
+
+    Each uid's digests are held in a list along with a digest -> index
+    map, so adding a digest is an append, removing one swaps the last
+    digest into its slot, and sampling N random digests is O(N)
+    regardless of how many CVRs are pending.  A digest referenced by
+    more than one ref (a local and a remote branch for example) is
+    only pooled once.
+    """
+
+    def __init__(self):
+        """An empty pool"""
+        # refname -> digest
+        self.refs = {}
+        # digest -> number of refs pointing at it
+        self.ref_counts = {}
+        # uid -> list of digests
+        self.digests = {}
+        # digest -> (uid, index into self.digests[uid])
+        self.positions = {}
+
+    def add(self, refname: str, digest: str):
+        """Pool the digest of a CVR branch ref"""
+        self.discard(refname)
+        self.refs[refname] = digest
+        self.ref_counts[digest] = self.ref_counts.get(digest, 0) + 1
+        if digest in self.positions:
+            return
+        # The ref name ends with <uid>/<token>
+        uid = refname.split("/")[-2]
+        digests = self.digests.setdefault(uid, [])
+        self.positions[digest] = (uid, len(digests))
+        digests.append(digest)
+
+    def discard(self, refname: str):
+        """Forget a CVR branch ref (if pooled)"""
+        digest = self.refs.pop(refname, None)
+        if digest is None:
+            return
+        self.ref_counts[digest] -= 1
+        if self.ref_counts[digest]:
+            return
+        del self.ref_counts[digest]
+        uid, index = self.positions.pop(digest)
+        digests = self.digests[uid]
+        last = digests.pop()
+        if index < len(digests):
+            digests[index] = last
+            self.positions[last] = (uid, index)
+
+    def sync(self, refs: dict):
+        """
+        Bring the pool in line with a refname -> digest dictionary of
+        all the current CVR branch refs.
+        """
+        for refname in [name for name in self.refs if name not in refs]:
+            self.discard(refname)
+        for refname, digest in refs.items():
+            if self.refs.get(refname) != digest:
+                self.add(refname, digest)
+
+    def count(self, uid: str) -> int:
+        """Return the number of unmerged CVRs of a contest"""
+        return len(self.digests.get(uid, []))
+
+    def sample(self, uid: str, size: int) -> list:
+        """Return up to size randomly chosen unmerged digests of a contest"""
+        digests = self.digests.get(uid, [])
+        return random.sample(digests, min(size, len(digests)))
+
+
+# EOF
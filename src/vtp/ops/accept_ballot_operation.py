@@ -125,13 +125,9 @@ class AcceptBallotOperation(Operation):
                 f"Created contest ({contest.get('uid')}) branch ({branch}):", 4
             )
         # Get the current branch for reference
-        current_branch = self.shell_out(
-            ["git", "rev-parse", "--abbrev-ref", "HEAD"],
-            incoming_printlevel=5,
-            check=True,
-            capture_output=True,
-            text=True,
-        ).stdout.strip()
+        current_branch = self.git_backend(
+            the_election_config.get("git_rootdir")
+        ).current_branch()
         # if after 3 tries it still does not work, raise an error
         for _ in [0, 1, 2]:
             cmd1 = self.shell_out(
@@ -166,43 +162,81 @@ class AcceptBallotOperation(Operation):
         # tries have also deleted(?)
         raise RuntimeError(f"could not create git branch {branch} on the third attempt")
 
-    def get_unmerged_contests(self, config):
-        """Queries git for the unmerged CVRs and returns the list.  See
-        Shellout.cvr_parse_git_log_output for more info.  The returned
-        list is still in git log order.
+    def commit_contests_in_batch(
+        self,
+        a_ballot: dict,
+        the_election_config: dict,
+        prioritize: bool = False,
+    ) -> tuple[dict, list]:
+        """Will create the contest CVR commits of a ballot directly on
+        top of the initial commit via git plumbing - without checking
+        out a branch or touching the working tree or index - and then
+        push all the contest branches in a single atomic push.  As
+        with checkout_new_branch, if the push fails (a branch name is
+        already taken) new branch names are tried up to 3 times.
+
+        Returns the uid -> digest dictionary of the contests and the
+        list of pushed branches.
         """
-        # Mmm, at the moment the thought is that we need all the unmerged
-        # contests and ignore anything already merged.  So first get the
-        # list of HEAD commits for all the unmerged branches.  Note that
-        # since this is per contest, there should only be about 100 or so
-        # of them.
-        head_commits = (
-            self.shell_out(
-                [
-                    "git",
-                    "rev-list",
-                    "--no-walk",
-                    "--exclude=refs/heads/main",
-                    "--exclude=HEAD",
-                    "--exclude=refs/remotes/origin/main",
-                    "--exclude=refs/remotes/origin/HEAD",
-                    "--all",
-                ],
-                incoming_printlevel=5,
-                check=True,
-                capture_output=True,
-                text=True,
-            )
-            .stdout.strip()
-            .splitlines()
-        )
-        # With that list of HEAD exclusion commits, list the rest of the
-        # --yes-walk commits and scrape that for the commits of interest.
-        return self.cvr_parse_git_log_output(
-            ["git", "log", "--no-walk", "--pretty=format:%H%B"] + head_commits,
-            config,
-            incoming_printlevel=5,
+        backend = self.git_backend(the_election_config.get("git_rootdir"))
+        branchpoint = the_election_config.get("git_initial_commit")
+        base_tree = backend.commit_parents_and_tree(branchpoint)[1]
+        contest_path = os.path.relpath(
+            Ballot.gen_contest_location(
+                the_election_config, a_ballot.get("ballot_subdir")
+            ),
+            the_election_config.get("git_rootdir"),
         )
+        for _ in [0, 1, 2]:
+            contest_receipts = {}
+            branches = []
+            refspecs = []
+            for contest in a_ballot.get("contests"):
+                uid = contest.get("uid")
+                branches.append(self.new_branch_name(contest, "contest", prioritize))
+                self.imprimir(f"Created contest ({uid}) branch ({branches[-1]}):", 4)
+                # Add the cast_branch to the contest json payload
+                contest.set("cast_branch", branches[-1])
+                # As with contest_add_and_commit, the CVR is both the
+                # contest.json content and the commit message
+                payload = Ballot.gen_contest_payload(contest)
+                tree = backend.replace_path(
+                    base_tree, contest_path, backend.hash_object(payload.encode("utf8"))
+                )
+                contest_receipts[uid] = backend.commit_tree(
+                    tree, [branchpoint], payload + "\n"
+                )
+                self.imprimir(f"- {contest_receipts[uid]}", 4)
+                refspecs.append(f"{contest_receipts[uid]}:refs/heads/{branches[-1]}")
+            if (
+                self.shell_out(
+                    ["git", "push", "--atomic", "origin"] + refspecs,
+                    incoming_printlevel=5,
+                ).returncode
+                == 0
+            ):
+                return contest_receipts, branches
+        raise RuntimeError("could not push the contest branches on the third attempt")
+
+    def get_unmerged_contests(self, config, uids: list) -> dict:
+        """Returns a dictionary, keyed on the supplied contest uids, of
+        lists of up to BALLOT_RECEIPT_ROWS randomly sampled unmerged
+        CVRs (each a dictionary with a 'digest' key).  Contests with no
+        unmerged CVRs are not included.
+
+        The samples are drawn from the workspace's pool of unmerged
+        CVRs (see Operation.unmerged_pool) which tracks the CVR branch
+        refs, so no unmerged commits need to be read.
+        """
+        pool = self.unmerged_pool(config.get("git_rootdir"))
+        unmerged_cvrs = {}
+        for uid in uids:
+            if pool.count(uid):
+                unmerged_cvrs[uid] = [
+                    {"digest": digest}
+                    for digest in pool.sample(uid, Globals.get("BALLOT_RECEIPT_ROWS"))
+                ]
+        return unmerged_cvrs
 
     def get_cloaked_contests(self, contest, branch):
         """Return a list of N cloaked cast CVRs for the specified contest.
@@ -234,7 +268,11 @@ class AcceptBallotOperation(Operation):
         ).stdout.strip()
 
     def contest_add_and_commit(
-        self, branch: str, style: str = "contest", receipt_suffix: str = ".csv"
+        self,
+        the_election_config: dict,
+        branch: str,
+        style: str = "contest",
+        receipt_suffix: str = ".csv",
     ):
         """Will git add and commit the new contest content.  Requires
         the CWD to be the parent of the CVRs directory.  If this fails
@@ -277,14 +315,11 @@ class AcceptBallotOperation(Operation):
                 incoming_printlevel=5,
             )
         # Capture the digest
-        digest = self.shell_out(
-            ["git", "log", "-1", "--pretty=format:%H"],
-            check=True,
-            capture_output=True,
-            text=True,
-            incoming_printlevel=5,
-        ).stdout.strip()
-        return digest
+        if self.printonly:
+            return ""
+        return self.git_backend(the_election_config.get("git_rootdir")).rev_parse(
+            "HEAD"
+        )
 
     def create_ballot_receipt(
         self, the_ballot, contest_receipts, unmerged_cvrs, the_election_config
@@ -398,16 +433,25 @@ class AcceptBallotOperation(Operation):
         with self.changed_cwd(a_ballot.get_cvr_parent_dir(the_election_config)):
             # So, the CWD in this block is the state/town subfolder
 
-            # It turns out that determining the other not yet merged to
-            # main contests is apparently a challenging git query and one
-            # that creates a lot of temporary memory requirements.  One
-            # current way to slice that pie is to just get all such
-            # commits up front similar to the tally_contests.py code.
-            # Then extract from that chunk of memory the contest with the
-            # matching uid's of interest.  In the end this may be the
-            # least expensive as the big reader is thus a stdout PIPE
-            # loop.
-            unmerged_cvrs = self.get_unmerged_contests(the_election_config)
+            # Determining the other not yet merged to main contests
+            # used to be a challenging git query over all the unmerged
+            # branches.  Now just sample the unmerged pool for the
+            # contests of this ballot.
+            unmerged_cvrs = self.get_unmerged_contests(
+                the_election_config,
+                [contest.get("uid") for contest in a_ballot.get("contests")],
+            )
+            if Globals.get("BATCH_CONTEST_COMMITS") and not self.printonly:
+                contest_receipts, branches = self.commit_contests_in_batch(
+                    a_ballot, the_election_config, prioritize
+                )
+                for contest in a_ballot.get("contests"):
+                    # if cloaking, get those as well
+                    if "cloak" in contest.get("contest"):
+                        cloak_receipts[contest.get("uid")] = self.get_cloaked_contests(
+                            contest, "main"
+                        )
+                return contest_receipts, branches, unmerged_cvrs, cloak_receipts
             #            import pdb; pdb.set_trace()
             for contest in a_ballot.get("contests"):
                 with self.changed_branch("main"):
@@ -440,7 +484,7 @@ class AcceptBallotOperation(Operation):
                     a_ballot.write_contest(contest, the_election_config)
                     # commit the voter's contest
                     contest_receipts[uid] = self.contest_add_and_commit(
-                        branches[-1], "contest"
+                        the_election_config, branches[-1], "contest"
                     )
                     self.imprimir(f"- {contest_receipts[uid]}", 4)
                     # if cloaking, get those as well
@@ -489,7 +533,9 @@ class AcceptBallotOperation(Operation):
                     versioned=True,
                 )
                 # Commit the voter's ballot voucher
-                receipt_digest = self.contest_add_and_commit(receipt_branch, "receipt")
+                receipt_digest = self.contest_add_and_commit(
+                    the_election_config, receipt_branch, "receipt"
+                )
                 self.imprimir(
                     f"#### Versioned csv receipt (branch={receipt_branch}, "
                     f"digest={receipt_digest}): {receipt_file}"
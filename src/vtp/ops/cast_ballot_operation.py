@@ -57,7 +57,8 @@ class CastBallotOperation(Operation):
         #
         # Choose something randomly
         random.shuffle(choices)
-        loop = the_contest.get("max_selections")
+        # Note - a max_selections read from a config.yaml is a string
+        loop = int(the_contest.get("max_selections"))
         while loop > 0:
             the_contest.add_selection(choices.pop(0))
             loop -= 1
@@ -66,7 +67,7 @@ class CastBallotOperation(Operation):
         """Print the contest and get the selection(s) from the user"""
         choices = the_contest.get("choices")
         tally = the_contest.get("tally")
-        max_selections = the_contest.get("max_selections")
+        max_selections = int(the_contest.get("max_selections"))
         # Print something
         print(f"################ ({count} of {total_contests})")
         print(f"Contest {the_contest.get('uid')}: {the_contest.get('contest_name')}")
@@ -99,7 +100,7 @@ class CastBallotOperation(Operation):
             instance method and does not have a self.
             """
             selections = text.split()
-            choice_max = the_contest.get("max_selections")
+            choice_max = max_selections
             errors = []
             validated_selections = []
             # import pdb; pdb.set_trace()
@@ -0,0 +1,266 @@
+#!/usr/bin/env python
+
+#  VoteTrackerPlus
+#   Copyright (C) 2022 Sandy Currier
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 2 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program; if not, write to the Free Software Foundation, Inc.,
+#   51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+"""
+Logic of operation for generating a synthetic CVR history - bulk
+mock ballots written straight into the ElectionData repository with
+'git fast-import' rather than cast, accepted and merged one at a time.
+"""
+
+# Standard imports
+import os
+import random
+import subprocess
+import time
+
+# Project imports
+from vtp.core.ballot import Ballot, BlankBallot
+from vtp.core.common import Globals
+from vtp.core.election_config import ElectionConfig
+from vtp.core.operation import Operation
+from vtp.ops.accept_ballot_operation import AcceptBallotOperation
+from vtp.ops.cast_ballot_operation import CastBallotOperation
+from vtp.ops.merge_contests_operation import MergeContestsOperation
+
+
+class GenerateCvrsOperation(Operation):
+    """
+    A class to implement the generate-cvrs operation.  See the
+    generate-cvrs help output.
+
+    Each mock ballot is a random demo mode casting (see
+    CastBallotOperation.make_random_selection) of one of the blank
+    ballots.  Its contest CVR commits have the same shape as those of
+    accept-ballot - the initial commit with the contest.json replaced
+    by the CVR, the CVR also being the commit message - and the merged
+    ones are merged to main with the same merge commits as
+    merge-contests creates.  The commits of the unmerged ballots are
+    pushed as contest branches instead, the cast CVR cache of a
+    running election.
+
+    All the objects are written by a single 'git fast-import' into
+    scratch refs, after which main is fast-forwarded and everything
+    is pushed in a single atomic push.
+    """
+
+    _scratch_ref = "refs/vtp/generate-cvrs"
+    _merge_message = "auto commit - thank you for voting\n"
+
+    def read_blank_ballots(self, the_election_config: ElectionConfig) -> list:
+        """Read all the blank ballots of the ElectionData"""
+        blank_ballots = []
+        with self.changed_cwd(the_election_config.get("git_rootdir")):
+            for dirpath, _, files in sorted(os.walk(".")):
+                if not dirpath.endswith(
+                    os.path.join(Globals.get("BLANK_BALLOT_SUBDIR"), "json")
+                ):
+                    continue
+                for filename in sorted(files):
+                    if filename.endswith("," + Globals.get("BALLOT_FILE")):
+                        blank_ballot = BlankBallot(self)
+                        blank_ballot.read_a_blank_ballot(
+                            "", the_election_config, os.path.join(dirpath, filename)
+                        )
+                        blank_ballots.append(blank_ballot)
+        if not blank_ballots:
+            raise ValueError("found no blank ballots to generate CVRs from")
+        return blank_ballots
+
+    @staticmethod
+    def gen_data(payload: bytes) -> bytes:
+        """Return a fast-import data command"""
+        return b"data %d\n%s\n" % (len(payload), payload)
+
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    # pylint: disable=too-many-locals
+    def gen_fast_import_stream(
+        self,
+        the_election_config: ElectionConfig,
+        blank_ballots: list,
+        ballots: int,
+        unmerged: int,
+    ):
+        """
+        Yield the fast-import stream of the mock ballots.  The unmerged
+        contest branches are written to scratch refs named after them.
+        """
+        backend = self.git_backend(the_election_config.get("git_rootdir"))
+        idents = b"author %s\ncommitter %s\n" % (
+            backend.git(["var", "GIT_AUTHOR_IDENT"]).stdout.strip().encode("utf8"),
+            backend.git(["var", "GIT_COMMITTER_IDENT"]).stdout.strip().encode("utf8"),
+        )
+        initial_commit = the_election_config.get("git_initial_commit").encode("utf8")
+        # main continues from HEAD
+        yield b"reset %s/main\nfrom %s\n\n" % (
+            GenerateCvrsOperation._scratch_ref.encode("utf8"),
+            backend.rev_parse("HEAD").encode("utf8"),
+        )
+        caster = CastBallotOperation(
+            election_data_dir=self.election_data_dir, verbosity=self.verbosity
+        )
+        accepter = AcceptBallotOperation(
+            election_data_dir=self.election_data_dir, verbosity=self.verbosity
+        )
+        merger = MergeContestsOperation(
+            election_data_dir=self.election_data_dir, verbosity=self.verbosity
+        )
+        mark = 0
+        for count in range(ballots):
+            a_ballot = blank_ballots[count % len(blank_ballots)]
+            contest_path = os.path.relpath(
+                Ballot.gen_contest_location(
+                    the_election_config, a_ballot.get("ballot_subdir")
+                ),
+                the_election_config.get("git_rootdir"),
+            ).encode("utf8")
+            for contest in a_ballot.get("contests"):
+                contest.clear_selection()
+                caster.make_random_selection(contest)
+                branch = accepter.new_branch_name(contest, "contest")
+                contest.set("cast_branch", branch)
+                payload = Ballot.gen_contest_payload(contest).encode("utf8")
+                if count < ballots - unmerged:
+                    refname = f"{GenerateCvrsOperation._scratch_ref}/cvr"
+                else:
+                    refname = f"{GenerateCvrsOperation._scratch_ref}/{branch}"
+                mark += 1
+                yield (
+                    b"commit %s\nmark :%d\n%s%sfrom %s\nM 100644 inline %s\n%s\n"
+                    % (
+                        refname.encode("utf8"),
+                        mark,
+                        idents,
+                        GenerateCvrsOperation.gen_data(payload + b"\n"),
+                        initial_commit,
+                        contest_path,
+                        GenerateCvrsOperation.gen_data(payload),
+                    )
+                )
+                if count < ballots - unmerged:
+                    yield (
+                        b"commit %s/main\n%s%smerge :%d\nM 100644 inline %s\n%s\n"
+                        % (
+                            GenerateCvrsOperation._scratch_ref.encode("utf8"),
+                            idents,
+                            GenerateCvrsOperation.gen_data(
+                                GenerateCvrsOperation._merge_message.encode("utf8")
+                            ),
+                            mark,
+                            contest_path,
+                            GenerateCvrsOperation.gen_data(
+                                merger.runtime_digest().encode("utf8")
+                            ),
+                        )
+                    )
+            if count % 10000 == 9999:
+                self.imprimir(f"Generated {count + 1} ballots", 4)
+
+    # pylint: disable=duplicate-code
+    def run(
+        self,
+        ballots: int = 1000,
+        unmerged: int = 0,
+        seed: int = None,
+    ):
+        """Main function - see -h for more info"""
+
+        # Create a VTP ElectionData object if one does not already exist
+        the_election_config = ElectionConfig.configure_election(
+            self, self.election_data_dir
+        )
+        if unmerged > ballots:
+            raise ValueError(
+                f"the number of unmerged ballots ({unmerged}) cannot exceed "
+                f"the number of ballots ({ballots})"
+            )
+        blank_ballots = self.read_blank_ballots(the_election_config)
+        # The demo mode selections come from the random module
+        if seed is not None:
+            random.seed(seed)
+        # Set the three EV's as accept-ballot does
+        os.environ["GIT_AUTHOR_DATE"] = Globals.get("ELECTION_DATETIME")
+        os.environ["GIT_COMMITTER_DATE"] = Globals.get("ELECTION_DATETIME")
+        os.environ["GIT_EDITOR"] = "true"
+        if self.printonly:
+            self.imprimir(
+                f"Would generate {ballots} ballots ({unmerged} unmerged) "
+                f"from {len(blank_ballots)} blank ballots",
+                0,
+            )
+            return
+        start_time = time.time()
+        backend = self.git_backend(the_election_config.get("git_rootdir"))
+        with self.changed_cwd(the_election_config.get("git_rootdir")):
+            self.imprimir("Running (git fast-import --quiet)", 4)
+            # pylint: disable=consider-using-with
+            fast_import = subprocess.Popen(
+                ["git", "fast-import", "--quiet"], stdin=subprocess.PIPE
+            )
+            for chunk in self.gen_fast_import_stream(
+                the_election_config, blank_ballots, ballots, unmerged
+            ):
+                fast_import.stdin.write(chunk)
+            fast_import.stdin.close()
+            if fast_import.wait() != 0:
+                raise RuntimeError(f"git fast-import failed ({fast_import.returncode})")
+            main = f"{GenerateCvrsOperation._scratch_ref}/main"
+            self.shell_out(
+                ["git", "merge", "--ff-only", main],
+                check=True,
+                incoming_printlevel=4,
+            )
+            # Note - a large push can take many seconds
+            self.shell_out(
+                [
+                    "git",
+                    "push",
+                    "--atomic",
+                    "origin",
+                    "main",
+                    f"{GenerateCvrsOperation._scratch_ref}/"
+                    f"{Globals.get('CONTEST_FILE_SUBDIR')}/*:refs/heads/"
+                    f"{Globals.get('CONTEST_FILE_SUBDIR')}/*",
+                ],
+                timeout=None,
+                check=True,
+                incoming_printlevel=4,
+            )
+            # The unmerged contest branches live on as remote branches
+            self.shell_out(
+                ["git", "fetch", "--quiet", "origin"],
+                timeout=None,
+                check=True,
+                incoming_printlevel=4,
+            )
+        backend.update_refs(
+            [
+                (refname, "", "")
+                for refname in backend.list_refs(
+                    [GenerateCvrsOperation._scratch_ref + "/"]
+                )
+            ]
+        )
+        self.imprimir(
+            f"Generated {ballots} ballots ({ballots - unmerged} merged, "
+            f"{unmerged} unmerged) in {time.time() - start_time:.1f} seconds",
+            3,
+        )
+
+
+# EOF
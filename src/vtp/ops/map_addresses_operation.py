@@ -0,0 +1,265 @@
+#!/usr/bin/env python
+
+#  VoteTrackerPlus
+#   Copyright (C) 2022 Sandy Currier
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 2 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program; if not, write to the Free Software Foundation, Inc.,
+#   51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+"""
+Logic of operation for mapping a voter file of addresses to their
+ballots - so that polling places can pre-stage the ballot styles.
+"""
+
+# Standard imports
+import contextlib
+import csv
+import io
+import os
+import sys
+import time
+
+# Project imports
+from vtp.core.common import Globals
+from vtp.core.election_config import ElectionConfig
+from vtp.core.operation import Operation
+
+
+class MapAddressesOperation(Operation):
+    """
+    A class to implement the map-addresses operation.  See the
+    map-addresses help output.
+
+    Each address is resolved exactly as Address.map_ggos and
+    ElectionConfig.gen_blank_ballot_location do - the leaf GGO from
+    the REQUIRED_GGO_ADDRESS_FIELDS, a single address_map hit below
+    it and the blank ballot of the resulting active GGOs - but
+    without creating an Address per record.  The leaf GGOs and the
+    blank ballots are resolved once per distinct leaf and per distinct
+    address_map hit respectively, leaving only the address pattern
+    match (see AddressMatcher) to be done per record.
+    """
+
+    def __init__(self, **kwargs):
+        """Call the base class plus the resolution caches"""
+        super().__init__(**kwargs)
+        # The (leaf node, AddressMatcher) of each REQUIRED_GGO_ADDRESS_FIELDS
+        # tuple, or the error message if there is no such leaf GGO
+        self.leaves = {}
+        # The (ballot_node, blank ballot) of each (leaf node, address_map hit)
+        self.ballots = {}
+
+    def resolve_leaf(self, the_election_config: ElectionConfig, fields: tuple):
+        """
+        Return the (leaf node, AddressMatcher) of the (unstripped) GGO
+        address fields
+        """
+        leaf = self.leaves.get(fields)
+        if leaf is None:
+            node = ""
+            try:
+                for field, value in zip(
+                    Globals.get("REQUIRED_GGO_ADDRESS_FIELDS"), fields
+                ):
+                    node = os.path.join(
+                        node, "GGOs", Globals.get("kinds_map")[field], value.strip()
+                    )
+                    if not the_election_config.is_node(node):
+                        raise ValueError(f"Bad ElectionConfig node name ({node})")
+                leaf = (node, the_election_config.get_address_matcher(node))
+            except ValueError as error:
+                leaf = str(error)
+            self.leaves[fields] = leaf
+        if isinstance(leaf, str):
+            # A fresh error - re-raising a cached one would grow its
+            # traceback with every row
+            raise ValueError(leaf)
+        return leaf
+
+    def resolve_ballot(
+        self, the_election_config: ElectionConfig, leaf_node: str, hit: tuple
+    ) -> tuple:
+        """
+        Return the (ballot_node, blank ballot) of an address_map hit,
+        the blank ballot being relative to the ElectionData root
+        """
+        ballot = self.ballots.get((leaf_node, hit))
+        if ballot is None:
+            # The root GGO always contributes - see Address.map_ggos
+            active_ggos = list(dict.fromkeys((".",) + hit[1]))
+            ballot = (
+                leaf_node,
+                os.path.relpath(
+                    the_election_config.gen_blank_ballot_location(
+                        active_ggos,
+                        the_election_config.get_node(leaf_node, "subdir"),
+                    ),
+                    the_election_config.get("git_rootdir"),
+                ),
+            )
+            self.ballots[(leaf_node, hit)] = ballot
+        return ballot
+
+    def resolve(
+        self, the_election_config: ElectionConfig, ggo_fields: tuple, str_address: str
+    ) -> tuple:
+        """
+        Return the (ballot_node, blank ballot) of an address - the tuple
+        of its REQUIRED_GGO_ADDRESS_FIELDS values and its '<number>
+        <street>' string.  Raises a ValueError if the address cannot be
+        mapped to a ballot.
+        """
+        leaf_node, matcher = self.resolve_leaf(the_election_config, ggo_fields)
+        # For now the address is a number and street address only
+        hits = matcher.match(str_address) if str_address != " " else []
+        if len(hits) == 1:
+            return self.resolve_ballot(the_election_config, leaf_node, hits[0])
+        if len(hits) == 0:
+            raise ValueError(
+                f"The supplied address ({str_address.strip()}) "
+                "does not match any address_map"
+            )
+        raise ValueError(
+            f"The supplied address ({str_address.strip()}) "
+            "matches multiple address_map files: "
+            f"{[node for node, _ in hits]}"
+        )
+
+    def map_addresses(self, the_election_config: ElectionConfig, header: list, rows):
+        """
+        Yield the (ballot_node, blank_ballot, error) mapping of each
+        row of a voter file - the header naming at least the
+        REQUIRED_GGO_ADDRESS_FIELDS and REQUIRED_NG_ADDRESS_FIELDS
+        columns.  The ballot columns are empty if the error is not.
+        """
+        ggo_columns = [
+            header.index(field) for field in Globals.get("REQUIRED_GGO_ADDRESS_FIELDS")
+        ]
+        number_column = header.index("number")
+        street_column = header.index("street")
+        for row in rows:
+            try:
+                yield self.resolve(
+                    the_election_config,
+                    tuple(map(row.__getitem__, ggo_columns)),
+                    row[number_column].strip() + " " + row[street_column].strip(),
+                ) + ("",)
+            except ValueError as error:
+                yield ("", "", str(error))
+            except IndexError:
+                yield ("", "", f"The voter file row ({row}) is missing address columns")
+
+    @staticmethod
+    def read_lines(infile, raw_lines: list):
+        """Yield the lines of a file, also appending them to raw_lines"""
+        for line in infile:
+            raw_lines.append(line)
+            yield line
+
+    @staticmethod
+    def render_columns(columns, missing: int = 0) -> str:
+        """
+        Return the columns as the (comma led) tail of a CSV line,
+        first padding a row that is missing columns so that they line
+        up
+        """
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator="\n").writerow(columns)
+        return "," * missing + "," + buffer.getvalue()
+
+    @staticmethod
+    @contextlib.contextmanager
+    def open_csv(filename: str, mode: str):
+        """Open a CSV file, or stdin/stdout if the filename is '-'"""
+        if filename == "-":
+            yield sys.stdin if mode == "r" else sys.stdout
+        else:
+            with open(filename, mode, encoding="utf8", newline="") as file:
+                yield file
+
+    # pylint: disable=duplicate-code
+    def run(
+        self,
+        input_file: str = "-",
+        output_file: str = "-",
+    ) -> dict:
+        """
+        Main function - see -h for more info.  Returns the number of
+        mapped and unmapped addresses.
+        """
+
+        # Create a VTP ElectionData object if one does not already exist
+        the_election_config = ElectionConfig.configure_election(
+            self,
+            self.election_data_dir,
+        )
+        start_time = time.time()
+        counts = {"mapped": 0, "unmapped": 0}
+        with MapAddressesOperation.open_csv(
+            input_file, "r"
+        ) as infile, MapAddressesOperation.open_csv(output_file, "w") as outfile:
+            # Each output line is the input line (the csv line(s) of a
+            # row, verbatim) plus the mapping columns - rendered once
+            # per ballot rather than re-writing every row as csv
+            raw_lines = []
+            reader = csv.reader(MapAddressesOperation.read_lines(infile, raw_lines))
+            header = next(reader, [])
+            missing_fields = [
+                field
+                for field in Globals.get("REQUIRED_NG_ADDRESS_FIELDS")
+                + Globals.get("REQUIRED_GGO_ADDRESS_FIELDS")
+                if field not in header
+            ]
+            if missing_fields:
+                raise ValueError(
+                    f"The voter file ({input_file}) is missing the following "
+                    f"address columns: {missing_fields}"
+                )
+            outfile.write(
+                "".join(raw_lines).rstrip("\r\n")
+                + MapAddressesOperation.render_columns(
+                    ["ballot_node", "blank_ballot", "error"]
+                )
+            )
+            raw_lines.clear()
+            rendered = {}
+            for mapping in self.map_addresses(the_election_config, header, reader):
+                if mapping[2]:
+                    counts["unmapped"] += 1
+                    self.imprimir(mapping[2], 4)
+                    # Note - an empty line is a row of one empty column
+                    columns = MapAddressesOperation.render_columns(
+                        mapping,
+                        len(header) - max(len(next(csv.reader(raw_lines), [])), 1),
+                    )
+                else:
+                    counts["mapped"] += 1
+                    columns = rendered.get(mapping)
+                    if columns is None:
+                        columns = MapAddressesOperation.render_columns(mapping)
+                        rendered[mapping] = columns
+                outfile.write("".join(raw_lines).rstrip("\r\n") + columns)
+                raw_lines.clear()
+
+        # Summerize - quietly when the mapping itself is on stdout
+        self.imprimir(
+            f"Mapped {counts['mapped']} of {counts['mapped'] + counts['unmapped']} "
+            f"addresses to {len(self.ballots)} ballots in "
+            f"{time.time() - start_time:.1f} seconds",
+            4 if output_file == "-" else 3,
+        )
+        return counts
+
+
+# EOF
@@ -24,9 +24,11 @@ for the CVR stays intact in a Merkle tree sense.
 """
 
 # Standard imports
+import base64
 import os
 import random
 import re
+import secrets
 
 # Project import
 from vtp.core.common import Globals
@@ -41,16 +43,29 @@ class MergeContestsOperation(Operation):
     description (immediately below this) in the source file.
     """
 
+    # The number of random bytes in a runtime digest
+    _runtime_digest_bytes = 48
+
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    def __init__(
+        self,
+        election_data_dir: str = "",
+        verbosity: int = Globals.get("DEFAULT_VERBOSITY"),
+        printonly: bool = False,
+        stdout_printing: bool = True,
+        output_style: str = "text",
+    ):
+        """Adds the pool of random bytes for the runtime digests"""
+        super().__init__(
+            election_data_dir, verbosity, printonly, stdout_printing, output_style
+        )
+        self.random_pool = b""
+        self.random_pool_offset = 0
+
     def merge_receipt_branch(self, branch: str, remote: bool):
         """Merge a specific receipt branch"""
         # This command is duplicate from merge_receipt_branch below
-        contest_file = self.shell_out(
-            ["git", "diff-tree", "--no-commit-id", "-r", "--name-only", branch],
-            incoming_printlevel=5,
-            capture_output=True,
-            text=True,
-            check=True,
-        ).stdout.strip()
+        contest_file = "\n".join(self.git_backend(os.getcwd()).changed_paths(branch))
         # This command is duplicate from merge_receipt_branch below
         if not contest_file:
             self.imprimir(
@@ -87,18 +102,105 @@ class MergeContestsOperation(Operation):
                 incoming_printlevel=5,
             )
 
+    def runtime_digest(self) -> str:
+        """Return the run-time digest that replaces a merged contest file"""
+        # ZZZ - replace this with an run-time cryptographic value
+        # derived from the run-time election private key (diffent from
+        # the git commit run-time value).  This will basically slam
+        # the contents of the contest file to a second runtime digest
+        # (the first one being contained in the commit itself).
+        #
+        # The random bytes come from the in-process CSPRNG, drawn
+        # RUNTIME_DIGEST_POOL digests at a time, and are formatted as
+        # 'openssl rand -base64 48' would.
+        size = MergeContestsOperation._runtime_digest_bytes
+        if self.random_pool_offset + size > len(self.random_pool):
+            self.random_pool = secrets.token_bytes(
+                size * max(1, Globals.get("RUNTIME_DIGEST_POOL"))
+            )
+            self.random_pool_offset = 0
+        start = self.random_pool_offset
+        end = start + size
+        self.random_pool_offset = end
+        random_bytes = self.random_pool[start:end]
+        return base64.b64encode(random_bytes).decode("ascii") + "\n"
+
+    def push_merges(self, merged: list, heads: list, remote: bool):
+        """
+        Push the merges of merge_contest_branches_in_batch (the merged
+        branches and the merge commit of each).  MERGE_PUSH_BATCH
+        merged branches at a time, the workspace is fast-forwarded and
+        a single atomic push both updates the remote main and deletes
+        those merged remote branches - bounding the git push command
+        line well within ARG_MAX.
+        """
+        batch_size = Globals.get("MERGE_PUSH_BATCH")
+        for start in range(0, len(merged), batch_size):
+            end = min(start + batch_size, len(merged))
+            batch = merged[start:end]
+            self.shell_out(
+                ["git", "merge", "--ff-only", heads[end - 1]],
+                check=True,
+                incoming_printlevel=5,
+            )
+            self.shell_out(
+                ["git", "push", "--atomic", "origin", "main"]
+                + [":" + branch.removeprefix("origin/") for branch in batch],
+                check=True,
+                incoming_printlevel=5,
+            )
+            # Delete the local branches if these are local branches
+            if not remote:
+                self.git_backend(os.getcwd()).update_refs(
+                    [(f"refs/heads/{branch}", "", "") for branch in batch]
+                )
+
+    def merge_contest_branches_in_batch(self, branches: list, remote: bool) -> int:
+        """
+        Merge the supplied contest branches, in order, to the current
+        (main) branch.  This is the batch equivalent of calling
+        merge_contest_branch on each - the merge commits are created
+        with git plumbing and then pushed in batches (see
+        push_merges).  Returns the number of merged branches.
+        """
+        backend = self.git_backend(os.getcwd())
+        head = backend.rev_parse("HEAD")
+        tree = backend.commit_parents_and_tree(head)[1]
+        merged = []
+        # the merge commit of each merged branch
+        heads = []
+        for branch in branches:
+            contest_files = backend.changed_paths(branch)
+            if not contest_files:
+                self.imprimir(
+                    "(contest) 'git diff-tree --no-commit-d -r --name-only "
+                    f"{branch}' returned no files.  Skipping",
+                    1,
+                )
+                continue
+            # As with merge_contest_branch, the merge takes the main
+            # branch tree with the contest file slammed to a runtime
+            # digest
+            blob = backend.hash_object(self.runtime_digest().encode("utf8"))
+            for contest_file in contest_files:
+                tree = backend.replace_path(tree, contest_file, blob)
+            head = backend.commit_tree(
+                tree,
+                [head, backend.rev_parse(branch)],
+                "auto commit - thank you for voting\n",
+            )
+            self.imprimir(f"Created merge commit {head} for {branch}", 5)
+            merged.append(branch)
+            heads.append(head)
+        self.push_merges(merged, heads, remote)
+        return len(merged)
+
     def merge_contest_branch(self, branch: str, remote: bool):
         """Merge a specific contest branch"""
         # If the VTP server is processing contests from different
         # voting centers, then the contest.json could be in different
         # locations on different branches.
-        contest_file = self.shell_out(
-            ["git", "diff-tree", "--no-commit-id", "-r", "--name-only", branch],
-            incoming_printlevel=5,
-            capture_output=True,
-            text=True,
-            check=True,
-        ).stdout.strip()
+        contest_file = "\n".join(self.git_backend(os.getcwd()).changed_paths(branch))
         # 2022/06/09: witnessed the above line returning no files several
         # times in an ElectionData repo where I was debugging things. So
         # it could be real or perhaps a false one. Regardless adding an
@@ -118,26 +220,13 @@ class MergeContestsOperation(Operation):
             ["git", "merge", "--no-ff", "--no-commit", branch],
             incoming_printlevel=5,
         )
-        # ZZZ - replace this with an run-time cryptographic value
-        # derived from the run-time election private key (diffent from
-        # the git commit run-time value).  This will basically slam
-        # the contents of the contest file to a second runtime digest
-        # (the first one being contained in the commit itself).
-        result = self.shell_out(
-            ["openssl", "rand", "-base64", "48"],
-            incoming_printlevel=5,
-            capture_output=True,
-            text=True,
-            check=True,
-        )
-        if result.stdout == "":
-            raise ValueError("'openssl rand' should never return an empty string")
+        runtime_digest = self.runtime_digest()
         if not self.printonly:
             # ZZZ need to convert the digest to json format ...
             with open(contest_file, "w", encoding="utf8") as outfile:
                 # Write a runtime digest as the actual contents of the
                 # merge
-                outfile.write(str(result.stdout))
+                outfile.write(runtime_digest)
         # Force the git add just in case
         self.shell_out(
             ["git", "add", contest_file],
@@ -180,14 +269,22 @@ class MergeContestsOperation(Operation):
 
     # pylint: disable=too-many-arguments,too-many-positional-arguments
     def randomly_merge_contests(
-        self, uid: str, batch: list, minimum_cast_cache: int, flush: bool, remote: bool
+        self,
+        uid: str,
+        batch: list,
+        minimum_cast_cache: int,
+        flush: bool,
+        remote: bool,
+        picked: list = None,
     ):
         """
         Will randomingly select (len(batch) - BALLOT_RECEIPT_ROWS) contest
         branches from the supplied list of branch and merge them to the
         main branch.
 
-        This is the git merge-to-main sequence.
+        This is the git merge-to-main sequence.  If a picked list is
+        supplied, the selected branches are instead appended to it (in
+        selection order) for merge_contest_branches_in_batch.
         """
         if len(batch) <= minimum_cast_cache:
             if flush:
@@ -200,27 +297,34 @@ class MergeContestsOperation(Operation):
                 return 0
         else:
             count = len(batch) - minimum_cast_cache
-        loop = count
         self.imprimir(f"Merging {count} contests for contest {uid}", 4)
+        # Partition the batch once.  The prioritized branches are
+        # picked first (in batch order) and then the normal branches
+        # are picked at random, each pick swapping the last normal
+        # branch into its slot.
         prioritize_pattern = re.compile(r"/p")
-        while loop:
-            # If there are any prioritized branches, pick them first
-            pick = -1
-            for ecount, branch in enumerate(batch):
-                if prioritize_pattern.search(branch):
-                    pick = ecount
-                    break
-            if pick == -1:
-                pick = random.randrange(len(batch))
-            branch = batch[pick]
-            self.merge_contest_branch(branch, remote)
-            # End of loop maintenance
-            del batch[pick]
-            loop -= 1
+        prioritized = []
+        normal = []
+        for branch in batch:
+            if prioritize_pattern.search(branch):
+                prioritized.append(branch)
+            else:
+                normal.append(branch)
+        picks = prioritized[:count]
+        while len(picks) < count:
+            pick = random.randrange(len(normal))
+            normal[pick], normal[-1] = normal[-1], normal[pick]
+            picks.append(normal.pop())
+        for branch in picks:
+            if picked is None:
+                self.merge_contest_branch(branch, remote)
+            else:
+                picked.append(branch)
         self.imprimir(f"Merged {count} {uid} contests", 4)
         return count
 
     # pylint: disable=duplicate-code
+    # pylint: disable=too-many-locals
     def run(
         self,
         branch: str = "",
@@ -245,6 +349,8 @@ class MergeContestsOperation(Operation):
         actual branch specification in this case contains an 'origin/'
         prefix which needs to be stripped as git nominally does not
         want that when deleting remote branches.
+
+        Returns the number of merged contest branches.
         """
 
         # Create a VTP ElectionData object if one does not already exist
@@ -276,7 +382,7 @@ class MergeContestsOperation(Operation):
                 else:
                     self.merge_receipt_branch(branch, remote)
                 self.imprimir(f"Merged '{branch}'", 4)
-                return
+                return 1
             # Get the pending CVR branches
             cmds = ["git", "branch"]
             cvr_regex = f"{Globals.get('CONTEST_FILE_SUBDIR')}/([^/]+?)/"
@@ -299,6 +405,13 @@ class MergeContestsOperation(Operation):
                 if re.search(cvr_regex, this_branch.strip())
             ]
             #            import pdb; pdb.set_trace()
+            # In batch mode the branches of all the contests are picked
+            # first and then merged together
+            picked = (
+                []
+                if Globals.get("BATCH_CONTEST_MERGES") and not self.printonly
+                else None
+            )
             # Note - sorted alphanumerically on contest UID. Loop over
             # contests and randomly merge extras
             batch = []  # if ordered_set was native would probably use that
@@ -320,6 +433,7 @@ class MergeContestsOperation(Operation):
                         flush=flush,
                         remote=remote,
                         minimum_cast_cache=minimum_cast_cache,
+                        picked=picked,
                     )
                 # Start a new next batch
                 current_uid = uid
@@ -332,8 +446,12 @@ class MergeContestsOperation(Operation):
                     flush=flush,
                     remote=remote,
                     minimum_cast_cache=minimum_cast_cache,
+                    picked=picked,
                 )
+            if picked:
+                merged = self.merge_contest_branches_in_batch(picked, remote)
         self.imprimir(f"Merged {merged} contest branches", 3)
+        return merged
 
 
 # EOF
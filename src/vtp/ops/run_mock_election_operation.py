@@ -23,17 +23,21 @@ or the README.md file in the src/vtp directory for details.
 """
 
 # Standard imports
+import json
+import multiprocessing
 import os
 import time
 
 # Project imports
 from vtp.core.address import Address
 from vtp.core.ballot import Ballot
+from vtp.core.common import Globals
 from vtp.core.election_config import ElectionConfig
 from vtp.core.operation import Operation
 from vtp.ops.accept_ballot_operation import AcceptBallotOperation
 from vtp.ops.cast_ballot_operation import CastBallotOperation
 from vtp.ops.merge_contests_operation import MergeContestsOperation
+from vtp.ops.tabulator_operation import TabulatorOperation
 from vtp.ops.tally_contests_operation import TallyContestsOperation
 
 
@@ -208,13 +212,7 @@ class RunMockElectionOperation(Operation):
         # scanners are pushing to an ElectionData remote and this (tabulator)
         # needs to pull from the ElectionData remote.  And, in this case
         # the branches to be merged are remote and not local.
-        start_time = time.time()
-        # Loop for a day and sleep for 10 seconds
-        seconds = 60 * duration
-        count = 0
-
-        while True:
-            count += 1
+        if flush_mode == 2:
             with self.changed_cwd(the_election_config.get("git_rootdir")):
                 self.shell_out(
                     ["git", "pull"],
@@ -222,23 +220,6 @@ class RunMockElectionOperation(Operation):
                     check=True,
                     incoming_printlevel=4,
                 )
-            if flush_mode == 2:
-                merge_contests = MergeContestsOperation(
-                    election_data_dir=self.election_data_dir,
-                    verbosity=self.verbosity,
-                    printonly=self.printonly,
-                )
-                merge_contests.run(
-                    remote=True,
-                    flush=True,
-                )
-                tally_contests = TallyContestsOperation(
-                    election_data_dir=self.election_data_dir,
-                    verbosity=self.verbosity,
-                    printonly=self.printonly,
-                )
-                tally_contests.run()
-                return
             merge_contests = MergeContestsOperation(
                 election_data_dir=self.election_data_dir,
                 verbosity=self.verbosity,
@@ -246,15 +227,29 @@ class RunMockElectionOperation(Operation):
             )
             merge_contests.run(
                 remote=True,
-                minimum_cast_cache=minimum_cast_cache,
+                flush=True,
             )
-            if iterations and count >= iterations:
-                break
-            self.imprimir(f"Sleeping for 10 (iteration={count})", 3)
-            time.sleep(10)
-            elapsed_time = time.time() - start_time
-            if not iterations and elapsed_time > seconds:
-                break
+            tally_contests = TallyContestsOperation(
+                election_data_dir=self.election_data_dir,
+                verbosity=self.verbosity,
+                printonly=self.printonly,
+            )
+            tally_contests.run()
+            return
+        # Rather than sleeping 10 seconds between merges, run the
+        # tabulator service which merges as soon as the scanners push
+        # (when the upstream is local) and at least every 10 seconds.
+        # Without iterations, loop for the duration (if any).
+        tabulator = TabulatorOperation(
+            election_data_dir=self.election_data_dir,
+            verbosity=self.verbosity,
+            printonly=self.printonly,
+        )
+        tabulator.run(
+            minimum_cast_cache=minimum_cast_cache,
+            iterations=iterations if iterations or duration else 1,
+            duration=0 if iterations else duration,
+        )
         if flush_mode in [1, 2]:
             print("Cleaning up remaining unmerged ballots")
             merge_contests = MergeContestsOperation(
@@ -274,6 +269,118 @@ class RunMockElectionOperation(Operation):
         # )
         # tally_contests.run()
 
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    # pylint: disable=too-many-locals
+    def parallel_mockup(
+        self,
+        the_election_config: ElectionConfig,
+        parallel_scanners: int,
+        location: str,
+        run_args: dict,
+    ):
+        """
+        Simulate N VTP scanners and a VTP tabulator concurrently, each in
+        its own process and in its own setup-vtp-demo workspace - the
+        scanner.NN and server mock clients under location - all pushing
+        to and pulling from the same local upstream.
+
+        run_args are the run() arguments of the scanners.  While the
+        scanners run, the tabulator runs the tabulator service.  Once
+        all the scanners are done the service is stopped, after one
+        last merge cycle that (as every cycle does) leaves up to
+        minimum_cast_cache CVRs of each contest pending.  Only with a
+        flush_mode are those then flushed and tallied.
+        """
+        # The workspaces are clones of the same ElectionData repo
+        repo = os.path.basename(the_election_config.get("git_rootdir"))
+        clients = os.path.join(location, Globals.get("MOCK_CLIENT_DIRNAME"))
+        scanner_dirs = [
+            os.path.join(clients, f"scanner.{count:02d}", repo)
+            for count in range(parallel_scanners)
+        ]
+        server_dir = os.path.join(clients, "server", repo)
+        for workspace in scanner_dirs + [server_dir]:
+            if not os.path.isdir(workspace):
+                raise FileNotFoundError(
+                    f"the mock client workspace ({workspace}) does not exist - "
+                    f"run setup-vtp-demo with at least {parallel_scanners} scanners"
+                )
+        # Each process parses its own workspace's ElectionConfig, so
+        # spawn rather than fork the (already configured) parent
+        context = multiprocessing.get_context("spawn")
+        stop_event = context.Event()
+        tabulator = context.Process(
+            target=run_a_mock_device,
+            args=(
+                server_dir,
+                self.verbosity,
+                self.printonly,
+                {"minimum_cast_cache": run_args["minimum_cast_cache"]},
+                stop_event,
+            ),
+        )
+        tabulator.start()
+        start_time = time.time()
+        scanners = []
+        for workspace in scanner_dirs:
+            scanners.append(
+                context.Process(
+                    target=run_a_mock_device,
+                    args=(
+                        workspace,
+                        self.verbosity,
+                        self.printonly,
+                        run_args | {"device": "scanner"},
+                    ),
+                )
+            )
+            scanners[-1].start()
+        failures = 0
+        for workspace, scanner in zip(scanner_dirs, scanners):
+            scanner.join()
+            failures += scanner.exitcode != 0
+            self.imprimir(
+                f"Scanner {workspace} exited ({scanner.exitcode}) after "
+                f"{time.time() - start_time:.1f} seconds",
+                3,
+            )
+        stop_event.set()
+        tabulator.join()
+        if run_args["flush_mode"] in [1, 2]:
+            # Flush the remaining contests and tally
+            flush = context.Process(
+                target=run_a_mock_device,
+                args=(
+                    server_dir,
+                    self.verbosity,
+                    self.printonly,
+                    {"device": "tabulator", "flush_mode": 2},
+                ),
+            )
+            flush.start()
+            flush.join()
+        metrics_file = self.git_backend(server_dir).git_path(
+            Globals.get("TABULATOR_METRICS_FILE")
+        )
+        if os.path.isfile(metrics_file):
+            with open(metrics_file, "r", encoding="utf8") as infile:
+                metrics = json.load(infile)
+            self.imprimir(
+                f"Tabulator: {metrics['merged_total']} contests merged in "
+                f"{metrics['cycles']} cycles, mean merge latency "
+                f"{metrics['mean_merge_latency']:.2f}s, max merge latency "
+                f"{metrics['max_merge_latency']:.2f}s, queue depth "
+                f"{metrics['queue_depth']}",
+                0,
+            )
+        self.imprimir(
+            f"{parallel_scanners} parallel scanners ran for "
+            f"{time.time() - start_time:.1f} seconds ({failures} failed)",
+            0,
+        )
+        if failures:
+            raise RuntimeError(f"{failures} of the parallel scanners failed")
+
     # pylint: disable=duplicate-code
     # pylint: disable=too-many-arguments,too-many-positional-arguments
     def run(
@@ -286,15 +393,19 @@ class RunMockElectionOperation(Operation):
         iterations: int = 10,
         duration: int = 0,
         version_receipts: bool = False,
+        parallel_scanners: int = 0,
+        location: str = Globals.get("DEFAULT_RUNTIME_LOCATION"),
     ):
         """Main function - see -h for more info
 
-        Note - this is a serial synchronous mock election loop.  A
-        parallel loop would have one VTP tabulator git workspace somewhere
-        and N VTP scanner workspaces someplace else.  Depending on the
-        network topology, it is also possible to start up VTP scanner
-        workspaces on other machines as long as the git remotes and clones
-        are properly configured (with access etc).
+        Note - by default this is a serial synchronous mock election
+        loop.  With parallel_scanners, it is a parallel loop with one
+        VTP tabulator git workspace and N VTP scanner workspaces (as
+        created by setup-vtp-demo at location), each running in its own
+        process.  Depending on the network topology, it is also
+        possible to start up VTP scanner workspaces on other machines
+        as long as the git remotes and clones are properly configured
+        (with access etc).
 
         While a mock election is running, it is also possible to use yet
         another VTP scanner workspace to personally cast/insert individual
@@ -317,8 +428,28 @@ class RunMockElectionOperation(Operation):
                 an_address.active_ggos, an_address.ballot_subdir
             )
 
+        # the parallel VTP scanners and tabulator mock simulation
+        if parallel_scanners:
+            if blank_ballot and os.path.isabs(blank_ballot):
+                # Each scanner casts from its own workspace
+                blank_ballot = os.path.relpath(
+                    blank_ballot, the_election_config.get("git_rootdir")
+                )
+            self.parallel_mockup(
+                the_election_config=the_election_config,
+                parallel_scanners=parallel_scanners,
+                location=location,
+                run_args={
+                    "blank_ballot": blank_ballot,
+                    "minimum_cast_cache": minimum_cast_cache,
+                    "flush_mode": flush_mode,
+                    "iterations": iterations,
+                    "duration": duration,
+                    "version_receipts": version_receipts,
+                },
+            )
         # the VTP scanner mock simulation
-        if device in ["scanner", "both"]:
+        elif device in ["scanner", "both"]:
             self.scanner_mockup(
                 the_election_config=the_election_config,
                 ballot=blank_ballot,
@@ -341,4 +472,31 @@ class RunMockElectionOperation(Operation):
             raise ValueError(f"an illegal value was supplied for device ({device})")
 
 
+def run_a_mock_device(
+    election_data_dir: str,
+    verbosity: int,
+    printonly: bool,
+    run_args: dict,
+    stop_event=None,
+):
+    """
+    The multiprocessing entry point of a run-mock-election
+    --parallel_scanners device.  With a device in run_args, runs that
+    mock device in the election_data_dir workspace.  Otherwise runs the
+    tabulator service there until stop_event is set.
+    """
+    if "device" in run_args:
+        RunMockElectionOperation(
+            election_data_dir=election_data_dir,
+            verbosity=verbosity,
+            printonly=printonly,
+        ).run(**run_args)
+        return
+    TabulatorOperation(
+        election_data_dir=election_data_dir,
+        verbosity=verbosity,
+        printonly=printonly,
+    ).run(stop_event=stop_event, **run_args)
+
+
 # EOF
@@ -37,39 +37,40 @@ class ShowContestsOperation(Operation):
 
     # pylint: disable=R0801
     # (see ops.show_contests_operation:[60:70] and ops.verify_ballot_receipt_operation:[60:71])
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
     def validate_digests(
         self,
         digests: str,
         the_election_config: dict,
         error_digests: set,
         webapi: bool = False,
+        cached_digests: set = None,
+        commit_names: dict = None,
     ):
         """Will scan the supplied digests for validity.  Will print and
-        return the invalid digests.
+        return the invalid digests.  The cached_digests are already
+        known to be commits.  If supplied, commit_names is filled with
+        the full object name of each digest that is a commit (git
+        accepts abbreviated and upper case digests).
         """
         errors = 0
         json_errors = []
-        input_data = "\n".join(digests.split(",")) + "\n"
-        with self.changed_cwd(the_election_config.get("git_rootdir")):
-            output_lines = (
-                self.shell_out(
-                    [
-                        "git",
-                        "cat-file",
-                        "--batch-check=%(objectname) %(objecttype)",
-                        "--buffer",
-                    ],
-                    incoming_printlevel=5,
-                    input=input_data,
-                    text=True,
-                    check=True,
-                    capture_output=True,
-                )
-                .stdout.strip()
-                .splitlines()
+        cached_digests = cached_digests or set()
+        uncached = [
+            digest for digest in digests.split(",") if digest not in cached_digests
+        ]
+        uncached_types = iter(
+            self.git_backend(the_election_config.get("git_rootdir")).object_types(
+                uncached
             )
-        for count, line in enumerate(output_lines):
-            digest, commit_type = line.split()
+        )
+        output_lines = [
+            (digest, "commit") if digest in cached_digests else next(uncached_types)
+            for digest in digests.split(",")
+        ]
+        for count, (digest, commit_type) in enumerate(output_lines):
+            if commit_type == "commit" and commit_names is not None:
+                commit_names[digests.split(",")[count]] = digest
             if commit_type == "missing":
                 if webapi:
                     json_errors.append(f"missing digest: n={count} digest={digest}")
@@ -99,6 +100,51 @@ class ShowContestsOperation(Operation):
                 )
         return json_errors
 
+    def show_commits(self, the_election_config: dict, digests: list) -> list:
+        """
+        Return the (lines, record) commit cache entries of the supplied
+        commits (full object names) in order, one per distinct commit
+        like 'git show -s'.  Only the commits that are not cached are
+        shown via git, all of them with a single 'git show -s'.
+        """
+        commit_cache = self.commit_cache()
+        entries = {digest: commit_cache.get(digest) for digest in digests}
+        missing = [digest for digest, entry in entries.items() if entry is None]
+        if missing:
+            with self.changed_cwd(the_election_config.get("git_rootdir")):
+                output_lines = (
+                    self.shell_out(
+                        ["git", "show", "-s"] + missing,
+                        incoming_printlevel=5,
+                        text=True,
+                        check=True,
+                        capture_output=True,
+                    )
+                    .stdout.strip()
+                    .splitlines()
+                )
+            # Split the output into the commits - the commit message
+            # lines are indented so the commit header line is not
+            shown = []
+            for line in output_lines:
+                if line.startswith("commit "):
+                    shown.append([])
+                shown[-1].append(line)
+            for lines in shown:
+                # drop the blank separator line
+                while lines and not lines[-1]:
+                    lines.pop()
+                full_digest = lines[0].split()[1]
+                entry = commit_cache.put(full_digest, lines)
+                if full_digest in entries:
+                    entries[full_digest] = entry
+        # Like git show, each commit is shown once
+        unique = {}
+        for digest in digests:
+            if entries[digest] is not None:
+                unique.setdefault(digest, entries[digest])
+        return list(unique.values())
+
     # pylint: disable=duplicate-code
     def run(
         self, contest_check: str = "", webapi: bool = False, receipt: bool = False
@@ -115,41 +161,62 @@ class ShowContestsOperation(Operation):
             self, self.election_data_dir
         )
 
-        # First validate the digests
+        # First validate the digests - the commits in the commit cache
+        # are known to exist
         error_digests = set()
+        commit_names = {}
         json_errors = self.validate_digests(
-            contest_check, the_election_config, error_digests, webapi
+            contest_check,
+            the_election_config,
+            error_digests,
+            webapi,
+            commit_names=commit_names,
+            cached_digests=(
+                set()
+                if receipt
+                else {
+                    digest
+                    for digest in contest_check.split(",")
+                    if self.commit_cache().get(digest)
+                }
+            ),
         )
         valid_digests = [
             digest for digest in contest_check.split(",") if digest not in error_digests
         ]
         if not receipt:
             # show/log the digests
-            with self.changed_cwd(the_election_config.get("git_rootdir")):
-                output_lines = (
-                    self.shell_out(
-                        ["git", "show", "-s"] + valid_digests,
-                        incoming_printlevel=5,
-                        text=True,
-                        check=True,
-                        capture_output=True,
-                    )
-                    .stdout.strip()
-                    .splitlines()
-                )
+            entries = self.show_commits(
+                the_election_config,
+                [
+                    commit_names[digest]
+                    for digest in valid_digests
+                    if digest in commit_names
+                ],
+            )
+            output_lines = []
+            for entry in entries:
+                if output_lines:
+                    output_lines.append("")
+                output_lines += entry[0]
             for line in output_lines:
                 self.imprimir(line)
-            # return a dictionary
+            # return a dictionary - the cached parsed record if there
+            # is a single CVR
+            if len(entries) == 1 and entries[0][1] is not None:
+                output = dict(entries[0][1])
+                if json_errors:
+                    output["backend_errors"] = json_errors
+                return output
             return WebAPI.convert_git_log_to_json(output_lines, json_errors)
         # get the contents of the file via the commit digest.
         # This appears to require two git commands TBD
-        receipt_digest = valid_digests[0]
         ballot_check = None
         with self.changed_cwd(the_election_config.get("git_rootdir")):
             # get the filename
             output_lines = (
                 self.shell_out(
-                    ["git", "show", "--name-only", "--oneline", receipt_digest],
+                    ["git", "show", "--name-only", "--oneline", valid_digests[0]],
                     incoming_printlevel=5,
                     text=True,
                     check=True,
@@ -169,7 +236,7 @@ class ShowContestsOperation(Operation):
                 # get the contents
                 ballot_check = (
                     self.shell_out(
-                        ["git", "show", receipt_digest + ":" + output_lines[1]],
+                        ["git", "show", valid_digests[0] + ":" + output_lines[1]],
                         incoming_printlevel=5,
                         text=True,
                         check=True,
@@ -0,0 +1,292 @@
+#!/usr/bin/env python
+
+#  VoteTrackerPlus
+#   Copyright (C) 2022 Sandy Currier
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 2 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program; if not, write to the Free Software Foundation, Inc.,
+#   51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+"""
+Logic of operation for the tabulator service - a long running VTP
+tabulator that merges (and optionally tallies) the pushed CVR contest
+branches as they arrive rather than polling on a fixed sleep.
+"""
+
+# Standard imports
+import json
+import os
+import time
+
+# Project imports
+from vtp.core.common import Globals
+from vtp.core.election_config import ElectionConfig
+from vtp.core.operation import Operation
+from vtp.ops.merge_contests_operation import MergeContestsOperation
+from vtp.ops.tally_contests_operation import TallyContestsOperation
+
+
+class TabulatorOperation(Operation):
+    """
+    A class to implement the tabulator-serve operation.  The
+    ElectionConfig, the git backend and the merge (and tally)
+    operations stay resident across merge cycles.
+
+    When the workspace's origin is a local bare repository (as with
+    the mock election local upstream), a post-receive hook is
+    installed there that touches TABULATOR_NOTIFY_FILE on every push,
+    and a merge cycle runs as soon as that file changes.  Otherwise
+    (or as a safety net) a merge cycle runs every interval seconds.
+
+    Each merge cycle merges the pending contest branches in one batch
+    (see MergeContestsOperation.merge_contest_branches_in_batch),
+    optionally runs an incremental tally, and records the queue depth
+    and merge latency metrics in TABULATOR_METRICS_FILE.
+    """
+
+    _hook_marker = "# VoteTrackerPlus tabulator notification"
+
+    def __init__(
+        self,
+        election_data_dir: str = "",
+        verbosity: int = Globals.get("DEFAULT_VERBOSITY"),
+        printonly: bool = False,
+    ):
+        """Adds the running metrics"""
+        super().__init__(election_data_dir, verbosity, printonly)
+        self.metrics = {
+            "notification": "polling",
+            "cycles": 0,
+            "merged_total": 0,
+            "queue_depth": 0,
+            "queue_depth_by_contest": {},
+            "last_merge_latency": 0.0,
+            "max_merge_latency": 0.0,
+            "mean_merge_latency": 0.0,
+            "last_cycle": "",
+        }
+
+    def install_notify_hook(self, git_rootdir: str) -> str:
+        """
+        If origin is a local bare repository, install the post-receive
+        notification hook there and return the notification file.
+        Returns "" when falling back to polling.
+        """
+        backend = self.git_backend(git_rootdir)
+        upstream = backend.git(["remote", "get-url", "origin"]).stdout.strip()
+        upstream = upstream.removeprefix("file://")
+        if not os.path.isdir(os.path.join(upstream, "hooks")):
+            self.imprimir(f"The upstream ({upstream}) is not local - polling", 3)
+            return ""
+        hook = os.path.join(upstream, "hooks", "post-receive")
+        if os.path.exists(hook):
+            with open(hook, "r", encoding="utf8") as infile:
+                if TabulatorOperation._hook_marker not in infile.read():
+                    self.imprimir(
+                        f"Not replacing the existing upstream hook ({hook}) - polling",
+                        2,
+                    )
+                    return ""
+        notify_file = os.path.join(upstream, Globals.get("TABULATOR_NOTIFY_FILE"))
+        if not self.printonly:
+            # Only notify on created or updated CVR branches - not on
+            # the tabulator's own main pushes and branch deletions
+            with open(hook, "w", encoding="utf8") as outfile:
+                outfile.write(
+                    "#!/bin/sh\n"
+                    f"{TabulatorOperation._hook_marker}\n"
+                    "while read -r old new ref; do\n"
+                    '    case "$ref:$new" in\n'
+                    f"    refs/heads/{Globals.get('CONTEST_FILE_SUBDIR')}/*:*[1-9a-f]*)\n"
+                    f'        touch "{Globals.get("TABULATOR_NOTIFY_FILE")}"\n'
+                    "        ;;\n"
+                    "    esac\n"
+                    "done\n"
+                )
+            os.chmod(hook, 0o755)
+        self.metrics["notification"] = "post-receive hook"
+        self.imprimir(f"Installed the upstream notification hook ({hook})", 4)
+        return notify_file
+
+    @staticmethod
+    def notify_stamp(notify_file: str) -> int:
+        """Return the modification time of the notification file (or 0)"""
+        try:
+            return os.stat(notify_file).st_mtime_ns
+        except FileNotFoundError:
+            return 0
+
+    @staticmethod
+    def wait_for_refs(
+        notify_file: str, stamp: int, interval: float, stop_event=None
+    ) -> tuple:
+        """
+        Wait until the notification file changes, interval seconds
+        pass or the (optional multiprocessing) stop_event is set.
+        Returns the new stamp and the time the push was seen.
+        """
+        deadline = time.time() + interval
+        while time.time() < deadline:
+            if notify_file:
+                new_stamp = TabulatorOperation.notify_stamp(notify_file)
+                if new_stamp != stamp:
+                    return new_stamp, new_stamp / 1e9
+            if stop_event is not None and stop_event.is_set():
+                break
+            time.sleep(
+                min(
+                    Globals.get("TABULATOR_POLL_INTERVAL"),
+                    max(0.0, deadline - time.time()),
+                )
+            )
+        return stamp, time.time()
+
+    def pending_branches(self, git_rootdir: str) -> dict:
+        """Return the uid -> list of pending remote CVR branches"""
+        pending = {}
+        prefix = f"refs/remotes/origin/{Globals.get('CONTEST_FILE_SUBDIR')}/"
+        for refname in self.git_backend(git_rootdir).list_refs([prefix]):
+            uid = refname.split("/")[-2]
+            pending.setdefault(uid, []).append(refname.removeprefix("refs/remotes/"))
+        return pending
+
+    def merge_cycle(
+        self,
+        merge_operation: MergeContestsOperation,
+        git_rootdir: str,
+        minimum_cast_cache: int,
+        seen: float,
+    ) -> int:
+        """
+        Pull, merge the pending contest branches in one batch, update
+        the metrics and return the number of merged branches.
+        """
+        with self.changed_cwd(git_rootdir):
+            self.shell_out(["git", "pull"], check=True, incoming_printlevel=5)
+            pending = self.pending_branches(git_rootdir)
+            # When printonly, each branch 'merge' is just printed
+            picked = []
+            merged = 0
+            for uid, batch in sorted(pending.items()):
+                merged += merge_operation.randomly_merge_contests(
+                    uid=uid,
+                    batch=list(batch),
+                    minimum_cast_cache=minimum_cast_cache,
+                    flush=False,
+                    remote=True,
+                    picked=None if self.printonly else picked,
+                )
+            if picked:
+                merged = merge_operation.merge_contest_branches_in_batch(picked, True)
+        picked = set(picked)
+        self.metrics["queue_depth_by_contest"] = {
+            uid: len([branch for branch in batch if branch not in picked])
+            for uid, batch in sorted(pending.items())
+        }
+        self.metrics["queue_depth"] = sum(
+            self.metrics["queue_depth_by_contest"].values()
+        )
+        self.metrics["cycles"] += 1
+        self.metrics["last_cycle"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+        if merged:
+            latency = time.time() - seen
+            merges = self.metrics["merged_total"]
+            self.metrics["mean_merge_latency"] = (
+                self.metrics["mean_merge_latency"] * merges + latency * merged
+            ) / (merges + merged)
+            self.metrics["merged_total"] += merged
+            self.metrics["last_merge_latency"] = latency
+            self.metrics["max_merge_latency"] = max(
+                latency, self.metrics["max_merge_latency"]
+            )
+        return merged
+
+    def write_metrics(self, git_rootdir: str):
+        """Atomically (re)write the metrics file"""
+        metrics_file = self.git_backend(git_rootdir).git_path(
+            Globals.get("TABULATOR_METRICS_FILE")
+        )
+        os.makedirs(os.path.dirname(metrics_file), exist_ok=True)
+        with open(metrics_file + ".tmp", "w", encoding="utf8") as outfile:
+            json.dump(self.metrics, outfile, sort_keys=True, indent=4)
+        os.replace(metrics_file + ".tmp", metrics_file)
+
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    # pylint: disable=too-many-locals
+    def run(
+        self,
+        minimum_cast_cache: int = 100,
+        interval: float = 10.0,
+        iterations: int = 0,
+        duration: int = 0,
+        tally: bool = False,
+        jobs: int = 1,
+        stop_event=None,
+    ):
+        """
+        Main function - see -h for more info.  Serves until iterations
+        merge cycles have run, duration minutes have passed (either
+        being 0 meaning forever) or the optional (multiprocessing)
+        stop_event is set.
+        """
+        the_election_config = ElectionConfig.configure_election(
+            self,
+            self.election_data_dir,
+        )
+        git_rootdir = the_election_config.get("git_rootdir")
+        # Set the three EV's
+        os.environ["GIT_AUTHOR_DATE"] = Globals.get("ELECTION_DATETIME")
+        os.environ["GIT_COMMITTER_DATE"] = Globals.get("ELECTION_DATETIME")
+        os.environ["GIT_EDITOR"] = "true"
+
+        merge_operation = MergeContestsOperation(
+            election_data_dir=self.election_data_dir,
+            verbosity=self.verbosity,
+            printonly=self.printonly,
+        )
+        tally_operation = None
+        if tally:
+            tally_operation = TallyContestsOperation(
+                election_data_dir=self.election_data_dir,
+                verbosity=self.verbosity,
+            )
+        notify_file = self.install_notify_hook(git_rootdir)
+        stamp = TabulatorOperation.notify_stamp(notify_file) if notify_file else 0
+        start_time = time.time()
+        # The first cycle merges whatever is already pending
+        seen = start_time
+        while True:
+            merged = self.merge_cycle(
+                merge_operation, git_rootdir, minimum_cast_cache, seen
+            )
+            self.write_metrics(git_rootdir)
+            self.imprimir(
+                f"Tabulator cycle {self.metrics['cycles']}: merged {merged} contest "
+                f"branches (queue depth {self.metrics['queue_depth']}, merge latency "
+                f"{self.metrics['last_merge_latency']:.2f}s)",
+                3,
+            )
+            if tally_operation and merged:
+                tally_operation.run(incremental=True, jobs=jobs)
+            if iterations and self.metrics["cycles"] >= iterations:
+                break
+            if duration and time.time() - start_time > 60 * duration:
+                break
+            if stop_event is not None and stop_event.is_set():
+                break
+            stamp, seen = TabulatorOperation.wait_for_refs(
+                notify_file, stamp, interval, stop_event
+            )
+
+
+# EOF
@@ -20,9 +20,12 @@
 """Logic of operation for tallying contests."""
 
 # Standard imports
+from concurrent.futures import ProcessPoolExecutor
 
 # Project imports
 from vtp.core.ballot import Ballot
+from vtp.core.common import Globals
+from vtp.core.cvr_index import CvrIndex
 from vtp.core.election_config import ElectionConfig
 from vtp.core.exceptions import TallyException
 from vtp.core.operation import Operation
@@ -37,12 +40,184 @@ class TallyContestsOperation(Operation):
     description (immediately below this) in the source file.
     """
 
-    # pylint: disable=duplicate-code
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    def tally_a_contest(
+        self,
+        reference_cvr: dict,
+        contest_batch: list,
+        scanned_votes: int,
+        checkpoint: tuple,
+        track_contests: list,
+        tally_override: str,
+    ):
+        """
+        Tally and print a single contest.  If a (position, state)
+        checkpoint (see incremental_tally_args) is supplied,
+        contest_batch need only contain the CVRs after the checkpoint
+        position.  Returns the Tally or None if the contest could not
+        be tallied.
+        """
+        # Create a Tally object for this specific contest
+        the_tally = Tally(reference_cvr, self)
+        if checkpoint:
+            the_tally.restore_checkpoint(checkpoint[1], checkpoint[0])
+        self.imprimir(
+            f"Scanned {scanned_votes} votes "
+            f"for contest ({reference_cvr['contestCVR']['contest_name']}) "
+            f"uid={reference_cvr['contestCVR']['uid']}, "
+            f"tally={reference_cvr['contestCVR']['tally']}, "
+            f"open_positions={the_tally.get('open_positions')}, "
+            f"max_selections={the_tally.get('max_selections')} "
+        )
+        # Tally all the contests for this contest
+        #        import pdb; pdb.set_trace()
+        try:
+            the_tally.tallyho(contest_batch, track_contests, tally_override)
+        except TallyException as tally_error:
+            self.imprimir(f"[ERROR]: {tally_error}")
+            self.imprimir("Continuing with other contests ...")
+            return None
+        return the_tally
+
+    def open_cvr_index(
+        self, the_election_config: ElectionConfig, incremental: bool
+    ) -> CvrIndex:
+        """
+        Return the up to date CVR index if the tally uses one (an
+        incremental tally always does) or None if the tally walks the
+        main branch history.
+        """
+        if not incremental and not Globals.get("USE_CVR_INDEX"):
+            return None
+        cvr_index = CvrIndex(self, the_election_config)
+        cvr_index.update()
+        return cvr_index
+
+    @staticmethod
+    def save_checkpoint(
+        cvr_index: CvrIndex,
+        uid: str,
+        tally_args: tuple,
+        tally_override: str,
+        state,
+    ):
+        """
+        Record the tally checkpoint of a contest as of the CVRs it
+        was tallied with (see gather_tally_args)
+        """
+        if state is not None:
+            cvr_index.set_checkpoint(
+                uid,
+                tally_override or tally_args[0]["contestCVR"]["tally"],
+                tally_args[2],
+                state,
+            )
+
+    def incremental_tally_args(
+        self, cvr_index: CvrIndex, contest_uid: str, track_contests: list, tally: str
+    ) -> tuple:
+        """
+        Return the tally_a_contest (reference_cvr, contest_batch,
+        scanned_votes, checkpoint) arguments that start a contest from
+        its last tally checkpoint (if any) so that only the newly
+        merged CVRs are folded in.  When tracking contests a full
+        recount is done so that the tracked CVRs are printed.
+        """
+        scanned_votes = cvr_index.contest_count(contest_uid)
+        checkpoint = None
+        if not track_contests:
+            checkpoint = cvr_index.get_checkpoint(contest_uid, tally)
+        position = checkpoint[0] if checkpoint else 0
+        contest_batch = cvr_index.contest_batches(contest_uid, position).get(
+            contest_uid, []
+        )
+        if position == 0:
+            # Same as a full tally
+            reference_cvr = contest_batch[0]
+        else:
+            reference_cvr = cvr_index.reference_cvr(contest_uid)
+        return reference_cvr, contest_batch, scanned_votes, checkpoint
+
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    def gather_tally_args(
+        self,
+        the_election_config: ElectionConfig,
+        cvr_index: CvrIndex,
+        contest_uid: str,
+        track_contests: list,
+        tally_override: str,
+        incremental: bool,
+    ) -> dict:
+        """
+        Return a uid sorted dictionary of the tally_a_contest
+        (reference_cvr, contest_batch, scanned_votes, checkpoint)
+        arguments of the contests to tally.
+        """
+        if incremental:
+            contest_uids = cvr_index.contest_uids()
+        elif cvr_index:
+            contest_batches = cvr_index.contest_batches(contest_uid)
+            contest_uids = sorted(contest_batches)
+        else:
+            contest_batches = self.cvr_parse_git_log_output(
+                ["--topo-order", "--no-merges", "--reverse"],
+                the_election_config,
+                incoming_printlevel=5,
+            )
+            contest_uids = sorted(contest_batches)
+        tally_args = {}
+        for uid in contest_uids:
+            # Maybe skip
+            if contest_uid not in ("", uid):
+                continue
+            if incremental:
+                tally_args[uid] = self.incremental_tally_args(
+                    cvr_index,
+                    uid,
+                    track_contests,
+                    tally_override
+                    or cvr_index.reference_cvr(uid)["contestCVR"]["tally"],
+                )
+            else:
+                tally_args[uid] = (
+                    contest_batches[uid][0],
+                    contest_batches[uid],
+                    len(contest_batches[uid]),
+                    None,
+                )
+        return tally_args
+
+    def tally_in_workers(
+        self, jobs: int, tally_args: dict, track_contests: list, tally_override: str
+    ) -> dict:
+        """
+        Tally the contests in jobs worker processes and return a uid
+        keyed dictionary of the (output lines, checkpoint) results.
+        """
+        operation_args = {
+            "election_data_dir": self.election_data_dir,
+            "verbosity": self.verbosity,
+            "output_style": self.output_style,
+        }
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            futures = {
+                uid: executor.submit(
+                    tally_a_contest_in_a_worker,
+                    operation_args,
+                    args + (track_contests, tally_override),
+                )
+                for uid, args in tally_args.items()
+            }
+            return {uid: future.result() for uid, future in futures.items()}
+
+    # pylint: disable=duplicate-code,too-many-locals
     def run(
         self,
         contest_uid: str = "",
         track_contests: str = "",
         tally_override: str = "",
+        incremental: bool = False,
+        jobs: int = 1,
     ) -> list:
         """Main function - see -h for more info"""
 
@@ -68,56 +243,73 @@ class TallyContestsOperation(Operation):
         # interest than to try to create a git grep query against the CVR
         # payload.  Note - --reverse is set so to go in parent to child order
         # (though either order is valid, voters probably will understand
-        # parent to child order better)
-        contest_batches = self.cvr_parse_git_log_output(
-            [
-                "git",
-                "log",
-                "--topo-order",
-                "--no-merges",
-                "--reverse",
-                "--pretty=format:%H%B",
-            ],
+        # parent to child order better).  With the CVR index, only the
+        # commits merged since the last tally are walked.  An
+        # incremental tally always uses the CVR index.
+        cvr_index = self.open_cvr_index(the_election_config, incremental)
+        tally_args = self.gather_tally_args(
             the_election_config,
-            incoming_printlevel=5,
+            cvr_index,
+            contest_uid,
+            track_contests,
+            tally_override,
+            incremental,
         )
 
+        # The contests are independent of each other, so with jobs
+        # they are tallied in worker processes.  The output of each
+        # contest is captured by the worker and is printed here in
+        # the serial order.
+        results = {}
+        if jobs > 1 and len(tally_args) > 1:
+            results = self.tally_in_workers(
+                jobs, tally_args, track_contests, tally_override
+            )
+
         # Note - though plurality voting can be counted within the above
         # loop, tallies such as rcv cannot.  So far now, just count
         # everything in a separate loop.
-        for count, contest_batch in enumerate(sorted(contest_batches)):
-            # Maybe skip
-            if contest_uid != "":
-                if (
-                    contest_batches[contest_batch][0]["contestCVR"]["uid"]
-                    != contest_uid
-                ):
-                    continue
-            # Create a Tally object for this specific contest
-            the_tally = Tally(contest_batches[contest_batch][0], self)
+        for count, uid in enumerate(tally_args):
             if contest_uid == "":
                 if count > 0:
                     self.imprimir_formatting("empty_line")
                 self.imprimir_formatting("horizontal_line")
-            self.imprimir(
-                f"Scanned {len(contest_batches[contest_batch])} votes "
-                f"for contest ({contest_batches[contest_batch][0]['contestCVR']['contest_name']}) "
-                f"uid={contest_batches[contest_batch][0]['contestCVR']['uid']}, "
-                f"tally={contest_batches[contest_batch][0]['contestCVR']['tally']}, "
-                f"open_positions={the_tally.get('open_positions')}, "
-                f"max_selections={the_tally.get('max_selections')} "
-            )
-            # Tally all the contests for this contest
-            #        import pdb; pdb.set_trace()
-            try:
-                the_tally.tallyho(
-                    contest_batches[contest_batch], track_contests, tally_override
+            if uid in results:
+                lines, state = results[uid]
+                for line in lines:
+                    if self.stdout_printing:
+                        print(line)
+                    else:
+                        self.stdout_output.append(line)
+            else:
+                the_tally = self.tally_a_contest(
+                    *tally_args[uid], track_contests, tally_override
+                )
+                state = the_tally.get_checkpoint() if the_tally else None
+            if incremental:
+                TallyContestsOperation.save_checkpoint(
+                    cvr_index, uid, tally_args[uid], tally_override, state
                 )
-            except TallyException as tally_error:
-                self.imprimir(f"[ERROR]: {tally_error}")
-                self.imprimir("Continuing with other contests ...")
+        if cvr_index:
+            cvr_index.close()
         # can always return the output
         return self.stdout_output
 
 
+def tally_a_contest_in_a_worker(operation_args: dict, tally_args: tuple) -> tuple:
+    """
+    The ProcessPoolExecutor entry point of a tally-contests --jobs
+    worker.  Tallies one contest and returns the captured imprimir
+    output and the tally checkpoint (see Tally.get_checkpoint).
+    """
+    operation = TallyContestsOperation(stdout_printing=False, **operation_args)
+    # Skip any html preamble
+    preamble = len(operation.stdout_output)
+    the_tally = operation.tally_a_contest(*tally_args)
+    return (
+        operation.stdout_output[preamble:],
+        the_tally.get_checkpoint() if the_tally else None,
+    )
+
+
 # EOF
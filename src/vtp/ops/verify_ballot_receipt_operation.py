@@ -25,7 +25,9 @@ import re
 
 # Project imports
 from vtp.core.ballot import Ballot
+from vtp.core.common import Globals
 from vtp.core.contest import Contest
+from vtp.core.cvr_index import CvrIndex
 from vtp.core.election_config import ElectionConfig
 from vtp.core.operation import Operation
 
@@ -45,34 +47,15 @@ class VerifyBallotReceiptOperation(Operation):
         """Will scan the supplied ballot lines for invalid digests.  Will
         print and return the invalid digests.
         """
-        input_data = ""
-        for line in lines:
-            input_data += "\n".join(line) + "\n"
-        with self.changed_cwd(the_election_config.get("git_rootdir")):
-            results = (
-                self.shell_out(
-                    [
-                        "git",
-                        "cat-file",
-                        "--buffer",
-                        "--batch-check=%(objectname) %(objecttype)",
-                    ],
-                    incoming_printlevel=5,
-                    input=input_data,
-                    text=True,
-                    check=True,
-                    capture_output=True,
-                )
-                .stdout.strip()
-                .splitlines()
-            )
+        results = self.git_backend(the_election_config.get("git_rootdir")).object_types(
+            [digest for line in lines for digest in line]
+        )
         # Print any invalid digest info
         row_length = len(uids)
         # Mmm - 1 based?
         row = 1
         column = 1
-        for line in results:
-            digest, commit_type = line.split()
+        for digest, commit_type in results:
             if commit_type == "missing":
                 self.imprimir(
                     f"missing digest: row {row} column {column} "
@@ -92,7 +75,7 @@ class VerifyBallotReceiptOperation(Operation):
                 column = 1
                 row += 1
 
-    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    # pylint: disable=too-many-arguments,too-many-positional-arguments,too-many-locals
     # self is not technically an arg kind-of
     def vet_rows(
         self,
@@ -105,35 +88,29 @@ class VerifyBallotReceiptOperation(Operation):
     ):
         """
         Will scan the main branch and validate that the receipt digests
-        are there and that they are in the correct contest.
+        are there and that they are in the correct contest.  The CVRs
+        of all the rows are read in a single git backend pass.
         """
         requested_row = None
         requested_digests = None
+        # Note - cannot handle bad digests so they need to be removed
+        # prior to the read.  However, the headers and uids are both
+        # lists that are assumed to be a complete list, so removing a
+        # bad digest(s) becomes complicated.
+        all_cvrs = self.cvr_read_commits(
+            list(
+                dict.fromkeys(
+                    dig for row in lines for dig in row if dig not in error_digests
+                )
+            ),
+            the_election_config,
+        )
         for index, row in enumerate(lines):
-            # Note - cannot handle bad digests so they need to be removed
-            # prior to the call.  However, the headers and uids are both
-            # lists that are assumed to be a complete list, so removing a
-            # bad digest(s) becomes complicated.
             legit_row = [dig for dig in row if dig not in error_digests]
-            if len(legit_row) == len(row):
-                # all the digests are legit
-                cvrs = self.cvr_parse_git_log_output(
-                    ["git", "log", "--no-walk", "--pretty=format:%H%B"] + row,
-                    the_election_config,
-                    grouped_by_uid=False,
-                    incoming_printlevel=5,
-                )
-            elif len(legit_row) > 0:
-                # Only some are legitimate
-                cvrs = self.cvr_parse_git_log_output(
-                    ["git", "log", "--no-walk", "--pretty=format:%H%B"] + legit_row,
-                    the_election_config,
-                    grouped_by_uid=False,
-                    incoming_printlevel=5,
-                )
-            else:
+            if not legit_row:
                 # skip the row - it has no legitimate digests
                 continue
+            cvrs = {dig: all_cvrs[dig] for dig in legit_row if dig in all_cvrs}
             # import pdb; pdb.set_trace()
             if row_index != "" and int(row_index) - 1 == index:
                 requested_row = cvrs
@@ -163,6 +140,76 @@ class VerifyBallotReceiptOperation(Operation):
                     continue
         return (requested_row, requested_digests)
 
+    def vet_a_row_via_git_log(
+        self, the_election_config: ElectionConfig, uids: list, requested_row: dict
+    ) -> dict:
+        """
+        Will print the actual vote offset in the vote count for each
+        contest.  However, to do that need to get the actual complete
+        tally for the contests of interest.  And at the moment might
+        as well do that for all contests (unless one cat create the
+        git grep query syntax to just pull the uids of interest).
+        Returns the uid -> column dictionary of the contests that are
+        not merged yet.
+        """
+        contest_batches = self.cvr_parse_git_log_output(
+            ["--topo-order", "--no-merges"],
+            the_election_config,
+            incoming_printlevel=5,
+        )
+        unmerged_uids = {}
+        for u_count, uid in enumerate(uids):
+            # For this contest loop over the reverse ordered CVRs (since it
+            # seems TBD that it makes sense to ballot #1 as the first ballot on
+            # main).
+            contest_votes = len(contest_batches[uid])
+            found = False
+            for c_count, contest in enumerate(contest_batches[uid]):
+                if contest["digest"] in requested_row:
+                    self.imprimir(
+                        f"Contest '{contest['contestCVR']['uid']} - "
+                        f"{contest['contestCVR']['contest_name']}' "
+                        f"({contest['digest']}) is vote {contest_votes - c_count} out "
+                        f"of {contest_votes} votes",
+                        0,
+                    )
+                    found = True
+                    break
+            if found is False:
+                unmerged_uids[uid] = u_count
+        return unmerged_uids
+
+    def vet_a_row_via_index(
+        self, the_election_config: ElectionConfig, uids: list, requested_row: dict
+    ) -> dict:
+        """
+        Same as vet_a_row_via_git_log but the vote offsets are simply
+        looked up in the CVR index.  Returns the uid -> column
+        dictionary of the contests that are not merged yet.
+        """
+        cvr_index = CvrIndex(self, the_election_config)
+        cvr_index.update()
+        positions = {
+            uid: (digest, position)
+            for digest, (uid, position) in cvr_index.lookup(list(requested_row)).items()
+        }
+        counts = cvr_index.contest_counts(list(positions))
+        unmerged_uids = {}
+        for u_count, uid in enumerate(uids):
+            if uid not in positions:
+                unmerged_uids[uid] = u_count
+                continue
+            digest, position = positions[uid]
+            self.imprimir(
+                f"Contest '{uid} - "
+                f"{requested_row[digest]['contestCVR']['contest_name']}' "
+                f"({digest}) is vote {position} out "
+                f"of {counts[uid]} votes",
+                0,
+            )
+        cvr_index.close()
+        return unmerged_uids
+
     # pylint: disable=too-many-locals,too-many-positional-arguments
     def verify_ballot_receipt(
         self,
@@ -226,36 +273,16 @@ class VerifyBallotReceiptOperation(Operation):
         def vet_a_row():
             """
             Will print the actual vote offset in the vote count for each
-            contest.  However, to do that need to get the actual complete
-            tally for the contests of interest.  And at the moment might
-            as well do that for all contests (unless one cat create the
-            git grep query syntax to just pull the uids of interest).
+            contest and then the contests that are not merged yet.
             """
-            contest_batches = self.cvr_parse_git_log_output(
-                ["git", "log", "--topo-order", "--no-merges", "--pretty=format:%H%B"],
-                the_election_config,
-                incoming_printlevel=5,
-            )
-            unmerged_uids = {}
-            for u_count, uid in enumerate(uids):
-                # For this contest loop over the reverse ordered CVRs (since it
-                # seems TBD that it makes sense to ballot #1 as the first ballot on
-                # main).
-                contest_votes = len(contest_batches[uid])
-                found = False
-                for c_count, contest in enumerate(contest_batches[uid]):
-                    if contest["digest"] in requested_row:
-                        self.imprimir(
-                            f"Contest '{contest['contestCVR']['uid']} - "
-                            f"{contest['contestCVR']['contest_name']}' "
-                            f"({contest['digest']}) is vote {contest_votes - c_count} out "
-                            f"of {contest_votes} votes",
-                            0,
-                        )
-                        found = True
-                        break
-                if found is False:
-                    unmerged_uids[uid] = u_count
+            if Globals.get("USE_CVR_INDEX"):
+                unmerged_uids = self.vet_a_row_via_index(
+                    the_election_config, uids, requested_row
+                )
+            else:
+                unmerged_uids = self.vet_a_row_via_git_log(
+                    the_election_config, uids, requested_row
+                )
             if unmerged_uids:
                 truly_unmerged_uids = {
                     uid: dig
@@ -347,7 +374,10 @@ class VerifyBallotReceiptOperation(Operation):
             )
         # if ure uids, convert to the pretty print contest header values
         if uids:
-            receipt_data[0] = [Contest.get_uid_pp_name(uid) for uid in receipt_data[0]]
+            receipt_data[0] = [
+                Contest.get_uid_pp_name(uid, the_election_config.get("contest_uids"))
+                for uid in receipt_data[0]
+            ]
 
         # Can read the receipt file directly without any Ballot info
         # import pdb; pdb.set_trace()
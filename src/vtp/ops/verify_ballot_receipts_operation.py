@@ -0,0 +1,273 @@
+#!/usr/bin/env python
+
+#  VoteTrackerPlus
+#   Copyright (C) 2022 Sandy Currier
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 2 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program; if not, write to the Free Software Foundation, Inc.,
+#   51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+"""
+Logic of operation for verifying many ballot receipts at once - for
+auditors and observers checking every receipt they have collected.
+"""
+
+# Standard imports
+import csv
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Project imports
+from vtp.core.ballot import Ballot
+from vtp.core.cvr_index import CvrIndex
+from vtp.core.election_config import ElectionConfig
+from vtp.core.operation import Operation
+
+
+class VerifyBallotReceiptsOperation(Operation):
+    """
+    A class to implement the verify-ballot-receipts operation.  See the
+    verify-ballot-receipts help output.
+
+    Each digest appears on many receipts by design (a receipt row is
+    a random selection of other ballots' contests), so rather than
+    running verify-ballot-receipt once per receipt, the digests of all
+    the receipts are deduplicated and each one is read and classified
+    once - optionally split across worker processes - and then every
+    receipt is checked against those results.  The checks are the same
+    as those of verify-ballot-receipt: the digest exists, is a commit,
+    is a CVR and is a CVR of the contest of its column.  Whether each
+    CVR is merged to main yet is looked up in the CVR index.
+    """
+
+    @staticmethod
+    def find_receipt_files(receipts: list) -> list:
+        """
+        Expand the supplied receipt files and directories (searched
+        recursively for .csv files) into a sorted list of files
+        """
+        receipt_files = []
+        for receipt in receipts:
+            if os.path.isdir(receipt):
+                for dirpath, _, files in os.walk(receipt):
+                    receipt_files += [
+                        os.path.join(dirpath, filename)
+                        for filename in files
+                        if filename.endswith(".csv")
+                    ]
+            elif os.path.isfile(receipt):
+                receipt_files.append(receipt)
+            else:
+                raise FileNotFoundError(f"Cannot find receipt file ({receipt})")
+        return sorted(set(receipt_files))
+
+    def classify_digests(self, the_election_config: ElectionConfig, digests: list):
+        """
+        Read the supplied digests in a single git backend pass and
+        return a digest -> (kind, uid) dictionary where kind is either
+        'cvr' (with the contest uid of the CVR), 'missing', 'not-cvr'
+        (a commit that is not a CVR) or the type of a non commit object.
+        """
+        classes = {}
+        for digest, (kind, body) in zip(
+            digests,
+            self.git_backend(the_election_config.get("git_rootdir")).read_objects(
+                digests
+            ),
+        ):
+            if kind != "commit":
+                classes[digest] = (kind, "")
+                continue
+            message = body.partition(b"\n\n")[2]
+            if not message.startswith(b"{"):
+                classes[digest] = ("not-cvr", "")
+                continue
+            classes[digest] = ("cvr", json.loads(message)["contestCVR"]["uid"])
+        return classes
+
+    def classify_in_workers(self, jobs: int, digests: list) -> dict:
+        """
+        Classify the digests in jobs worker processes, each reading an
+        interleaved slice of them.
+        """
+        operation_args = {
+            "election_data_dir": self.election_data_dir,
+            "verbosity": self.verbosity,
+        }
+        classes = {}
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            for result in executor.map(
+                classify_digests_in_a_worker,
+                [operation_args] * jobs,
+                [digests[index::jobs] for index in range(jobs)],
+            ):
+                classes.update(result)
+        return classes
+
+    @staticmethod
+    def check_a_receipt(lines: list, classes: dict, positions: dict) -> dict:
+        """
+        Check the rows of a receipt (the header line first) against the
+        digest classes and merge positions and return its report - the
+        list of errors and the number of rows, digests and merged CVRs.
+        """
+        headers = lines[0]
+        uids = [re.match(r"([0-9]+)", column).group(0) for column in headers]
+        report = {"rows": len(lines) - 1, "digests": 0, "merged": 0, "errors": []}
+        for row, digests in enumerate(lines[1:], start=1):
+            for column, digest in enumerate(digests):
+                report["digests"] += 1
+                kind, uid = classes[digest]
+                if kind == "cvr" and uid == uids[column]:
+                    if digest in positions:
+                        report["merged"] += 1
+                    continue
+                if kind == "cvr":
+                    error = f"bad contest uid {uid}"
+                elif kind == "not-cvr":
+                    error = "missing digest in main branch"
+                elif kind == "missing":
+                    error = "missing digest"
+                else:
+                    error = f"invalid digest type {kind}"
+                report["errors"].append(
+                    f"{error}: row {row} column {column + 1} "
+                    f"contest={headers[column]} digest={digest}"
+                )
+        return report
+
+    # pylint: disable=duplicate-code,too-many-locals
+    def run(
+        self,
+        receipts: list = None,
+        jobs: int = 1,
+        report_file: str = "",
+    ) -> list:
+        """
+        Main function - see -h for more info.  Returns the list of
+        per receipt reports.
+        """
+
+        # Create a VTP ElectionData object if one does not already exist
+        the_election_config = ElectionConfig.configure_election(
+            self,
+            self.election_data_dir,
+        )
+        receipt_files = VerifyBallotReceiptsOperation.find_receipt_files(receipts or [])
+        if not receipt_files:
+            raise ValueError("No ballot receipts were supplied")
+        start_time = time.time()
+
+        # git pull the ElectionData repo (once) so to get the latest
+        # set of remote CVRs branches
+        a_ballot = Ballot(self)
+        with self.changed_cwd(a_ballot.get_cvr_parent_dir(the_election_config)):
+            self.shell_out(
+                ["git", "pull"],
+                check=True,
+                incoming_printlevel=5,
+            )
+
+        # Read all the receipts and deduplicate their digests
+        all_lines = {}
+        for receipt_file in receipt_files:
+            with open(receipt_file, "r", encoding="utf8") as infile:
+                all_lines[receipt_file] = list(csv.reader(infile))
+        digests = list(
+            dict.fromkeys(
+                digest
+                for lines in all_lines.values()
+                for row in lines[1:]
+                for digest in row
+            )
+        )
+        self.imprimir(
+            f"Verifying {len(receipt_files)} receipts with "
+            f"{len(digests)} distinct digests",
+            3,
+        )
+
+        # Classify each distinct digest once
+        if jobs > 1 and len(digests) > 1:
+            classes = self.classify_in_workers(jobs, digests)
+        else:
+            classes = self.classify_digests(the_election_config, digests)
+
+        # The merged CVRs are simply looked up in the CVR index
+        cvr_index = CvrIndex(self, the_election_config)
+        cvr_index.update()
+        positions = cvr_index.lookup(
+            [digest for digest, (kind, _) in classes.items() if kind == "cvr"]
+        )
+        cvr_index.close()
+
+        # Report each receipt
+        reports = []
+        invalid = 0
+        for receipt_file, lines in all_lines.items():
+            report = VerifyBallotReceiptsOperation.check_a_receipt(
+                lines, classes, positions
+            )
+            report["receipt"] = receipt_file
+            reports.append(report)
+            if report["errors"]:
+                invalid += 1
+                self.imprimir(
+                    f"{receipt_file}: INVALID - {len(report['errors'])} errors",
+                    1,
+                )
+                for error in report["errors"]:
+                    self.imprimir(f"  {error}", 1)
+            else:
+                self.imprimir(
+                    f"{receipt_file}: VALID - {report['rows']} rows, "
+                    f"{report['merged']} of {report['digests']} digests merged",
+                    3,
+                )
+        if report_file:
+            with open(report_file, "w", encoding="utf8") as outfile:
+                json.dump(reports, outfile, indent=2)
+
+        # Summerize
+        summary = (
+            f"{len(receipt_files) - invalid} of {len(receipt_files)} ballot "
+            f"receipts VALID ({len(digests)} distinct digests verified in "
+            f"{time.time() - start_time:.1f} seconds)"
+        )
+        if invalid:
+            self.imprimir_formatting("begin_error_box")
+            self.imprimir(f"{summary} - {invalid} INVALID", 1)
+            self.imprimir_formatting("end_error_box")
+        else:
+            self.imprimir_formatting("begin_good_box")
+            self.imprimir(f"[GOOD]: {summary}", 0)
+            self.imprimir_formatting("end_good_box")
+        return reports
+
+
+def classify_digests_in_a_worker(operation_args: dict, digests: list) -> dict:
+    """
+    The ProcessPoolExecutor entry point of a verify-ballot-receipts
+    --jobs worker.  Classifies a slice of the digests.
+    """
+    operation = VerifyBallotReceiptsOperation(stdout_printing=False, **operation_args)
+    the_election_config = ElectionConfig.configure_election(
+        operation, operation.election_data_dir
+    )
+    return operation.classify_digests(the_election_config, digests)
+
+
+# EOF
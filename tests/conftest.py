@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+
+#  VoteTrackerPlus
+#   Copyright (C) 2022 Sandy Currier
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 2 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program; if not, write to the Free Software Foundation, Inc.,
+#   51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+"""
+Shared fixtures - the tests that need an ElectionData create a small
+synthetic one (see benchmarks/synthetic_election.py) in a temporary
+directory rather than relying on a mock election being checked out
+next to this repo.
+"""
+
+import os
+import random
+import sys
+
+import pytest
+
+# Project imports
+from vtp.core.ballot import Ballot
+from vtp.core.common import Globals
+from vtp.ops.accept_ballot_operation import AcceptBallotOperation
+from vtp.ops.cast_ballot_operation import CastBallotOperation
+from vtp.ops.merge_contests_operation import MergeContestsOperation
+
+# The benchmarks are scripts rather than a package
+BENCHMARKS_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.realpath(__file__))), "benchmarks"
+)
+sys.path.insert(0, BENCHMARKS_DIR)
+
+# pylint: disable=wrong-import-position,wrong-import-order,import-error
+import synthetic_election  # noqa: E402
+
+
+@pytest.fixture(name="git_identity", scope="session")
+def fixture_git_identity():
+    """Pins the git identity and dates of the created commits"""
+    synthetic_election.set_git_environment()
+
+
+# pylint: disable=unused-argument
+@pytest.fixture(name="synthetic_workspace", scope="session")
+def fixture_synthetic_workspace(tmp_path_factory, git_identity):
+    """Returns the workspace of a small synthetic ElectionData without ballots"""
+    return synthetic_election.create_election(
+        location=os.path.realpath(tmp_path_factory.mktemp("synthetic")),
+        states=1,
+        towns=2,
+    )
+
+
+def cast_ballots(workspace: str, count: int):
+    """Cast and accept count demo mode ballots, cycling the blank ballots"""
+    blank_ballots = sorted(
+        os.path.relpath(os.path.join(dirpath, filename), workspace)
+        for dirpath, _, files in os.walk(workspace)
+        for filename in files
+        if filename.endswith(Globals.get("BALLOT_FILE"))
+    )
+    random.seed(1)
+    for index in range(count):
+        blank_ballot = blank_ballots[index % len(blank_ballots)]
+        CastBallotOperation(election_data_dir=workspace, verbosity=0).run(
+            blank_ballot=blank_ballot, demo_mode=True
+        )
+        AcceptBallotOperation(election_data_dir=workspace, verbosity=0).run(
+            cast_ballot=Ballot.get_cast_from_blank(blank_ballot)
+        )
+
+
+@pytest.fixture(name="cast_election")
+def fixture_cast_election(tmp_path, git_identity):
+    """
+    Returns the workspace of a small synthetic ElectionData with
+    demo mode ballots cast and accepted but not merged
+    """
+    workspace = synthetic_election.create_election(
+        location=os.path.realpath(tmp_path), states=1, towns=2
+    )
+    cast_ballots(workspace, 4)
+    yield workspace
+    MergeContestsOperation.close_git_backends()
+
+
+@pytest.fixture(name="merged_election", scope="session")
+def fixture_merged_election(tmp_path_factory, git_identity):
+    """
+    Returns the workspace of a small synthetic ElectionData with
+    demo mode ballots cast, accepted and merged to main
+    """
+    workspace = synthetic_election.create_election(
+        location=os.path.realpath(tmp_path_factory.mktemp("merged")),
+        states=1,
+        towns=2,
+    )
+    cast_ballots(workspace, 12)
+    MergeContestsOperation(election_data_dir=workspace, verbosity=0).run(
+        flush=True, remote=True
+    )
+    yield workspace
+    MergeContestsOperation.close_git_backends()
+
+
+# EOF
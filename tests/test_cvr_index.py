@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+
+#  VoteTrackerPlus
+#   Copyright (C) 2022 Sandy Currier
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 2 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program; if not, write to the Free Software Foundation, Inc.,
+#   51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+"""Will test the on-disk index of the merged CVRs"""
+
+import json
+import os
+import shutil
+import subprocess
+
+import pytest
+
+# Project imports
+from vtp.core.cvr_index import CvrIndex
+from vtp.core.election_config import ElectionConfig
+from vtp.core.operation import Operation
+
+
+def git(workspace: str, argv: list) -> str:
+    """Run a git command in the workspace and return its stdout"""
+    return subprocess.run(
+        ["git"] + argv, cwd=workspace, check=True, capture_output=True, text=True
+    ).stdout
+
+
+def git_log_positions(workspace: str) -> dict:
+    """
+    Return the digest -> (contest uid, position) of the CVRs merged
+    to main per git log
+    """
+    positions = {}
+    counts = {}
+    for record in git(
+        workspace, ["log", "-z", "--topo-order", "--no-merges", "--format=%H%n%B"]
+    ).split("\0")[::-1]:
+        digest, _, body = record.partition("\n")
+        if body.startswith("{"):
+            uid = json.loads(body)["contestCVR"]["uid"]
+            counts[uid] = counts.get(uid, 0) + 1
+            positions[digest] = (uid, counts[uid])
+    return positions
+
+
+################
+# Fixtures
+################
+@pytest.fixture(name="workspace")
+def fixture_workspace(tmp_path, merged_election):
+    """Returns a private copy of the merged election workspace"""
+    workspace = os.path.join(os.path.realpath(tmp_path), "workspace")
+    shutil.copytree(merged_election, workspace, symlinks=True)
+    return workspace
+
+
+@pytest.fixture(name="cvr_index")
+def fixture_cvr_index(workspace):
+    """Returns the (initially empty) CVR index of the workspace"""
+    operation = Operation(election_data_dir=workspace, verbosity=0)
+    cvr_index = CvrIndex(
+        operation, ElectionConfig.configure_election(operation, workspace)
+    )
+    yield cvr_index
+    cvr_index.close()
+    Operation.close_git_backends()
+
+
+################
+# test points
+################
+
+
+def check_index(workspace: str, cvr_index: CvrIndex):
+    """Check the index lookups and counts against git log"""
+    positions = git_log_positions(workspace)
+    assert positions
+    assert cvr_index.lookup(list(positions) + ["0" * 40]) == positions
+    uids = sorted({uid for uid, _ in positions.values()})
+    assert cvr_index.contest_uids() == uids
+    counts = {uid: max(p for u, p in positions.values() if u == uid) for uid in uids}
+    assert cvr_index.contest_counts(uids) == counts
+    for uid in uids:
+        assert cvr_index.contest_count(uid) == counts[uid]
+        assert [cvr["digest"] for cvr in cvr_index.contest_batches(uid)[uid]] == [
+            digest for digest, (u, _) in positions.items() if u == uid
+        ]
+
+
+def test_incremental_update(workspace, cvr_index):
+    """An update only indexes (and counts) the newly merged CVRs"""
+    total = len(git_log_positions(workspace))
+    older = git(workspace, ["rev-parse", "main~2"]).strip()
+    first = cvr_index.update(older)
+    assert 0 < first < total
+    assert cvr_index.update() == total - first
+    assert cvr_index.update() == 0
+    check_index(workspace, cvr_index)
+    # Re-walking the indexed CVRs neither adds nor moves any of them
+    with cvr_index.connection:
+        cvr_index.connection.execute("DELETE FROM meta WHERE key = 'head'")
+    assert cvr_index.update() == 0
+    check_index(workspace, cvr_index)
+
+
+def test_rewritten_history(workspace, cvr_index):
+    """The index is rebuilt when its last commit is no longer on main"""
+    cvr_index.update()
+    git(workspace, ["reset", "-q", "--hard", "main~3"])
+    git(workspace, ["commit", "-q", "--allow-empty", "-m", "rewritten"])
+    assert cvr_index.update() == len(git_log_positions(workspace))
+    check_index(workspace, cvr_index)
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+
+#  VoteTrackerPlus
+#   Copyright (C) 2022 Sandy Currier
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 2 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program; if not, write to the Free Software Foundation, Inc.,
+#   51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+"""Will test that the election throughput benchmark measures a real election"""
+
+import argparse
+import os
+
+# Project imports
+from vtp.core.common import Globals
+from vtp.ops.merge_contests_operation import MergeContestsOperation
+
+# Local imports (see conftest.py)
+import election_throughput  # pylint: disable=wrong-import-order
+
+
+################
+# test points
+################
+
+
+# pylint: disable=unused-argument
+def test_run_election(tmp_path, git_identity):
+    """
+    A small benchmark run merges every accepted CVR and tallies votes
+    for every supported tally (run_election raises otherwise)
+    """
+    parsed_args = argparse.Namespace(
+        states=1,
+        towns=2,
+        contests=len(Globals.get("SUPPORTED_TALLIES")),
+        candidates=5,
+        rank_depth=3,
+        seed=1,
+        ballots=6,
+        receipts=0,
+    )
+    try:
+        metrics = election_throughput.run_election(
+            parsed_args, os.path.realpath(tmp_path)
+        )
+    finally:
+        MergeContestsOperation.close_git_backends()
+    assert metrics["merge-contests (CVRs)"]["per_sec"] > 0
+    for tally in Globals.get("SUPPORTED_TALLIES"):
+        # one contest of each tally per GGO - the root, state and 2 towns
+        assert metrics[f"tally-contests ({tally})"]["count"] == 4
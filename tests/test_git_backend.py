@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+
+#  VoteTrackerPlus
+#   Copyright (C) 2022 Sandy Currier
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 2 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program; if not, write to the Free Software Foundation, Inc.,
+#   51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+"""Will test the git repository backends"""
+
+import os
+import subprocess
+
+import pytest
+
+# Project imports
+from vtp.core.git_backend import GitBackend, PersistentGitBackend
+from vtp.core.operation import Operation
+
+MISSING = "0123456789" * 4
+
+
+def git(workspace: str, argv: list, data: bytes = None) -> str:
+    """Run a git command in the workspace and return its stdout"""
+    return (
+        subprocess.run(
+            ["git"] + argv, cwd=workspace, input=data, check=True, capture_output=True
+        )
+        .stdout.decode("utf8")
+        .strip()
+    )
+
+
+################
+# Fixtures
+################
+# pylint: disable=unused-argument
+@pytest.fixture(name="workspace")
+def fixture_workspace(tmp_path, git_identity):
+    """Returns a git repo with a single commit of two files"""
+    workspace = os.path.realpath(tmp_path)
+    git(workspace, ["init", "-q", "-b", "main"])
+    os.makedirs(os.path.join(workspace, "GGOs"))
+    for path in ["README.md", "GGOs/config.yaml"]:
+        with open(os.path.join(workspace, path), "w", encoding="utf8") as outfile:
+            outfile.write(f"{path}\n")
+    git(workspace, ["add", "."])
+    git(workspace, ["commit", "-q", "-m", "initial"])
+    return workspace
+
+
+@pytest.fixture(name="backend", params=[GitBackend, PersistentGitBackend])
+def fixture_backend(request, workspace):
+    """Returns each kind of backend of the workspace"""
+    backend = request.param(
+        Operation(election_data_dir=workspace, verbosity=0), workspace
+    )
+    yield backend
+    backend.close()
+
+
+################
+# test points
+################
+
+
+def test_missing_objects(workspace, backend):
+    """Missing objects are reported in order amongst the existing ones"""
+    head = git(workspace, ["rev-parse", "HEAD"])
+    tree = git(workspace, ["rev-parse", "HEAD^{tree}"])
+    assert backend.object_types([MISSING, "HEAD", head[:10].upper(), tree]) == [
+        (MISSING, "missing"),
+        (head, "commit"),
+        (head, "commit"),
+        (tree, "tree"),
+    ]
+    objects = backend.read_objects([tree, MISSING, "HEAD:README.md"])
+    assert [kind for kind, _ in objects] == ["tree", "missing", "blob"]
+    assert objects[1][1] == b""
+    assert objects[2][1] == b"README.md\n"
+    assert backend.rev_parse(MISSING) == ""
+    with pytest.raises(KeyError):
+        backend.read_object(MISSING)
+
+
+def test_replace_path(workspace, backend):
+    """Replacing a path matches the tree git itself writes"""
+    blob = backend.hash_object(b"new contents\n")
+    tree = backend.rev_parse("HEAD^{tree}")
+    # Replace a nested file, add a file in a new directory and
+    # replace a file by a directory
+    tree = backend.replace_path(tree, "GGOs/config.yaml", blob)
+    tree = backend.replace_path(tree, "CVRs/0001/contest.json", blob)
+    tree = backend.replace_path(tree, "README.md/contest.json", blob, "100755")
+    assert backend.tree_entries(tree) == [
+        ("40000", "CVRs", git(workspace, ["rev-parse", f"{tree}:CVRs"])),
+        ("40000", "GGOs", git(workspace, ["rev-parse", f"{tree}:GGOs"])),
+        ("40000", "README.md", git(workspace, ["rev-parse", f"{tree}:README.md"])),
+    ]
+    assert git(workspace, ["ls-tree", "-r", tree]).splitlines() == [
+        f"100644 blob {blob}\tCVRs/0001/contest.json",
+        f"100644 blob {blob}\tGGOs/config.yaml",
+        f"100755 blob {blob}\tREADME.md/contest.json",
+    ]
+    git(workspace, ["fsck", "--strict", "--no-dangling"])
+
+
+def test_object_writes(workspace, backend):
+    """The written objects are named and stored as git does"""
+    data = b"some\0binary\ncontents"
+    blob = backend.hash_object(data)
+    assert blob == git(workspace, ["hash-object", "--stdin"], data)
+    assert git(workspace, ["cat-file", "blob", blob]) == data.decode("utf8")
+    # Writing an existing object is a no-op
+    assert backend.hash_object(data) == blob
+    # Directories sort as if their names end with a '/'
+    subtree = backend.rev_parse("HEAD^{tree}")
+    tree = backend.write_tree([("40000", "a", subtree), ("100644", "a.b", blob)])
+    assert tree == git(
+        workspace,
+        ["mktree"],
+        f"040000 tree {subtree}\ta\n100644 blob {blob}\ta.b\n".encode("utf8"),
+    )
+    parent = backend.rev_parse("HEAD")
+    commit = backend.commit_tree(tree, [parent], "a message")
+    assert commit == git(
+        workspace, ["commit-tree", tree, "-p", parent, "-m", "a message"]
+    )
+    git(workspace, ["fsck", "--strict", "--no-dangling"])
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+
+#  VoteTrackerPlus
+#   Copyright (C) 2022 Sandy Currier
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 2 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program; if not, write to the Free Software Foundation, Inc.,
+#   51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+"""Will test the bulk address to ballot mapping of map-addresses"""
+
+import csv
+import os
+
+import pytest
+
+# Project imports
+from vtp.core.address import Address
+from vtp.core.election_config import ElectionConfig
+from vtp.ops.map_addresses_operation import MapAddressesOperation
+
+
+################
+# Fixtures
+################
+@pytest.fixture(name="voter_file")
+def fixture_voter_file(tmp_path):
+    """Returns a voter file of mappable and unmappable addresses"""
+    voter_file = os.path.join(tmp_path, "voters.csv")
+    with open(voter_file, "w", encoding="utf8", newline="") as outfile:
+        writer = csv.writer(outfile, lineterminator="\n")
+        writer.writerow(["voter", "number", "street", "town", "state"])
+        writer.writerow(["1", "12", "Main St", "Town00", "State00"])
+        writer.writerow(["2", " 7 ", " Oak Ave ", " Town01 ", " State00 "])
+        writer.writerow(["3", "12", "Main St", "Nowhere", "State00"])
+        writer.writerow(["4", "", "", "Town00", "State00"])
+        writer.writerow(["5", "12", "Main St"])
+    return voter_file
+
+
+################
+# test points
+################
+
+
+def test_map_addresses(synthetic_workspace, voter_file, tmp_path):
+    """The mapping matches that of Address.map_ggos for each address"""
+    output_file = os.path.join(tmp_path, "ballots.csv")
+    operation = MapAddressesOperation(
+        election_data_dir=synthetic_workspace, verbosity=0
+    )
+    counts = operation.run(input_file=voter_file, output_file=output_file)
+    assert counts == {"mapped": 2, "unmapped": 3}
+    the_election_config = ElectionConfig.configure_election(
+        operation, synthetic_workspace
+    )
+    with open(output_file, "r", encoding="utf8", newline="") as infile:
+        rows = list(csv.DictReader(infile))
+    for row in rows[:2]:
+        an_address = Address(
+            number=row["number"].strip(),
+            street=row["street"].strip(),
+            town=row["town"].strip(),
+            state=row["state"].strip(),
+        )
+        an_address.map_ggos(the_election_config)
+        assert row["ballot_node"] == an_address.get("ballot_node")
+        assert row["blank_ballot"] == os.path.relpath(
+            the_election_config.gen_blank_ballot_location(
+                an_address.get("active_ggos"), an_address.get("ballot_subdir")
+            ),
+            the_election_config.get("git_rootdir"),
+        )
+        assert row["error"] == ""
+    for row in rows[2:]:
+        assert row["ballot_node"] == row["blank_ballot"] == ""
+        assert row["error"]
+
+
+def test_unknown_leaf_errors_are_fresh(synthetic_workspace):
+    """A cached unknown state/town error is raised as a new exception"""
+    operation = MapAddressesOperation(
+        election_data_dir=synthetic_workspace, verbosity=0
+    )
+    the_election_config = ElectionConfig.configure_election(
+        operation, synthetic_workspace
+    )
+    errors = []
+    for _ in range(2):
+        with pytest.raises(ValueError, match="Bad ElectionConfig node") as error:
+            operation.resolve_leaf(the_election_config, ("State00", "Nowhere"))
+        errors.append(error.value)
+    assert errors[0] is not errors[1]
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+
+#  VoteTrackerPlus
+#   Copyright (C) 2022 Sandy Currier
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 2 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program; if not, write to the Free Software Foundation, Inc.,
+#   51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+"""Will test merging the contest branches"""
+
+import subprocess
+
+import pytest
+
+# Project imports
+from vtp.core.common import Globals
+from vtp.ops.merge_contests_operation import MergeContestsOperation
+
+
+def git(workspace: str, argv: list) -> list:
+    """Run a git command in the workspace and return its stdout lines"""
+    return subprocess.run(
+        ["git"] + argv, cwd=workspace, check=True, capture_output=True, text=True
+    ).stdout.split()
+
+
+################
+# test points
+################
+
+
+@pytest.mark.parametrize("batch_size", [1, 4, 1000])
+def test_batched_merges(cast_election, batch_size, monkeypatch):
+    """All the contest branches are merged whatever the push batch size"""
+    # pylint: disable=protected-access
+    monkeypatch.setitem(Globals._config, "MERGE_PUSH_BATCH", batch_size)
+    pattern = "refs/remotes/origin/" + Globals.get("CONTEST_FILE_SUBDIR")
+    git(cast_election, ["fetch", "-q", "--prune"])
+    branches = git(cast_election, ["for-each-ref", "--format=%(objectname)", pattern])
+    assert len(branches) > 4
+    merged = MergeContestsOperation(election_data_dir=cast_election, verbosity=0).run(
+        flush=True, remote=True
+    )
+    assert merged == len(branches)
+    git(cast_election, ["fetch", "-q", "--prune"])
+    assert not git(cast_election, ["for-each-ref", pattern])
+    assert git(cast_election, ["rev-parse", "main"]) == git(
+        cast_election, ["rev-parse", "origin/main"]
+    )
+    assert sorted(
+        git(cast_election, ["log", "--format=%P", "--merges", "main"])[1::2]
+    ) == sorted(branches)
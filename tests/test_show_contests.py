@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+
+#  VoteTrackerPlus
+#   Copyright (C) 2022 Sandy Currier
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 2 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program; if not, write to the Free Software Foundation, Inc.,
+#   51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+"""Will test showing contests by their digests"""
+
+import subprocess
+
+import pytest
+
+# Project imports
+from vtp.ops.show_contests_operation import ShowContestsOperation
+
+
+################
+# Fixtures
+################
+@pytest.fixture(name="cvr_digests")
+def fixture_cvr_digests(merged_election):
+    """Returns the digest of a merged CVR"""
+    return subprocess.run(
+        ["git", "log", "--no-merges", "--format=%H", "-n", "1", "main", "--", "GGOs"],
+        cwd=merged_election,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout.split()
+
+
+################
+# test points
+################
+
+
+def show(workspace: str, contest_check: str):
+    """Return the result and output of a show-contests"""
+    operation = ShowContestsOperation(
+        election_data_dir=workspace, verbosity=3, stdout_printing=False
+    )
+    return operation.run(contest_check=contest_check), operation.stdout_output
+
+
+@pytest.mark.parametrize(
+    "spell", [str.upper, lambda digest: digest[:12], lambda digest: digest[:12].upper()]
+)
+def test_digest_spellings(merged_election, cvr_digests, spell):
+    """Any digest git accepts shows the same commit, cached or not"""
+    expected = show(merged_election, cvr_digests[0])
+    for _ in range(2):
+        assert show(merged_election, spell(cvr_digests[0])) == expected
+    # Like git show, two spellings of one commit show it once
+    assert show(merged_election, spell(cvr_digests[0]) + "," + cvr_digests[0]) == (
+        expected
+    )
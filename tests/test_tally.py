@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+
+#  VoteTrackerPlus
+#   Copyright (C) 2022 Sandy Currier
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 2 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program; if not, write to the Free Software Foundation, Inc.,
+#   51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+"""Will test the contest tallies against their per CVR equivalents"""
+
+import copy
+import hashlib
+import random
+
+import pytest
+
+# Project imports
+from vtp.core.operation import Operation
+from vtp.core.tally import Tally
+
+# The candidates, most popular first
+CANDIDATES = [f"Candidate {letter}" for letter in "ABCDEFG"]
+
+
+def contest_batch(tally: str, open_positions: int, seed: int) -> list:
+    """
+    Return the CVRs of a contest with randomly (but unevenly) ranked
+    candidates and the occasional blank ballot
+    """
+    generator = random.Random(seed)
+    batch = []
+    for count in range(500):
+        ranking = [
+            name
+            for _, name in sorted(
+                (
+                    (generator.random() * (1 - rank / 20), name)
+                    for rank, name in enumerate(CANDIDATES)
+                ),
+                reverse=True,
+            )
+        ]
+        batch.append(
+            {
+                "digest": hashlib.sha1(f"{seed} {count}".encode("utf8")).hexdigest(),
+                "contestCVR": {
+                    "choices": [{"name": name} for name in CANDIDATES],
+                    "contest_name": "A Contest",
+                    "contest_type": "candidate",
+                    "max_selections": "4",
+                    "open_positions": str(open_positions),
+                    "selection": ranking[: generator.randrange(5)],
+                    "tally": tally,
+                    "uid": "0001",
+                    "win_by": 0.5 if tally == "rcv" else 1.0 / (open_positions + 1),
+                },
+            }
+        )
+    return batch
+
+
+################
+# Fixtures
+################
+@pytest.fixture(name="operation")
+def fixture_operation(tmp_path):
+    """Returns an operation capturing its (info level) output"""
+    return Operation(
+        election_data_dir=str(tmp_path), verbosity=3, stdout_printing=False
+    )
+
+
+################
+# test points
+################
+
+
+def tally_output(operation: Operation, batch: list, checks: list) -> list:
+    """Return the output of a tally of the contest"""
+    preamble = len(operation.stdout_output)
+    the_tally = Tally(copy.deepcopy(batch[0]), operation)
+    the_tally.tallyho(copy.deepcopy(batch), checks)
+    return operation.stdout_output[preamble:]
+
+
+@pytest.mark.parametrize("open_positions", [1, 2, 3])
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_ballot_matrix_rcv(operation, open_positions, seed):
+    """A BallotMatrix RCV tally matches the per CVR one"""
+    batch = contest_batch("rcv", open_positions, seed)
+    # Checking a CVR (even one that does not exist) tallies per CVR
+    expected = tally_output(operation, batch, ["0" * 40])
+    assert any(line.startswith("RCV: round 1") for line in expected)
+    assert tally_output(operation, batch, []) == expected
+
+
+@pytest.mark.parametrize("open_positions", [1, 2, 3])
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_grouped_stv(operation, open_positions, seed):
+    """A StvGroups STV tally matches the per CVR one"""
+    batch = contest_batch("stv", open_positions, seed)
+    expected = tally_output(operation, batch, ["0" * 40])
+    assert any(line.startswith("Election Final:") for line in expected)
+    assert tally_output(operation, batch, []) == expected
+    # Including the rounds and totals of the summary
+    per_cvr = Tally(copy.deepcopy(batch[0]), operation).determine_stv_winners(
+        copy.deepcopy(batch), []
+    )
+    grouped = Tally(copy.deepcopy(batch[0]), operation).determine_grouped_stv_winners(
+        copy.deepcopy(batch)
+    )
+    assert grouped == per_cvr
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+
+#  VoteTrackerPlus
+#   Copyright (C) 2022 Sandy Currier
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 2 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program; if not, write to the Free Software Foundation, Inc.,
+#   51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+"""Will test the incremental and parallel contest tallies"""
+
+import os
+import shutil
+import subprocess
+
+import pytest
+
+# Project imports
+from vtp.core.common import Globals
+from vtp.ops.tally_contests_operation import TallyContestsOperation
+
+
+def git(workspace: str, argv: list) -> str:
+    """Run a git command in the workspace and return its stdout"""
+    return subprocess.run(
+        ["git"] + argv, cwd=workspace, check=True, capture_output=True, text=True
+    ).stdout.strip()
+
+
+def tally(workspace: str, verbosity: int = 3, **kwargs) -> list:
+    """Return the output of a tally-contests"""
+    return TallyContestsOperation(
+        election_data_dir=workspace, verbosity=verbosity, stdout_printing=False
+    ).run(**kwargs)
+
+
+################
+# Fixtures
+################
+@pytest.fixture(name="workspace")
+def fixture_workspace(tmp_path, merged_election):
+    """
+    Returns a private copy of the merged election workspace (and of
+    its upstream repo)
+    """
+    location = os.path.join(os.path.realpath(tmp_path), "election")
+    shutil.copytree(os.path.dirname(merged_election), location, symlinks=True)
+    workspace = os.path.join(location, os.path.basename(merged_election))
+    git(workspace, ["remote", "set-url", "origin", workspace + ".git"])
+    return workspace
+
+
+################
+# test points
+################
+
+
+def plain_tally(workspace: str, verbosity: int, monkeypatch) -> list:
+    """Return the output of a tally that walks the main branch history"""
+    with monkeypatch.context() as patch:
+        # pylint: disable=protected-access
+        patch.setitem(Globals._config, "USE_CVR_INDEX", False)
+        output = tally(workspace, verbosity)
+    assert any(line.startswith("Scanned ") for line in output)
+    return output
+
+
+@pytest.mark.parametrize("verbosity", [3, 4])
+def test_parallel_tally(workspace, verbosity, monkeypatch):
+    """The CVR index and parallel tallies match a plain tally"""
+    expected = plain_tally(workspace, verbosity, monkeypatch)
+    assert tally(workspace, verbosity) == expected
+    assert tally(workspace, verbosity, jobs=2) == expected
+
+
+def test_incremental_tally(workspace, monkeypatch):
+    """The incremental tallies match a plain tally"""
+    expected = plain_tally(workspace, 3, monkeypatch)
+    # Checkpoint the contests part way through the election
+    head = git(workspace, ["rev-parse", "main"])
+    git(workspace, ["push", "-q", "--force", "origin", "main~20:main"])
+    git(workspace, ["reset", "-q", "--hard", "main~20"])
+    partial = plain_tally(workspace, 3, monkeypatch)
+    assert partial != expected
+    assert tally(workspace, incremental=True) == partial
+    # and then fold in the rest of the CVRs, serially or in parallel
+    git(workspace, ["push", "-q", "origin", f"{head}:main"])
+    for jobs in [2, 1]:
+        assert tally(workspace, incremental=True, jobs=jobs) == expected